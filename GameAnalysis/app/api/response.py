@@ -2,33 +2,50 @@
 API响应工具模块，用于统一的响应格式化。
 """
 
-from typing import Any, Dict
+import math
+from typing import Any, Dict, Optional, Union
 from fastapi import HTTPException
 from fastapi.responses import JSONResponse
 
+from app.services.limiter import RateLimitExceededError
+from app.services.profiling import span
+from app.services.resilience import CircuitOpenError
+from app.services.serialization import FastJSONResponse
+from app.storage.pool import PoolTimeoutError
+
+
+# 上游过载或不可用、数据库连接池耗尽等调用方应稍后重试的异常，都带有 retry_after 属性
+RETRY_LATER_ERRORS = (RateLimitExceededError, CircuitOpenError, PoolTimeoutError)
+
 
 def success_response(data: Any = None, message: str = "success") -> JSONResponse:
     """
-    创建成功的JSON响应。
+    创建成功的JSON响应，使用快速序列化后端编码。
 
     Args:
-        data: 响应数据
+        data: 响应数据，可以包含 RawJSON 包装的已编码JSON
         message: 成功消息
 
     Returns:
         成功格式的JSONResponse
     """
-    return JSONResponse(
-        status_code=200,
-        content={
-            "code": 0,
-            "msg": message,
-            "data": data
-        }
-    )
+    with span("serialize"):
+        return FastJSONResponse(
+            status_code=200,
+            content={
+                "code": 0,
+                "msg": message,
+                "data": data
+            }
+        )
 
 
-def error_response(message: str, status_code: int = 400, error_code: int = -1) -> HTTPException:
+def error_response(
+    message: str,
+    status_code: int = 400,
+    error_code: int = -1,
+    headers: Optional[Dict[str, str]] = None
+) -> HTTPException:
     """
     创建错误的HTTP异常。
 
@@ -36,6 +53,7 @@ def error_response(message: str, status_code: int = 400, error_code: int = -1) -
         message: 错误消息
         status_code: HTTP状态码
         error_code: 应用错误代码
+        headers: 附加的响应头（如 Retry-After）
 
     Returns:
         错误格式的HTTPException
@@ -46,5 +64,39 @@ def error_response(message: str, status_code: int = 400, error_code: int = -1) -
             "code": error_code,
             "msg": message,
             "data": None
-        }
+        },
+        headers=headers
+    )
+
+
+def retry_later_response(message: str, retry_after: float, status_code: int = 429) -> HTTPException:
+    """
+    创建需要稍后重试的HTTP异常（限流429或不可用503），附带 Retry-After 响应头。
+
+    Args:
+        message: 错误消息
+        retry_after: 建议的重试等待时间（秒）
+        status_code: HTTP状态码
+
+    Returns:
+        带 Retry-After 的HTTPException
+    """
+    return error_response(
+        message,
+        status_code,
+        headers={"Retry-After": str(max(math.ceil(retry_after), 1))}
     )
+
+
+def overload_response(error: Union[RateLimitExceededError, CircuitOpenError, PoolTimeoutError]) -> HTTPException:
+    """
+    将稍后重试类异常映射为带 Retry-After 的HTTP异常：限流返回429，熔断和连接池等待超时返回503。
+
+    Args:
+        error: RETRY_LATER_ERRORS 中的异常
+
+    Returns:
+        带 Retry-After 的HTTPException
+    """
+    status_code = 429 if isinstance(error, RateLimitExceededError) else 503
+    return retry_later_response(str(error), error.retry_after, status_code)
@@ -4,8 +4,9 @@
 """
 
 import os
+import json
 from typing import List, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 
 
@@ -14,22 +15,123 @@ SINGLE_SELECT = 1
 MULTI_SELECT = 2
 CODING = 3
 
+# 由路由器按延迟、错误率和成本自动选择提供商
+AUTO_MODEL = "auto"
+
+
+@dataclass
+class ProviderConfig:
+    """OpenAI兼容的AI提供商配置。"""
+    name: str  # 提供商名称，即请求中的 model 字段
+    base_url: str  # chat completions 接口地址（不含 /chat/completions）
+    api_key: str
+    model: str  # 请求体中的模型名称
+    cost: float = 1.0  # 相对成本，参与路由打分
+
 
 @dataclass
 class AIConfig:
     """AI服务配置。"""
-    deepseek_key: str
+    deepseek_key: str  # 为空时不注册DeepSeek提供商
+    deepseek_base_url: str = ""  # DeepSeek接口地址，为空时使用默认地址（可指向本地模拟服务）
     timeout: int = 30  # 超时时间（秒）
+    max_connections: int = 20  # 上游连接池最大连接数
+    max_keepalive: int = 10  # 保持空闲的最大连接数
+    keepalive_expiry: float = 60.0  # 空闲连接保持时间（秒）
+    http2: bool = True  # 安装h2时启用HTTP/2
+    max_in_flight: int = 8  # 同时进行的上游请求数上限
+    requests_per_minute: float = 0  # 每分钟上游请求数上限，0表示不限制
+    tokens_per_minute: float = 0  # 每分钟上游token数上限，0表示不限制
+    queue_max_wait: float = 10.0  # 请求排队等待的最长时间（秒）
+    queue_max_size: int = 100  # 允许排队的最大请求数
+    retry_max_attempts: int = 3  # 单个请求最多尝试次数（含首次）
+    retry_base_delay: float = 1.0  # 首次重试的基准等待时间（秒），之后指数增长并加抖动
+    retry_max_delay: float = 10.0  # 单次重试等待上限（秒）
+    request_deadline: float = 60.0  # 单个请求所有尝试的总时限（秒）
+    breaker_failure_threshold: int = 5  # 连续失败多少次后熔断
+    breaker_recovery_timeout: float = 30.0  # 熔断后多久放行探测请求（秒）
+    breaker_half_open_calls: int = 1  # 半开状态同时放行的探测请求数
+    cache_backend: str = "memory"  # 响应缓存：memory/sqlite/none
+    cache_ttl: float = 3600.0  # 缓存有效期（秒）
+    cache_max_entries: int = 1000  # 最多缓存的请求数
+    cache_path: str = "ai_cache.db"  # sqlite缓存文件路径
+    cache_key_prompt: bool = True  # 缓存键包含提示词，提示词模板变化后自动失效
+    coalesce: bool = True  # 合并并发的相同生成请求
+    bulk_concurrency: int = 4  # 批量生成时并发的分片数
+    bulk_chunk_retries: int = 2  # 单个分片失败后的重试次数
+    bulk_max_count: int = 200  # 单次批量生成的最大题目数
+    job_workers: int = 2  # 后台生成任务的工作协程数
+    job_max_pending: int = 100  # 允许排队的最大任务数
+    job_timeout: float = 300.0  # 单个后台任务的最长执行时间（秒）
+    deepseek_cost: float = 1.0  # DeepSeek的相对成本
+    providers: List[ProviderConfig] = field(default_factory=list)  # 其他OpenAI兼容提供商
+    stub_provider: bool = False  # 注册本地桩提供商，用于离线测试
+    stub_latency: float = 0.2  # 桩提供商的模拟耗时（秒）
+    hedge_enabled: bool = True  # 首选提供商响应慢时向次选提供商发起对冲请求
+    hedge_delay: float = 0.0  # 发起对冲请求前等待的时间（秒），0表示使用首选提供商的p95延迟
+    router_window: int = 100  # 路由统计的最近请求数
+    router_cost_weight: float = 0.5  # 成本在路由打分中的权重
+
+
+@dataclass
+class DatabaseConfig:
+    """数据库、连接池及PRAGMA配置。"""
+    path: str = "question_service.db"
+    pool_size: int = 4  # 只读连接的最大数量
+    pool_timeout: float = 10.0  # 等待空闲连接的超时时间（秒）
+    journal_mode: str = "WAL"  # WAL模式下写操作不阻塞读
+    synchronous: str = "NORMAL"  # OFF/NORMAL/FULL/EXTRA
+    cache_size: int = -16000  # 负数表示KiB，即约16MB页缓存
+    mmap_size: int = 134217728  # 内存映射大小（字节），0表示关闭
+    temp_store: str = "MEMORY"  # DEFAULT/FILE/MEMORY
+    busy_timeout: int = 5000  # 等待数据库锁的超时时间（毫秒）
+    count_cache_size: int = 256  # 缓存的分页总数条目数，0表示关闭
+    count_cache_ttl: float = 30.0  # 分页总数缓存有效期（秒）
+    count_estimate_cap: int = 10000  # 估算总数时最多计数的行数
+    import_chunk_size: int = 1000  # 流式导入时每个事务提交的行数
+    import_max_errors: int = 100  # 流式导入响应中最多列出的行错误数
+    export_batch_size: int = 1000  # 流式导出时每次读取的行数
+    write_batch_size: int = 500  # 合并到一个事务的最多行数，0表示关闭写合并
+    write_batch_latency_ms: float = 2.0  # 写操作入队后最多等待合并的时间（毫秒）
+    delete_max_rows: int = 100000  # 单次批量删除最多删除的行数
+
+
+@dataclass
+class LoggingConfig:
+    """日志级别、格式和采样配置。"""
+    level: str = "INFO"  # DEBUG/INFO/WARNING/ERROR
+    format: str = "json"  # json：每行一个JSON对象；text：便于本地阅读的文本
+    debug_sample_rate: float = 0.01  # 记录DEBUG日志的请求比例（0-1），按请求整体采样
+    slow_query_ms: float = 200.0  # 超过该耗时的数据库调用记录WARNING，0表示关闭
+    queue_size: int = 10000  # 异步日志队列容量，队列满时丢弃并计数
+
+
+@dataclass
+class ProfilingConfig:
+    """慢请求剖析配置。"""
+    enabled: bool = False  # 是否启用剖析中间件
+    slow_ms: float = 1000.0  # 超过该耗时的请求保存剖析结果（毫秒）
+    buffer_size: int = 50  # 保留最近的剖析结果数
+    admin_token: str = ""  # 访问剖析结果和 X-Profile 请求头需要的令牌，启用剖析时必须设置
+
+
+@dataclass
+class DiagnosticsConfig:
+    """查询计划诊断配置。"""
+    enabled: bool = False  # 是否记录只读查询并开放 /api/admin/query-plans
+    admin_token: str = ""  # 访问诊断接口需要的令牌，启用时必须设置
+    query_log_size: int = 100  # 记录的不同只读查询数
 
 
 @dataclass
 class QuestionRequest:
     """AI题目生成请求结构。"""
     keyword: str
-    model: Optional[str] = None  # "deepseek"，默认为"deepseek"
+    model: Optional[str] = None  # 提供商名称，默认为"auto"（自动选择）
     language: Optional[str] = None  # 编程语言，默认为"go"
     count: Optional[int] = None  # 题目数量，默认为3
     type: Optional[int] = None  # 题目类型，默认为1
+    bypass_cache: bool = False  # 跳过响应缓存，强制重新生成
 
 
 @dataclass
@@ -78,16 +180,339 @@ def load_config() -> AIConfig:
 
     deepseek_key = os.getenv("DEEPSEEK_API_KEY", "")
     timeout = int(os.getenv("API_TIMEOUT", "30"))
+    providers = load_provider_configs(os.getenv("AI_PROVIDERS", ""))
+    stub_provider = os.getenv("AI_STUB_PROVIDER", "false").lower() in ["1", "true", "yes"]
 
-    # DeepSeek API密钥必须配置
-    if not deepseek_key:
-        raise ValueError("必须配置DeepSeek API密钥（DEEPSEEK_API_KEY）")
+    # 至少需要一个可用的提供商
+    if not deepseek_key and not providers and not stub_provider:
+        raise ValueError("必须配置DeepSeek API密钥（DEEPSEEK_API_KEY）或其他AI提供商（AI_PROVIDERS/AI_STUB_PROVIDER）")
 
-    return AIConfig(
+    config = AIConfig(
         deepseek_key=deepseek_key,
-        timeout=timeout
+        deepseek_base_url=os.getenv("DEEPSEEK_BASE_URL", ""),
+        timeout=timeout,
+        max_connections=int(os.getenv("AI_MAX_CONNECTIONS", "20")),
+        max_keepalive=int(os.getenv("AI_MAX_KEEPALIVE", "10")),
+        keepalive_expiry=float(os.getenv("AI_KEEPALIVE_EXPIRY", "60")),
+        http2=os.getenv("AI_HTTP2", "true").lower() in ["1", "true", "yes"],
+        max_in_flight=int(os.getenv("AI_MAX_IN_FLIGHT", "8")),
+        requests_per_minute=float(os.getenv("AI_REQUESTS_PER_MINUTE", "0")),
+        tokens_per_minute=float(os.getenv("AI_TOKENS_PER_MINUTE", "0")),
+        queue_max_wait=float(os.getenv("AI_QUEUE_MAX_WAIT", "10")),
+        queue_max_size=int(os.getenv("AI_QUEUE_MAX_SIZE", "100")),
+        retry_max_attempts=int(os.getenv("AI_RETRY_MAX_ATTEMPTS", "3")),
+        retry_base_delay=float(os.getenv("AI_RETRY_BASE_DELAY", "1")),
+        retry_max_delay=float(os.getenv("AI_RETRY_MAX_DELAY", "10")),
+        request_deadline=float(os.getenv("AI_REQUEST_DEADLINE", "60")),
+        breaker_failure_threshold=int(os.getenv("AI_BREAKER_FAILURE_THRESHOLD", "5")),
+        breaker_recovery_timeout=float(os.getenv("AI_BREAKER_RECOVERY_TIMEOUT", "30")),
+        breaker_half_open_calls=int(os.getenv("AI_BREAKER_HALF_OPEN_CALLS", "1")),
+        cache_backend=os.getenv("AI_CACHE_BACKEND", "memory").lower(),
+        cache_ttl=float(os.getenv("AI_CACHE_TTL", "3600")),
+        cache_max_entries=int(os.getenv("AI_CACHE_MAX_ENTRIES", "1000")),
+        cache_path=os.getenv("AI_CACHE_PATH", "ai_cache.db"),
+        cache_key_prompt=os.getenv("AI_CACHE_KEY_PROMPT", "true").lower() in ["1", "true", "yes"],
+        coalesce=os.getenv("AI_COALESCE", "true").lower() in ["1", "true", "yes"],
+        bulk_concurrency=int(os.getenv("AI_BULK_CONCURRENCY", "4")),
+        bulk_chunk_retries=int(os.getenv("AI_BULK_CHUNK_RETRIES", "2")),
+        bulk_max_count=int(os.getenv("AI_BULK_MAX_COUNT", "200")),
+        job_workers=int(os.getenv("AI_JOB_WORKERS", "2")),
+        job_max_pending=int(os.getenv("AI_JOB_MAX_PENDING", "100")),
+        job_timeout=float(os.getenv("AI_JOB_TIMEOUT", "300")),
+        deepseek_cost=float(os.getenv("AI_DEEPSEEK_COST", "1")),
+        providers=providers,
+        stub_provider=stub_provider,
+        stub_latency=float(os.getenv("AI_STUB_LATENCY", "0.2")),
+        hedge_enabled=os.getenv("AI_HEDGE", "true").lower() in ["1", "true", "yes"],
+        hedge_delay=float(os.getenv("AI_HEDGE_DELAY", "0")),
+        router_window=int(os.getenv("AI_ROUTER_WINDOW", "100")),
+        router_cost_weight=float(os.getenv("AI_ROUTER_COST_WEIGHT", "0.5"))
+    )
+
+    if config.max_connections < 1:
+        raise ValueError("上游最大连接数必须大于0（AI_MAX_CONNECTIONS）")
+
+    if config.max_keepalive < 0 or config.max_keepalive > config.max_connections:
+        raise ValueError("空闲连接数必须在0到最大连接数之间（AI_MAX_KEEPALIVE）")
+
+    if config.max_in_flight < 1 or config.queue_max_size < 0 or config.queue_max_wait < 0:
+        raise ValueError("上游并发数必须大于0，排队上限和等待时间不能为负（AI_MAX_IN_FLIGHT/AI_QUEUE_*）")
+
+    if config.requests_per_minute < 0 or config.tokens_per_minute < 0:
+        raise ValueError("限流速率不能为负（AI_REQUESTS_PER_MINUTE/AI_TOKENS_PER_MINUTE）")
+
+    if config.retry_max_attempts < 1 or config.retry_base_delay < 0 or config.retry_max_delay < 0:
+        raise ValueError("重试次数必须大于0且等待时间不能为负（AI_RETRY_*）")
+
+    if config.request_deadline <= 0:
+        raise ValueError("请求总时限必须大于0（AI_REQUEST_DEADLINE）")
+
+    if (config.breaker_failure_threshold < 1 or config.breaker_recovery_timeout <= 0
+            or config.breaker_half_open_calls < 1):
+        raise ValueError("熔断阈值、恢复时间和探测请求数必须大于0（AI_BREAKER_*）")
+
+    if config.cache_backend not in ["memory", "sqlite", "none"]:
+        raise ValueError("无效的缓存类型（AI_CACHE_BACKEND）")
+
+    if config.cache_ttl <= 0 or config.cache_max_entries < 1:
+        raise ValueError("缓存有效期和容量必须大于0（AI_CACHE_TTL/AI_CACHE_MAX_ENTRIES）")
+
+    if config.bulk_concurrency < 1 or config.bulk_chunk_retries < 0:
+        raise ValueError("批量生成并发数必须大于0且重试次数不能为负（AI_BULK_CONCURRENCY/AI_BULK_CHUNK_RETRIES）")
+
+    if config.bulk_max_count < 3:
+        raise ValueError("批量生成最大数量不能小于3（AI_BULK_MAX_COUNT）")
+
+    if config.job_workers < 1 or config.job_max_pending < 1 or config.job_timeout <= 0:
+        raise ValueError("后台任务的工作协程数、队列上限和超时必须大于0（AI_JOB_*）")
+
+    if config.hedge_delay < 0 or config.router_window < 1 or config.router_cost_weight < 0:
+        raise ValueError("对冲等待时间和成本权重不能为负，路由统计窗口必须大于0（AI_HEDGE_DELAY/AI_ROUTER_*）")
+
+    return config
+
+
+def load_provider_configs(raw: str) -> List[ProviderConfig]:
+    """
+    解析 AI_PROVIDERS 中的提供商列表。
+
+    格式为JSON数组，每项包含 name、base_url、model，以及 api_key 或
+    api_key_env（从该环境变量读取密钥），可选 cost。
+
+    Args:
+        raw: AI_PROVIDERS 环境变量的值
+
+    Returns:
+        List[ProviderConfig]: 提供商配置列表
+
+    Raises:
+        ValueError: 如果格式无效
+    """
+    if not raw.strip():
+        return []
+
+    try:
+        items = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"AI_PROVIDERS 不是有效的JSON: {e}")
+
+    if not isinstance(items, list):
+        raise ValueError("AI_PROVIDERS 必须是JSON数组")
+
+    providers = []
+    names = {"deepseek", "stub", AUTO_MODEL}
+    for item in items:
+        try:
+            name = item["name"]
+            api_key = item.get("api_key") or os.getenv(item.get("api_key_env", ""), "")
+            provider = ProviderConfig(
+                name=name,
+                base_url=item["base_url"],
+                api_key=api_key,
+                model=item["model"],
+                cost=float(item.get("cost", 1.0))
+            )
+        except (KeyError, TypeError, AttributeError, ValueError) as e:
+            raise ValueError(f"AI_PROVIDERS 中的提供商配置无效: {e}")
+
+        if name in names:
+            raise ValueError(f"AI提供商名称重复或为保留名称: {name}")
+        if not api_key:
+            raise ValueError(f"AI提供商 {name} 未配置API密钥")
+        names.add(name)
+        providers.append(provider)
+
+    return providers
+
+
+def load_database_config() -> DatabaseConfig:
+    """
+    从环境变量加载数据库配置。
+
+    Returns:
+        DatabaseConfig: 数据库路径、连接池和PRAGMA设置
+
+    Raises:
+        ValueError: 如果配置参数无效
+    """
+    load_dotenv()
+
+    config = DatabaseConfig(
+        path=os.getenv("DB_PATH", "question_service.db"),
+        pool_size=int(os.getenv("DB_POOL_SIZE", "4")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        journal_mode=os.getenv("DB_JOURNAL_MODE", "WAL").upper(),
+        synchronous=os.getenv("DB_SYNCHRONOUS", "NORMAL").upper(),
+        cache_size=int(os.getenv("DB_CACHE_SIZE", "-16000")),
+        mmap_size=int(os.getenv("DB_MMAP_SIZE", "134217728")),
+        temp_store=os.getenv("DB_TEMP_STORE", "MEMORY").upper(),
+        busy_timeout=int(os.getenv("DB_BUSY_TIMEOUT", "5000")),
+        count_cache_size=int(os.getenv("DB_COUNT_CACHE_SIZE", "256")),
+        count_cache_ttl=float(os.getenv("DB_COUNT_CACHE_TTL", "30")),
+        count_estimate_cap=int(os.getenv("DB_COUNT_ESTIMATE_CAP", "10000")),
+        import_chunk_size=int(os.getenv("DB_IMPORT_CHUNK_SIZE", "1000")),
+        import_max_errors=int(os.getenv("DB_IMPORT_MAX_ERRORS", "100")),
+        export_batch_size=int(os.getenv("DB_EXPORT_BATCH_SIZE", "1000")),
+        write_batch_size=int(os.getenv("DB_WRITE_BATCH_SIZE", "500")),
+        write_batch_latency_ms=float(os.getenv("DB_WRITE_BATCH_LATENCY_MS", "2")),
+        delete_max_rows=int(os.getenv("DB_DELETE_MAX_ROWS", "100000"))
+    )
+
+    validate_database_config(config)
+    return config
+
+
+def validate_database_config(config: DatabaseConfig) -> None:
+    """
+    验证数据库配置。PRAGMA不支持参数绑定，取值必须来自白名单。
+
+    Args:
+        config: 要验证的数据库配置
+
+    Raises:
+        ValueError: 如果验证失败
+    """
+    if config.pool_size < 1:
+        raise ValueError("连接池大小必须大于0（DB_POOL_SIZE）")
+
+    if config.pool_timeout <= 0:
+        raise ValueError("连接池等待超时必须大于0（DB_POOL_TIMEOUT）")
+
+    if config.journal_mode not in ["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF"]:
+        raise ValueError("无效的日志模式（DB_JOURNAL_MODE）")
+
+    if config.synchronous not in ["OFF", "NORMAL", "FULL", "EXTRA"]:
+        raise ValueError("无效的同步模式（DB_SYNCHRONOUS）")
+
+    if config.temp_store not in ["DEFAULT", "FILE", "MEMORY"]:
+        raise ValueError("无效的临时存储模式（DB_TEMP_STORE）")
+
+    if config.mmap_size < 0:
+        raise ValueError("内存映射大小不能为负数（DB_MMAP_SIZE）")
+
+    if config.busy_timeout < 0:
+        raise ValueError("锁等待超时不能为负数（DB_BUSY_TIMEOUT）")
+
+    if config.count_cache_size < 0:
+        raise ValueError("总数缓存大小不能为负数（DB_COUNT_CACHE_SIZE）")
+
+    if config.count_estimate_cap < 1:
+        raise ValueError("估算计数上限必须大于0（DB_COUNT_ESTIMATE_CAP）")
+
+    if config.import_chunk_size < 1:
+        raise ValueError("导入事务大小必须大于0（DB_IMPORT_CHUNK_SIZE）")
+
+    if config.import_max_errors < 0:
+        raise ValueError("导入错误列表上限不能为负数（DB_IMPORT_MAX_ERRORS）")
+
+    if config.export_batch_size < 1:
+        raise ValueError("导出批大小必须大于0（DB_EXPORT_BATCH_SIZE）")
+
+    if config.write_batch_size < 0:
+        raise ValueError("写合并行数不能为负数（DB_WRITE_BATCH_SIZE）")
+
+    if config.write_batch_latency_ms < 0:
+        raise ValueError("写合并等待时间不能为负数（DB_WRITE_BATCH_LATENCY_MS）")
+
+    if config.delete_max_rows < 1:
+        raise ValueError("单次删除行数上限必须大于0（DB_DELETE_MAX_ROWS）")
+
+
+def load_logging_config() -> LoggingConfig:
+    """
+    从环境变量加载日志配置。
+
+    Returns:
+        LoggingConfig: 日志级别、格式和采样设置
+
+    Raises:
+        ValueError: 如果配置参数无效
+    """
+    load_dotenv()
+
+    config = LoggingConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        format=os.getenv("LOG_FORMAT", "json").lower(),
+        debug_sample_rate=float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.01")),
+        slow_query_ms=float(os.getenv("LOG_SLOW_QUERY_MS", "200")),
+        queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    )
+
+    if config.level not in ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]:
+        raise ValueError("无效的日志级别（LOG_LEVEL）")
+
+    if config.format not in ["json", "text"]:
+        raise ValueError("无效的日志格式，只支持 json 或 text（LOG_FORMAT）")
+
+    if not 0 <= config.debug_sample_rate <= 1:
+        raise ValueError("DEBUG日志采样率必须在0到1之间（LOG_DEBUG_SAMPLE_RATE）")
+
+    if config.slow_query_ms < 0:
+        raise ValueError("慢查询阈值不能为负数（LOG_SLOW_QUERY_MS）")
+
+    if config.queue_size < 1:
+        raise ValueError("日志队列容量必须大于0（LOG_QUEUE_SIZE）")
+
+    return config
+
+
+def load_profiling_config() -> ProfilingConfig:
+    """
+    从环境变量加载剖析配置。
+
+    Returns:
+        ProfilingConfig: 剖析开关、阈值和缓冲区设置
+
+    Raises:
+        ValueError: 如果配置参数无效
+    """
+    load_dotenv()
+
+    config = ProfilingConfig(
+        enabled=os.getenv("PROFILE_ENABLED", "false").lower() in ["1", "true", "yes"],
+        slow_ms=float(os.getenv("PROFILE_SLOW_MS", "1000")),
+        buffer_size=int(os.getenv("PROFILE_BUFFER_SIZE", "50")),
+        admin_token=os.getenv("PROFILE_ADMIN_TOKEN", "")
+    )
+
+    if config.slow_ms < 0:
+        raise ValueError("慢请求阈值不能为负数（PROFILE_SLOW_MS）")
+
+    if config.buffer_size < 1:
+        raise ValueError("剖析结果缓冲区大小必须大于0（PROFILE_BUFFER_SIZE）")
+
+    if config.enabled and not config.admin_token:
+        raise ValueError("启用剖析时必须设置管理令牌（PROFILE_ADMIN_TOKEN）")
+
+    return config
+
+
+def load_diagnostics_config() -> DiagnosticsConfig:
+    """
+    从环境变量加载查询计划诊断配置。
+
+    Returns:
+        DiagnosticsConfig: 诊断开关、管理令牌和查询记录容量
+
+    Raises:
+        ValueError: 如果配置参数无效
+    """
+    load_dotenv()
+
+    config = DiagnosticsConfig(
+        enabled=os.getenv("DIAGNOSTICS_ENABLED", "false").lower() in ["1", "true", "yes"],
+        admin_token=os.getenv("DIAGNOSTICS_ADMIN_TOKEN", ""),
+        query_log_size=int(os.getenv("DIAGNOSTICS_QUERY_LOG_SIZE", "100"))
     )
 
+    if config.query_log_size < 1:
+        raise ValueError("查询记录数必须大于0（DIAGNOSTICS_QUERY_LOG_SIZE）")
+
+    if config.enabled and not config.admin_token:
+        raise ValueError("启用诊断时必须设置管理令牌（DIAGNOSTICS_ADMIN_TOKEN）")
+
+    return config
+
 
 def validate_question_request(req: QuestionRequest) -> QuestionRequest:
     """
@@ -113,11 +538,9 @@ def validate_question_request(req: QuestionRequest) -> QuestionRequest:
     if not req.count:
         req.count = 3
     if not req.model:
-        req.model = "deepseek"
+        req.model = AUTO_MODEL
 
-    # 验证值
-    if req.model not in ["deepseek"]:
-        raise ValueError("不支持的AI模型")
+    # 模型名称对应已注册的提供商，由AI服务在路由时验证
 
     if req.language not in ["go", "java", "python", "javascript", "c++", "css", "html"]:
         raise ValueError("不支持的编程语言")
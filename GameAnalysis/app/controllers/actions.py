@@ -3,15 +3,22 @@
 处理CRUD操作和数据检索。
 """
 
+import json
+import base64
+import logging
 from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from app.config.config import QuestionRequest1, validate_question_request1
-from app.storage.database import Database
-from app.api.response import success_response, error_response
+from app.services.exporter import MEDIA_TYPES, QuestionExporter, create_question_exporter
+from app.storage.database import Database, DeleteConflictError
+from app.api.response import RETRY_LATER_ERRORS, success_response, error_response, overload_response
 
 
+logger = logging.getLogger(__name__)
+
 class PageRequest(BaseModel):
     """分页请求模型。"""
     page: int = Field(1, ge=1, description="页码")
@@ -20,16 +27,81 @@ class PageRequest(BaseModel):
 
 
 class DeleteRequest(BaseModel):
-    """批量删除请求模型。"""
-    ids: List[int] = Field(..., min_items=1, description="要删除的ID列表")
+    """
+    批量删除请求模型。
+
+    按 ids 删除，或按过滤条件删除（条件之间为AND关系）；两种方式不能同时使用。
+    按条件删除需要用 expected_count 确认匹配行数，可先用 dry_run 获取。
+    """
+    ids: Optional[List[int]] = Field(None, min_length=1, description="要删除的ID列表")
+    question_type: Optional[int] = Field(None, ge=1, le=3, description="按题目类型删除")
+    language: Optional[str] = Field(None, description="按编程语言删除")
+    search: str = Field("", description="按标题搜索词删除")
+    min_id: Optional[int] = Field(None, ge=0, description="id下限（包含）")
+    max_id: Optional[int] = Field(None, ge=0, description="id上限（包含）")
+    expected_count: Optional[int] = Field(None, ge=0, description="按条件删除时确认的匹配行数")
+    dry_run: bool = Field(False, description="按条件删除时只返回匹配行数，不删除")
+
+    def filters(self) -> Dict[str, Any]:
+        """返回请求中设置了的过滤条件。"""
+        values = {
+            "question_type": self.question_type,
+            "language": self.language,
+            "search": self.search,
+            "min_id": self.min_id,
+            "max_id": self.max_id
+        }
+        return {name: value for name, value in values.items() if value not in (None, "")}
+
+
+def encode_cursor(question_id: Optional[int]) -> Optional[str]:
+    """
+    将题目id编码为不透明的分页游标。
+
+    Args:
+        question_id: 游标位置的题目id
+
+    Returns:
+        URL安全的游标字符串，id为None时返回None
+    """
+    if question_id is None:
+        return None
+    raw = json.dumps({"id": question_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    解析分页游标。
+
+    Args:
+        cursor: encode_cursor 生成的游标字符串
+
+    Returns:
+        游标位置的题目id
+
+    Raises:
+        ValueError: 如果游标格式无效
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        question_id = payload["id"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("无效的分页游标")
+
+    if not isinstance(question_id, int) or question_id < 0:
+        raise ValueError("无效的分页游标")
+    return question_id
 
 
 class ActionsController:
     """题目管理操作的控制器。"""
 
-    def __init__(self, database: Database):
+    def __init__(self, database: Database, exporter: Optional[QuestionExporter] = None):
 
         self.database = database
+        self.exporter = exporter or create_question_exporter(database)
         self.router = APIRouter()
         self._setup_routes()
     
@@ -37,98 +109,253 @@ class ActionsController:
         """设置API路由。"""
         self.router.get("/summary")(self.summary)
         self.router.delete("/batch-delete")(self.batch_delete)
+        self.router.get("/pool")(self.pool_stats)
+        self.router.get("/export")(self.export)
 
     async def _handle_pagination(
         self,
         page: int = Query(1, ge=1),
         page_size: int = Query(10, ge=1, le=100),
         search: str = Query(""),
-        question_type: Optional[int] = None
+        question_type: Optional[int] = None,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        mode: str = "like",
+        total_mode: str = "exact"
     ):
         """
         处理分页题目检索。
 
+        指定 after/before 游标时使用keyset分页，否则按页码分页；
+        两种模式都会返回 next_cursor/prev_cursor 以便切换到游标翻页。
+        mode 为 "fts" 且有搜索词时使用全文索引并按相关度排序，仅支持页码分页。
+        total_mode 为 "estimate" 时返回快速估算的总数，total_exact 标明是否精确。
+
         Args:
             page: 页码
             page_size: 每页项目数
             search: 搜索词
             question_type: 按题目类型过滤
+            after: 下一页游标
+            before: 上一页游标
+            mode: 搜索模式，"like" 或 "fts"
+            total_mode: 总数模式，"exact" 或 "estimate"
 
         Returns:
             分页响应
         """
         try:
-            # 添加调试日志
-            print(f"DEBUG: _handle_pagination called with page={page}, page_size={page_size}, search='{search}', question_type={question_type}")
-            print(f"DEBUG: Database instance: {self.database}")
-
-            questions, total = await self.database.get_questions_paginated(
-                page=page,
-                page_size=page_size,
-                search=search,
-                question_type=question_type
-            )
+            after_id = decode_cursor(after) if after else None
+            before_id = decode_cursor(before) if before else None
+            if after_id is not None and before_id is not None:
+                raise ValueError("after 和 before 不能同时指定")
+            use_fts = mode == "fts" and bool(search.strip())
+            if use_fts and (after_id is not None or before_id is not None):
+                raise ValueError("全文搜索按相关度排序，不支持游标分页")
+        except ValueError as e:
+            raise error_response(f"参数错误: {str(e)}", 400)
 
-            print(f"DEBUG: Database returned total={total}, questions_count={len(questions)}")
-            print(f"DEBUG: First few questions: {questions[:2] if questions else 'None'}")
+        try:
+            if total_mode == "estimate":
+                total, total_exact = await self.database.estimate_questions_count(
+                    search=search,
+                    question_type=question_type,
+                    fts=use_fts
+                )
+            else:
+                total = await self.database.count_questions(
+                    search=search,
+                    question_type=question_type,
+                    fts=use_fts
+                )
+                total_exact = True
+
+            if use_fts:
+                questions, _ = await self.database.search_questions(
+                    search=search,
+                    page=page,
+                    page_size=page_size,
+                    question_type=question_type,
+                    count_total=False
+                )
+                # 相关度排序下id不单调，不提供游标
+                next_id = prev_id = None
+            elif after_id is not None or before_id is not None:
+                questions, _, next_id, prev_id = await self.database.get_questions_keyset(
+                    page_size=page_size,
+                    search=search,
+                    question_type=question_type,
+                    after_id=after_id,
+                    before_id=before_id,
+                    count_total=False
+                )
+            else:
+                questions, _ = await self.database.get_questions_paginated(
+                    page=page,
+                    page_size=page_size,
+                    search=search,
+                    question_type=question_type,
+                    count_total=False
+                )
+                if total_exact:
+                    has_next = bool(questions) and page * page_size < total
+                else:
+                    # 估算总数不可靠，满页即认为可能还有下一页
+                    has_next = len(questions) == page_size
+                next_id = questions[-1]["id"] if has_next else None
+                prev_id = questions[0]["id"] if questions and page > 1 else None
+
+            logger.debug("分页查询", extra={
+                "page": page,
+                "page_size": page_size,
+                "search": search,
+                "question_type": question_type,
+                "cursor": "after" if after_id is not None else "before" if before_id is not None else None,
+                "mode": mode,
+                "total_mode": total_mode,
+                "total": total,
+                "returned": len(questions)
+            })
 
             response_data = {
                 "total": total,
-                "questions": questions
+                "total_exact": total_exact,
+                "questions": questions,
+                "next_cursor": encode_cursor(next_id),
+                "prev_cursor": encode_cursor(prev_id)
             }
 
-            print(f"DEBUG: Response data: {response_data}")
-
             return success_response(response_data)
 
+        except RETRY_LATER_ERRORS as e:
+            raise overload_response(e)
         except Exception as e:
-            print(f"DEBUG: Exception in _handle_pagination: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("分页查询失败")
             raise error_response(f"获取数据失败: {str(e)}", 500)
     
     async def summary(
         self,
         page: int = Query(1, ge=1),
         page_size: int = Query(10, ge=1, le=100),
-        search: str = Query("")
+        search: str = Query(""),
+        after: Optional[str] = Query(None, description="下一页游标"),
+        before: Optional[str] = Query(None, description="上一页游标"),
+        mode: str = Query("like", pattern="^(like|fts)$", description="搜索模式"),
+        total_mode: str = Query("exact", pattern="^(exact|estimate)$", description="总数模式")
     ):
-        """获取所有题目（分页）。"""
-        return await self._handle_pagination(page, page_size, search)
+        """获取所有题目（分页，支持页码或游标翻页）。"""
+        return await self._handle_pagination(
+            page, page_size, search, None, after, before, mode, total_mode
+        )
 
     
     async def batch_delete(self, request: DeleteRequest):
         """
         批量删除题目。
 
+        按id删除时id分块执行但在同一个事务中；按条件删除时不需要先查询id，
+        但必须用 expected_count 确认匹配行数（dry_run 只返回匹配行数）。
+        两种方式单次最多删除 DB_DELETE_MAX_ROWS 行，超过或匹配行数与确认值不一致时返回409。
+        响应只返回计数，不回显id列表。
+
         Args:
-            request: 包含题目ID的删除请求
+            request: 包含题目ID或过滤条件的删除请求
 
         Returns:
-            删除成功响应
+            删除的行数以及请求的id数或使用的过滤条件
         """
+        filters = request.filters()
+        if request.ids and filters:
+            raise error_response("ids 与过滤条件不能同时使用", 400)
+        if not request.ids and not filters:
+            raise error_response("请提供要删除的ids或至少一个过滤条件", 400)
+        if request.min_id is not None and request.max_id is not None and request.min_id > request.max_id:
+            raise error_response("min_id 不能大于 max_id", 400)
+
+        max_rows = self.database.config.delete_max_rows
+        if request.ids and len(request.ids) > max_rows:
+            raise error_response(f"单次最多删除{max_rows}个ID", 409)
+        if filters and not request.dry_run and request.expected_count is None:
+            raise error_response("按条件删除需要 expected_count 确认匹配行数（可先用 dry_run 获取）", 400)
+
         try:
-            deleted_count = await self.database.batch_delete_questions(request.ids)
+            if request.ids:
+                deleted_count = await self.database.batch_delete_questions(request.ids)
+                return success_response({"deleted_count": deleted_count, "requested": len(request.ids)})
 
-            return success_response({
-                "deleted_ids": request.ids,
-                "message": "删除成功",
-                "deleted_count": deleted_count
-            })
+            if request.dry_run:
+                matched = await self.database.delete_questions_by_filter(**filters, dry_run=True)
+                return success_response({"matched_count": matched, "filters": filters})
+
+            deleted_count = await self.database.delete_questions_by_filter(
+                **filters, expected_count=request.expected_count
+            )
+            return success_response({"deleted_count": deleted_count, "filters": filters})
 
+        except DeleteConflictError as e:
+            raise error_response(str(e), 409)
+        except RETRY_LATER_ERRORS as e:
+            raise overload_response(e)
         except Exception as e:
+            logger.exception("批量删除失败")
             raise error_response(f"删除操作失败: {str(e)}", 500)
 
+    async def export(
+        self,
+        format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="导出格式"),
+        search: str = Query("", description="标题搜索词"),
+        question_type: Optional[int] = Query(None, ge=1, le=3, description="题目类型"),
+        gzip: bool = Query(False, description="是否gzip压缩")
+    ):
+        """
+        流式导出题库（含选项、答案和编程语言），按id升序。
+
+        数据分批读取并逐批写出，内存占用与题库大小无关；导出文件可直接用 import 接口重新导入。
+
+        Args:
+            format: ndjson 或 csv
+            search: 标题搜索词，与分页查询相同
+            question_type: 按题目类型过滤
+            gzip: 为true时输出 .gz 文件
+
+        Returns:
+            以附件形式下载的流式响应
+        """
+        filename = f"questions.{format}"
+        media_type = MEDIA_TYPES[format]
+        if gzip:
+            filename += ".gz"
+            media_type = "application/gzip"
+
+        return StreamingResponse(
+            self.exporter.stream(format, search, question_type, gzip),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+
+    async def pool_stats(self):
+        """
+        获取数据库连接池和计数缓存统计信息。
+
+        Returns:
+            连接池使用情况响应
+        """
+        stats = self.database.pool_stats()
+        stats["count_cache"] = self.database.count_cache_stats()
+        stats["writes"] = self.database.write_stats()
+        return success_response(stats)
+
 
-def create_actions_controller(database: Database) -> APIRouter:
+def create_actions_controller(database: Database, exporter: Optional[QuestionExporter] = None) -> APIRouter:
     """
     创建操作控制器路由的工厂函数。
 
     Args:
         database: 数据库实例
+        exporter: 题库导出器，默认按数据库配置创建
 
     Returns:
         配置好的APIRouter
     """
-    controller = ActionsController(database)
+    controller = ActionsController(database, exporter)
     return controller.router
@@ -0,0 +1,80 @@
+"""
+数据库诊断控制器。
+返回最近执行的查询的执行计划和耗时，用于确认查询在线上是否命中索引。
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Header, Query
+
+from app.api.response import success_response, error_response
+from app.config.config import DiagnosticsConfig
+from app.services.profiling import check_admin_token
+from app.storage.database import Database
+
+
+class DiagnosticsController:
+    """/admin/query-plans 接口的控制器。"""
+
+    def __init__(self, database: Database, config: DiagnosticsConfig):
+        """
+        初始化控制器。
+
+        Args:
+            database: 已启用查询记录的数据库实例
+            config: 诊断配置，接口需要与 admin_token 一致的 X-Admin-Token 请求头
+        """
+        self.database = database
+        self.config = config
+        self.router = APIRouter()
+        self.router.get("/query-plans")(self.query_plans)
+
+    async def query_plans(
+        self,
+        run: bool = Query(False, description="是否实际执行查询并计时"),
+        x_admin_token: Optional[str] = Header(None)
+    ):
+        """
+        获取最近执行的只读查询的 EXPLAIN QUERY PLAN 结果。
+
+        每条查询附带使用的索引、是否全表扫描、是否需要临时B树排序；
+        run 为true时用最近一次的参数重放查询并返回耗时和行数，会实际读取数据，默认关闭。
+
+        Args:
+            run: 是否实际执行查询
+
+        Returns:
+            结构版本、题目表上的索引和各查询的计划
+
+        Raises:
+            HTTPException: 管理令牌无效
+        """
+        if not check_admin_token(self.config.admin_token, x_admin_token):
+            raise error_response("管理令牌无效", status_code=403)
+
+        try:
+            queries = await self.database.explain_queries(run)
+        except ValueError as e:
+            raise error_response(str(e), status_code=404)
+
+        return success_response({
+            "schema_version": self.database.schema_version,
+            "indexes": await self.database.list_indexes(),
+            "queries": queries,
+            "full_scans": sum(1 for query in queries if query.get("full_scan"))
+        })
+
+
+def create_diagnostics_controller(database: Database, config: DiagnosticsConfig) -> APIRouter:
+    """
+    创建数据库诊断控制器路由的工厂函数。
+
+    Args:
+        database: 数据库实例
+        config: 诊断配置，提供管理令牌
+
+    Returns:
+        配置好的APIRouter
+    """
+    controller = DiagnosticsController(database, config)
+    return controller.router
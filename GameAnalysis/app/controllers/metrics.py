@@ -0,0 +1,144 @@
+"""
+运行指标控制器。
+以Prometheus文本格式导出请求、数据库、上游AI调用和缓存指标。
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.services.client import AIService
+from app.services.metrics import REGISTRY, CONTENT_TYPE, format_metric
+from app.services.logs import logging_stats
+from app.services.resilience import CIRCUIT_OPEN
+from app.storage.database import Database
+
+
+Samples = List[Tuple[Dict[str, Any], float]]
+
+
+class MetricsController:
+    """/metrics 接口的控制器。"""
+
+    def __init__(self, ai_service: AIService, database: Database):
+        """
+        初始化控制器。
+
+        Args:
+            ai_service: AI服务实例，抓取时读取其统计
+            database: 数据库实例，抓取时读取连接池和计数缓存统计
+        """
+        self.ai_service = ai_service
+        self.database = database
+        self.router = APIRouter()
+        self.router.get("/metrics")(self.metrics)
+
+    async def metrics(self):
+        """
+        导出全部指标。
+
+        直方图和计数器在请求处理过程中累计；缓存命中、token用量等已有统计在抓取时读取。
+
+        Returns:
+            text/plain Prometheus文本格式响应
+        """
+        parts = [REGISTRY.render()]
+        parts.extend(self._ai_metrics(await self.ai_service.stats()))
+        parts.extend(self._database_metrics())
+        parts.append(format_metric(
+            "log_records_dropped_total", "counter", "日志队列满时丢弃的日志数", [({}, logging_stats()["dropped"])]
+        ))
+        return Response(content="".join(parts), media_type=CONTENT_TYPE)
+
+    def _ai_metrics(self, stats: Dict[str, Any]) -> List[str]:
+        """将AI服务统计转换为指标。"""
+        providers = stats.get("providers", {})
+
+        def per_provider(path: Tuple[str, ...]) -> Samples:
+            samples = []
+            for name, provider in providers.items():
+                value: Any = provider
+                for key in path:
+                    value = value.get(key) if isinstance(value, dict) else None
+                if isinstance(value, (int, float)):
+                    samples.append(({"provider": name}, value))
+            return samples
+
+        tokens: Samples = []
+        for kind in ("prompt", "completion"):
+            tokens.extend(
+                ({"provider": labels["provider"], "kind": kind}, value)
+                for labels, value in per_provider(("tokens", kind))
+            )
+
+        breaker_open: Samples = [
+            ({"provider": name}, 1 if provider.get("breaker", {}).get("state") == CIRCUIT_OPEN else 0)
+            for name, provider in providers.items()
+            if "breaker" in provider
+        ]
+
+        router = stats.get("router", {})
+        cache = stats.get("cache", {})
+        coalescing = stats.get("coalescing", {})
+
+        return [
+            format_metric("ai_upstream_requests_total", "counter", "各提供商的上游HTTP请求数（含重试）",
+                          per_provider(("requests",))),
+            format_metric("ai_upstream_retries_total", "counter", "各提供商的重试次数", per_provider(("retries",))),
+            format_metric("ai_upstream_tokens_total", "counter", "各提供商上报的token用量", tokens),
+            format_metric("ai_upstream_errors_total", "counter", "各提供商的失败调用数",
+                          per_provider(("latency", "errors"))),
+            format_metric("ai_upstream_in_flight", "gauge", "各提供商正在进行的上游调用数",
+                          per_provider(("admission", "in_flight"))),
+            format_metric("ai_upstream_queue_depth", "gauge", "各提供商等待准入的调用数",
+                          per_provider(("admission", "queue_depth"))),
+            format_metric("ai_circuit_open", "gauge", "熔断器是否处于打开状态", breaker_open),
+            format_metric("ai_router_hedges_total", "counter", "发起的对冲请求数", [({}, router.get("hedges"))]),
+            format_metric("ai_router_failovers_total", "counter", "切换提供商的次数", [({}, router.get("failovers"))]),
+            format_metric("ai_cache_hits_total", "counter", "AI响应缓存命中数", [({}, cache.get("hits"))]),
+            format_metric("ai_cache_misses_total", "counter", "AI响应缓存未命中数", [({}, cache.get("misses"))]),
+            format_metric("ai_cache_hit_ratio", "gauge", "AI响应缓存命中率", [({}, cache.get("hit_rate"))]),
+            format_metric("ai_cache_entries", "gauge", "AI响应缓存条目数", [({}, cache.get("size"))]),
+            format_metric("ai_coalesced_total", "counter", "合并到进行中调用的请求数",
+                          [({}, coalescing.get("coalesced"))]),
+            format_metric("ai_coalesce_ratio", "gauge", "请求合并率", [({}, coalescing.get("coalesce_rate"))])
+        ]
+
+    def _database_metrics(self) -> List[str]:
+        """将连接池和计数缓存统计转换为指标。"""
+        pool = self.database.pool_stats()
+        count_cache = self.database.count_cache_stats()
+        writes = self.database.write_stats()
+        return [
+            format_metric("db_pool_readers_in_use", "gauge", "使用中的只读连接数", [({}, pool["readers_in_use"])]),
+            format_metric("db_pool_waiters", "gauge", "等待连接的请求数", [
+                ({"kind": "reader"}, pool["reader_waiters"]),
+                ({"kind": "writer"}, pool["writer_waiters"])
+            ]),
+            format_metric("db_pool_timeouts_total", "counter", "获取连接超时次数", [({}, pool["timeouts"])]),
+            format_metric("db_count_cache_hits_total", "counter", "分页总数缓存命中数", [({}, count_cache["hits"])]),
+            format_metric("db_count_cache_misses_total", "counter", "分页总数缓存未命中数",
+                          [({}, count_cache["misses"])]),
+            format_metric("db_count_cache_hit_ratio", "gauge", "分页总数缓存命中率",
+                          [({}, count_cache["hit_rate"])]),
+            format_metric("db_write_batches_total", "counter", "写合并执行的事务数", [({}, writes.get("batches"))]),
+            format_metric("db_write_operations_total", "counter", "经写合并执行的插入/删除操作数",
+                          [({}, writes.get("operations"))]),
+            format_metric("db_write_pending", "gauge", "等待合并写入的操作数", [({}, writes.get("pending"))])
+        ]
+
+
+def create_metrics_controller(ai_service: AIService, database: Database) -> APIRouter:
+    """
+    创建指标控制器路由的工厂函数。
+
+    Args:
+        ai_service: AI服务实例
+        database: 数据库实例
+
+    Returns:
+        配置好的APIRouter
+    """
+    controller = MetricsController(ai_service, database)
+    return controller.router
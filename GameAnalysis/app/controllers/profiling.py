@@ -0,0 +1,116 @@
+"""
+慢请求剖析结果控制器。
+列出、查看和下载 ProfilingMiddleware 保存的剖析结果。
+"""
+
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Header
+from fastapi.responses import Response
+
+from app.api.response import success_response, error_response
+from app.config.config import ProfilingConfig
+from app.services.profiling import ProfileStore, check_admin_token
+
+
+class ProfilingController:
+    """/admin/profiles 接口的控制器。"""
+
+    def __init__(self, store: ProfileStore, config: ProfilingConfig):
+        """
+        初始化控制器。
+
+        Args:
+            store: 剖析结果缓冲区
+            config: 剖析配置，设置了 admin_token 时所有接口都需要 X-Admin-Token 请求头
+        """
+        self.store = store
+        self.config = config
+        self.router = APIRouter()
+        self.router.get("/profiles")(self.list_profiles)
+        self.router.get("/profiles/{profile_id}")(self.get_profile)
+        self.router.get("/profiles/{profile_id}/pstats")(self.download_pstats)
+
+    def _authorize(self, token: Optional[str]) -> None:
+        if not check_admin_token(self.config.admin_token, token):
+            raise error_response("管理令牌无效", status_code=403)
+
+    async def list_profiles(self, x_admin_token: Optional[str] = Header(None)):
+        """
+        列出保存的剖析结果摘要，最新的在前。
+
+        Returns:
+            剖析结果摘要列表和缓冲区状态
+        """
+        self._authorize(x_admin_token)
+        return success_response({
+            "profiles": self.store.summaries(),
+            "size": self.store.size,
+            "captured": self.store.captured,
+            "slow_ms": self.config.slow_ms
+        })
+
+    async def get_profile(self, profile_id: str, download: bool = False, x_admin_token: Optional[str] = Header(None)):
+        """
+        获取单个剖析结果。
+
+        Args:
+            profile_id: 剖析结果ID
+            download: 为true时以附件形式返回JSON文件
+
+        Returns:
+            包含耗时分解、区间列表和（如有）cProfile文本的剖析结果
+
+        Raises:
+            HTTPException: 剖析结果不存在或已被新结果挤出缓冲区
+        """
+        self._authorize(x_admin_token)
+        profile = self.store.get(profile_id)
+        if profile is None:
+            raise error_response("剖析结果不存在", status_code=404)
+        if not download:
+            return success_response(profile)
+        return Response(
+            content=json.dumps(profile, ensure_ascii=False, indent=2),
+            media_type="application/json",
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.json"'}
+        )
+
+    async def download_pstats(self, profile_id: str, x_admin_token: Optional[str] = Header(None)):
+        """
+        下载cProfile原始数据，可用 pstats.Stats 或 snakeviz 等工具打开。
+
+        Args:
+            profile_id: 剖析结果ID
+
+        Returns:
+            application/octet-stream 附件
+
+        Raises:
+            HTTPException: 剖析结果不存在或该请求没有运行cProfile
+        """
+        self._authorize(x_admin_token)
+        raw_stats = self.store.get_pstats(profile_id)
+        if raw_stats is None:
+            raise error_response("该剖析结果没有cProfile数据", status_code=404)
+        return Response(
+            content=raw_stats,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'}
+        )
+
+
+def create_profiling_controller(store: ProfileStore, config: ProfilingConfig) -> APIRouter:
+    """
+    创建剖析结果控制器路由的工厂函数。
+
+    Args:
+        store: 剖析结果缓冲区
+        config: 剖析配置
+
+    Returns:
+        配置好的APIRouter
+    """
+    controller = ProfilingController(store, config)
+    return controller.router
@@ -4,23 +4,59 @@ AI生成题目端点的题目控制器。
 """
 
 import time
-from typing import List, Dict, Any
-from fastapi import APIRouter, HTTPException, Depends
+import logging
+from typing import List, Dict, Any, AsyncIterator, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from app.config.config import QuestionRequest, validate_question_request
 from app.services.client import AIService
+from app.services.bulk import BulkGenerator, BulkResult
+from app.services.jobs import JobManager, JobQueueFullError, format_job, FINISHED_STATUSES
+from app.services.streaming import format_sse
+from app.services.importer import (
+    ImportResult, QuestionImporter, SUPPORTED_FORMATS, create_question_importer
+)
 from app.storage.database import Database
-from app.api.response import success_response, error_response
+from app.api.response import RETRY_LATER_ERRORS, success_response, error_response, overload_response
+
+
+logger = logging.getLogger(__name__)
+
+
+def retry_later_event(error: Exception) -> str:
+    """限流或熔断拒绝时的SSE错误事件，data 中携带建议的重试等待时间（秒）。"""
+    return format_sse("error", {"code": -1, "msg": str(error), "data": {"retry_after": error.retry_after}})
 
 
 class QuestionGenerationRequest(BaseModel):
     """AI题目生成的请求模型。"""
     keyword: str = Field(..., description="关键字")
-    model: str = Field("tongyi", description="AI模型")
+    model: str = Field("auto", description="AI提供商，auto表示自动选择")
     language: str = Field("go", description="编程语言")
     count: int = Field(3, ge=3, le=10, description="题目数量")
     type: int = Field(1, ge=1, le=3, description="题目类型")
+    no_cache: bool = Field(False, description="跳过缓存，强制重新生成")
+
+
+class BulkGenerationRequest(BaseModel):
+    """大批量AI题目生成的请求模型。"""
+    keyword: str = Field(..., description="关键字")
+    model: str = Field("auto", description="AI提供商，auto表示自动选择")
+    language: str = Field("go", description="编程语言")
+    count: int = Field(..., ge=3, description="题目总数")
+    type: int = Field(1, ge=1, le=3, description="题目类型")
+
+
+class JobSubmitRequest(BaseModel):
+    """后台生成任务的请求模型。"""
+    keyword: str = Field(..., description="关键字")
+    model: str = Field("auto", description="AI提供商，auto表示自动选择")
+    language: str = Field("go", description="编程语言")
+    count: int = Field(3, ge=3, description="题目总数")
+    type: int = Field(1, ge=1, le=3, description="题目类型")
+    no_cache: bool = Field(False, description="跳过缓存，强制重新生成")
 
 
 class BatchInsertRequest(BaseModel):
@@ -31,23 +67,46 @@ class BatchInsertRequest(BaseModel):
 class QuestionController:
     """题目相关操作的控制器。"""
 
-    def __init__(self, ai_service: AIService, database: Database):
+    def __init__(
+        self,
+        ai_service: AIService,
+        database: Database,
+        bulk_generator: Optional[BulkGenerator] = None,
+        job_manager: Optional[JobManager] = None,
+        importer: Optional[QuestionImporter] = None
+    ):
         """
         初始化题目控制器。
 
         Args:
             ai_service: AI服务实例
             database: 数据库实例
+            bulk_generator: 批量生成器，默认使用默认参数包装 ai_service
+            job_manager: 后台任务管理器，未提供时不注册任务路由
+            importer: 题库导入器，默认按数据库配置创建
         """
         self.ai_service = ai_service
         self.database = database
+        self.bulk_generator = bulk_generator or BulkGenerator(ai_service)
+        self.job_manager = job_manager
+        self.importer = importer or create_question_importer(database)
         self.router = APIRouter()
         self._setup_routes()
 
     def _setup_routes(self):
         """设置API路由。"""
         self.router.post("/CreateByAI")(self.generate_question)
+        self.router.post("/CreateByAIStream")(self.generate_question_stream)
+        self.router.post("/CreateByAIBulk")(self.generate_bulk)
+        self.router.post("/CreateByAIBulkStream")(self.generate_bulk_stream)
+        if self.job_manager:
+            self.router.post("/jobs")(self.submit_job)
+            self.router.get("/jobs/{job_id}")(self.get_job)
+            self.router.get("/jobs/{job_id}/result")(self.get_job_result)
+            self.router.get("/jobs/{job_id}/events")(self.job_events)
         self.router.post("/batch-insert")(self.add_questions)
+        self.router.post("/import")(self.import_questions)
+        self.router.get("/ai-stats")(self.ai_stats)
     
     async def generate_question(self, request: QuestionGenerationRequest):
         """
@@ -59,8 +118,6 @@ class QuestionController:
         Returns:
             生成的题目响应
         """
-        start_time = time.time()
-
         try:
             # 转换为内部请求格式
             ai_request = QuestionRequest(
@@ -68,7 +125,8 @@ class QuestionController:
                 model=request.model,
                 language=request.language,
                 count=request.count,
-                type=request.type
+                type=request.type,
+                bypass_cache=request.no_cache
             )
 
             # 验证请求
@@ -92,11 +150,276 @@ class QuestionController:
                 }
             })
 
+        except RETRY_LATER_ERRORS as e:
+            raise overload_response(e)
         except ValueError as e:
             raise error_response(f"参数错误: {str(e)}", 400)
         except Exception as e:
+            logger.exception("生成题目失败")
             raise error_response(f"生成失败: {str(e)}", 500)
     
+    async def generate_question_stream(self, request: QuestionGenerationRequest):
+        """
+        使用AI服务流式生成题目，通过Server-Sent Events逐个推送。
+
+        事件类型：question（单个题目）、error（生成失败）、done（全部完成）。
+
+        Args:
+            request: 题目生成请求
+
+        Returns:
+            text/event-stream 流式响应
+        """
+        try:
+            ai_request = validate_question_request(QuestionRequest(
+                keyword=request.keyword,
+                model=request.model,
+                language=request.language,
+                count=request.count,
+                type=request.type,
+                bypass_cache=request.no_cache
+            ))
+        except ValueError as e:
+            raise error_response(f"参数错误: {str(e)}", 400)
+
+        return StreamingResponse(
+            self._stream_events(ai_request),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no"
+            }
+        )
+
+    async def _stream_events(self, ai_request: QuestionRequest) -> AsyncIterator[str]:
+        """将生成的题目转换为SSE事件流。"""
+        start_time = time.time()
+        count = 0
+
+        try:
+            async for q in self.ai_service.generate_question_stream(ai_request):
+                yield format_sse("question", {
+                    "index": count,
+                    "title": q.title,
+                    "answers": q.answers,
+                    "rights": q.rights
+                })
+                count += 1
+        except RETRY_LATER_ERRORS as e:
+            yield retry_later_event(e)
+            return
+        except Exception as e:
+            logger.exception("流式生成题目失败")
+            yield format_sse("error", {"code": -1, "msg": f"生成失败: {str(e)}", "data": None})
+            return
+
+        yield format_sse("done", {
+            "count": count,
+            "elapsed_ms": round((time.time() - start_time) * 1000)
+        })
+
+    def _to_bulk_request(self, request: BulkGenerationRequest) -> QuestionRequest:
+        """
+        转换并验证批量生成请求。
+
+        Raises:
+            ValueError: 如果验证失败
+        """
+        if request.count > self.bulk_generator.max_count:
+            raise ValueError(f"题目数量不能超过{self.bulk_generator.max_count}道")
+
+        # 单次请求数量由分片决定，这里只验证其余参数
+        return validate_question_request(QuestionRequest(
+            keyword=request.keyword,
+            model=request.model,
+            language=request.language,
+            count=3,
+            type=request.type
+        ))
+
+    async def generate_bulk(self, request: BulkGenerationRequest):
+        """
+        大批量生成题目：拆分为多个分片并发调用AI服务，合并去重后返回。
+
+        Args:
+            request: 批量生成请求
+
+        Returns:
+            生成的题目及分片统计
+        """
+        try:
+            ai_request = self._to_bulk_request(request)
+        except ValueError as e:
+            raise error_response(f"参数错误: {str(e)}", 400)
+
+        try:
+            result = await self.bulk_generator.generate(ai_request, request.count)
+        except RETRY_LATER_ERRORS as e:
+            raise overload_response(e)
+        except ValueError as e:
+            raise error_response(f"生成失败: {str(e)}", 500)
+
+        return success_response({
+            "aiRes": {
+                "questions": [
+                    {
+                        "title": q.title,
+                        "answers": q.answers,
+                        "rights": q.rights
+                    }
+                    for q in result.questions
+                ]
+            },
+            "stats": result.summary()
+        })
+
+    async def generate_bulk_stream(self, request: BulkGenerationRequest):
+        """
+        大批量流式生成题目，分片完成后立即通过SSE推送去重后的题目。
+
+        事件类型：question、error、done（携带分片统计）。
+
+        Args:
+            request: 批量生成请求
+
+        Returns:
+            text/event-stream 流式响应
+        """
+        try:
+            ai_request = self._to_bulk_request(request)
+        except ValueError as e:
+            raise error_response(f"参数错误: {str(e)}", 400)
+
+        return StreamingResponse(
+            self._stream_bulk_events(ai_request, request.count),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no"
+            }
+        )
+
+    async def _stream_bulk_events(self, ai_request: QuestionRequest, total: int) -> AsyncIterator[str]:
+        """将批量生成的题目转换为SSE事件流。"""
+        result = BulkResult(questions=[], requested=total)
+        count = 0
+
+        try:
+            async for q in self.bulk_generator.iter_questions(ai_request, total, result):
+                yield format_sse("question", {
+                    "index": count,
+                    "title": q.title,
+                    "answers": q.answers,
+                    "rights": q.rights
+                })
+                count += 1
+        except Exception as e:
+            logger.exception("流式生成题目失败")
+            yield format_sse("error", {"code": -1, "msg": f"生成失败: {str(e)}", "data": None})
+            return
+
+        if count == 0 and result.errors:
+            if result.rejection is not None:
+                yield retry_later_event(result.rejection)
+            else:
+                yield format_sse("error", {"code": -1, "msg": f"生成失败: {result.errors[-1]}", "data": None})
+            return
+
+        yield format_sse("done", result.summary())
+
+    async def submit_job(self, request: JobSubmitRequest):
+        """
+        提交后台生成任务，立即返回任务ID。
+
+        Args:
+            request: 任务请求
+
+        Returns:
+            包含任务ID的响应
+        """
+        try:
+            job_id = await self.job_manager.submit(
+                QuestionRequest(
+                    keyword=request.keyword,
+                    model=request.model,
+                    language=request.language,
+                    type=request.type,
+                    bypass_cache=request.no_cache
+                ),
+                request.count
+            )
+        except ValueError as e:
+            raise error_response(f"参数错误: {str(e)}", 400)
+        except JobQueueFullError as e:
+            raise error_response(str(e), 503)
+        except RETRY_LATER_ERRORS as e:
+            raise overload_response(e)
+        except Exception as e:
+            logger.exception("提交任务失败")
+            raise error_response(f"提交任务失败: {str(e)}", 500)
+
+        return success_response({"job_id": job_id, "status": "pending"}, "任务已提交")
+
+    async def _load_job(self, job_id: str) -> Dict[str, Any]:
+        """读取任务，不存在时返回404。"""
+        job = await self.job_manager.get(job_id)
+        if job is None:
+            raise error_response("任务不存在", 404)
+        return job
+
+    async def get_job(self, job_id: str):
+        """
+        查询任务状态、进度和耗时。
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            任务状态响应
+        """
+        return success_response(format_job(await self._load_job(job_id)))
+
+    async def get_job_result(self, job_id: str):
+        """
+        获取任务生成的题目。任务未结束时返回409。
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            包含题目的任务响应
+        """
+        job = await self._load_job(job_id)
+        if job["status"] not in FINISHED_STATUSES:
+            raise error_response("任务尚未完成", 409)
+        return success_response(format_job(job, include_result=True))
+
+    async def job_events(self, job_id: str):
+        """
+        通过SSE订阅任务进度，每次状态变化推送 progress 事件，结束时推送 done 事件。
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            text/event-stream 流式响应
+        """
+        await self._load_job(job_id)
+        return StreamingResponse(
+            self._stream_job_events(job_id),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no"
+            }
+        )
+
+    async def _stream_job_events(self, job_id: str) -> AsyncIterator[str]:
+        """将任务状态变化转换为SSE事件流。"""
+        async for job in self.job_manager.watch(job_id):
+            finished = job["status"] in FINISHED_STATUSES
+            yield format_sse("done" if finished else "progress", format_job(job))
+
     async def add_questions(self, request: BatchInsertRequest):
         """
         批量插入题目到数据库。
@@ -133,20 +456,90 @@ class QuestionController:
 
         except ValueError as e:
             raise error_response(f"参数错误: {str(e)}", 400)
+        except RETRY_LATER_ERRORS as e:
+            raise overload_response(e)
         except Exception as e:
+            logger.exception("存储题目失败")
             raise error_response(f"存储失败: {str(e)}", 500)
 
+    async def import_questions(
+        self,
+        request: Request,
+        format: Optional[str] = Query(None, pattern="^(ndjson|csv)$", description="导入格式，默认按Content-Type判断"),
+        chunk_size: Optional[int] = Query(None, ge=1, le=50000, description="每个事务写入的行数")
+    ):
+        """
+        流式导入题库。
+
+        请求体为NDJSON（每行一个题目对象）或带表头的CSV（answers/rights 列为JSON数组），
+        边接收边解析校验，有效行分批在独立事务中写入；无效行记录行号和原因后跳过，不中断导入。
+
+        Args:
+            request: 原始请求，从中逐块读取请求体
+            format: ndjson 或 csv
+            chunk_size: 每个事务写入的行数，默认 DB_IMPORT_CHUNK_SIZE
+
+        Returns:
+            导入行数、成功数、失败行错误和吞吐统计
+        """
+        fmt = format or self._import_format(request.headers.get("content-type", ""))
+        if fmt is None:
+            raise error_response(
+                f"无法判断导入格式，请指定 format 参数（{'/'.join(SUPPORTED_FORMATS)}）", 400
+            )
+
+        result = ImportResult(format=fmt)
+        try:
+            await self.importer.run(request.stream(), fmt, result, chunk_size)
+        except ValueError as e:
+            raise error_response(f"参数错误: {str(e)}", 400)
+        except RETRY_LATER_ERRORS as e:
+            raise overload_response(e)
+        except Exception as e:
+            logger.exception("题库导入中断", extra={"inserted": result.inserted})
+            raise error_response(f"导入中断: {str(e)}（已提交 {result.inserted} 道题目）", 500)
+
+        return success_response(result.summary(), "导入完成")
+
+    @staticmethod
+    def _import_format(content_type: str) -> Optional[str]:
+        """根据Content-Type判断导入格式。"""
+        media_type = content_type.split(";")[0].strip().lower()
+        if media_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+            return "ndjson"
+        if media_type in ("text/csv", "application/csv"):
+            return "csv"
+        return None
+
+    async def ai_stats(self):
+        """
+        获取AI服务上游连接统计。
+
+        Returns:
+            连接复用统计响应
+        """
+        return success_response(await self.ai_service.stats())
+
 
-def create_question_controller(ai_service: AIService, database: Database) -> APIRouter:
+def create_question_controller(
+    ai_service: AIService,
+    database: Database,
+    bulk_generator: Optional[BulkGenerator] = None,
+    job_manager: Optional[JobManager] = None,
+    importer: Optional[QuestionImporter] = None
+) -> APIRouter:
     """
     创建题目控制器路由的工厂函数。
 
     Args:
         ai_service: AI服务实例
         database: 数据库实例
+        bulk_generator: 批量生成器
+        job_manager: 后台任务管理器
+        importer: 题库导入器
 
     Returns:
         配置好的APIRouter
     """
-    controller = QuestionController(ai_service, database)
+    controller = QuestionController(ai_service, database, bulk_generator, job_manager, importer)
     return controller.router
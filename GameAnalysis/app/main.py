@@ -8,21 +8,42 @@ import logging
 from pathlib import Path
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exception_handlers import http_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, JSONResponse
 
-from app.config.config import load_config
+from app.config.config import (
+    load_config, load_database_config, load_diagnostics_config, load_logging_config, load_profiling_config
+)
 from app.services.client import create_ai_service
+from app.services.bulk import create_bulk_generator
+from app.services.jobs import create_job_manager
 from app.storage.database import init_database
 from app.controllers.question import create_question_controller
 from app.controllers.actions import create_actions_controller
+from app.controllers.metrics import create_metrics_controller
+from app.controllers.profiling import create_profiling_controller
+from app.controllers.diagnostics import create_diagnostics_controller
+from app.services.metrics import MetricsMiddleware
+from app.services.logs import RequestContextMiddleware, setup_logging
+from app.services.profiling import ProfilingMiddleware, create_profile_store
+from app.services.serialization import FastJSONResponse
+from app.storage.pool import PoolTimeoutError
+from app.api.response import overload_response
 
 
+logger = logging.getLogger(__name__)
+
 # Global variables for dependency injection
 ai_service = None
+bulk_generator = None
+job_manager = None
 database = None
+profiling_config = None
+profile_store = None
+diagnostics_config = None
 
 
 @asynccontextmanager
@@ -31,49 +52,59 @@ async def lifespan(app: FastAPI):
     Application lifespan manager.
     Handles startup and shutdown events.
     """
-    global ai_service, database
+    global ai_service, bulk_generator, job_manager, database, diagnostics_config
 
     try:
         # Load configuration
         config = load_config()
-        logging.info("配置加载成功")
+        logger.info("配置加载成功")
 
         # Initialize services
         ai_service = create_ai_service(config)
-        logging.info("AI服务初始化成功")
+        await ai_service.start()
+        bulk_generator = create_bulk_generator(ai_service, config)
+        logger.info("AI服务初始化成功")
 
         # Initialize database
-        import os
-        db_path = os.path.abspath("question_service.db")
-        print(f"DEBUG: 数据库路径: {db_path}")
-        print(f"DEBUG: 当前工作目录: {os.getcwd()}")
-        print(f"DEBUG: 数据库文件是否存在: {os.path.exists(db_path)}")
+        db_config = load_database_config()
+        db_path = os.path.abspath(db_config.path)
+        logger.info("初始化数据库", extra={"db_path": db_path, "exists": os.path.exists(db_path)})
+
+        database = await init_database(db_config.path, db_config)
 
-        database = await init_database("question_service.db")
-        logging.info("数据库初始化成功")
+        # Opt-in query plan diagnostics record read queries from startup
+        diagnostics_config = load_diagnostics_config()
+        if diagnostics_config.enabled:
+            database.enable_query_log(diagnostics_config.query_log_size)
 
-        # Debug: Test database connection
+        # Background generation jobs need both the AI service and the database
+        job_manager = create_job_manager(ai_service, bulk_generator, database, config)
+        await job_manager.start()
+
+        # Verify the database is readable before accepting requests
         try:
-            test_questions, test_total = await database.get_questions_paginated(page=1, page_size=3)
-            print(f"DEBUG: 启动时数据库测试: 总数={test_total}, 问题数量={len(test_questions)}")
-            logging.info(f"数据库测试: 总数={test_total}, 问题数量={len(test_questions)}")
-        except Exception as e:
-            print(f"DEBUG: 启动时数据库测试失败: {e}")
-            logging.error(f"数据库测试失败: {e}")
+            total = await database.count_questions()
+            logger.info("数据库初始化成功", extra={"schema_version": database.schema_version, "questions": total})
+        except Exception:
+            logger.exception("数据库测试失败")
 
         # Setup routes after services are initialized
         setup_api_routes(app)
 
         yield
 
-    except Exception as e:
-        logging.error(f"应用启动失败: {e}")
+    except Exception:
+        logger.exception("应用启动失败")
         raise
     finally:
         # Cleanup
+        if job_manager:
+            await job_manager.close()
+        if ai_service:
+            await ai_service.close()
         if database:
             await database.close()
-        logging.info("应用关闭完成")
+        logger.info("应用关闭完成")
 
 
 def create_app() -> FastAPI:
@@ -83,11 +114,20 @@ def create_app() -> FastAPI:
     Returns:
         Configured FastAPI application
     """
+    # Structured logging is configured first so startup events are captured too
+    global profiling_config, profile_store
+
+    log_config = load_logging_config()
+    setup_logging(log_config)
+    profiling_config = load_profiling_config()
+    profile_store = create_profile_store(profiling_config)
+
     app = FastAPI(
         title="Question Service API",
         description="AI-powered programming question generation service",
         version="1.0.0",
-        lifespan=lifespan
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse
     )
     
     # CORS middleware configuration
@@ -97,8 +137,29 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Request-ID"],
     )
+
+    # Request metrics
+    app.add_middleware(MetricsMiddleware)
+
+    # Opt-in slow request profiling
+    if profile_store is not None:
+        app.add_middleware(
+            ProfilingMiddleware,
+            store=profile_store,
+            slow_ms=profiling_config.slow_ms,
+            admin_token=profiling_config.admin_token
+        )
+
+    # Correlation IDs; added last so the ID is bound for every other middleware
+    app.add_middleware(RequestContextMiddleware, debug_sample_rate=log_config.debug_sample_rate)
     
+    # Pool exhaustion on routes without their own handling becomes 503 + Retry-After
+    @app.exception_handler(PoolTimeoutError)
+    async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+        return await http_exception_handler(request, overload_response(exc))
+
     # Health check endpoint
     @app.get("/api/health")
     async def health_check():
@@ -120,10 +181,10 @@ def setup_api_routes(app: FastAPI):
     Args:
         app: FastAPI application instance
     """
-    global ai_service, database
+    global ai_service, bulk_generator, job_manager, database, profiling_config, profile_store, diagnostics_config
 
     # Question generation routes
-    question_router = create_question_controller(ai_service, database)
+    question_router = create_question_controller(ai_service, database, bulk_generator, job_manager)
     app.include_router(
         question_router,
         prefix="/api/questions",
@@ -145,6 +206,32 @@ def setup_api_routes(app: FastAPI):
         tags=["questions"]
     )
 
+    # Prometheus metrics
+    metrics_router = create_metrics_controller(ai_service, database)
+    app.include_router(
+        metrics_router,
+        prefix="/api",
+        tags=["metrics"]
+    )
+
+    # Slow request profiles, only when profiling is enabled
+    if profile_store is not None:
+        profiling_router = create_profiling_controller(profile_store, profiling_config)
+        app.include_router(
+            profiling_router,
+            prefix="/api/admin",
+            tags=["admin"]
+        )
+
+    # Query plan diagnostics, only when explicitly enabled
+    if diagnostics_config.enabled:
+        diagnostics_router = create_diagnostics_controller(database, diagnostics_config)
+        app.include_router(
+            diagnostics_router,
+            prefix="/api/admin",
+            tags=["admin"]
+        )
+
 
 def setup_static_files(app: FastAPI):
     """
@@ -183,9 +270,9 @@ def setup_static_files(app: FastAPI):
                 return FileResponse(index_path)
             raise HTTPException(status_code=404, detail="Frontend not found")
         
-        logging.info(f"已加载静态资源: {dist_path}")
+        logger.info("已加载静态资源", extra={"path": str(dist_path)})
     else:
-        logging.info(f"未找到静态资源目录: {dist_path}")
+        logger.info("未找到静态资源目录", extra={"path": str(dist_path)})
 
 
 # Create the FastAPI application
@@ -195,15 +282,9 @@ app = create_app()
 if __name__ == "__main__":
     import uvicorn
     
-    # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-    
     # Run the application
     port = int(os.getenv("PORT", "8080"))
-    logging.info(f"服务启动于端口 {port}")
+    logger.info("服务启动", extra={"port": port})
     
     uvicorn.run(
         "main:app",
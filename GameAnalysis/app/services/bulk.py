@@ -0,0 +1,259 @@
+"""
+大批量AI题目生成。
+将超过单次上限的请求拆分为多个分片并发生成，合并并去重结果。
+"""
+
+import re
+import time
+import asyncio
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Union
+
+from app.config.config import AIConfig, QuestionRequest, QuestionResponse, validate_question_request
+from app.services.client import AIService
+from app.services.limiter import RateLimitExceededError
+from app.services.resilience import CircuitOpenError, RetryPolicy, create_retry_policy
+
+
+# 单次上游请求允许的题目数量范围（与 validate_question_request 一致）
+MIN_CHUNK_SIZE = 3
+MAX_CHUNK_SIZE = 10
+
+# 去重时忽略空白和常见标点
+_TITLE_NOISE = re.compile(r"[\s?？。.!！,，:：;；\"'“”‘’`]+")
+
+
+def normalize_title(title: str) -> str:
+    """规范化题目标题用于去重比较。"""
+    return _TITLE_NOISE.sub("", title).lower()
+
+
+def split_counts(total: int, chunk_size: int = MAX_CHUNK_SIZE) -> List[int]:
+    """
+    将题目总数尽量均匀地拆分为若干分片。
+
+    Args:
+        total: 题目总数，至少为 MIN_CHUNK_SIZE
+        chunk_size: 每个分片的最大题目数
+
+    Returns:
+        每个分片的题目数量列表，每项都在 MIN_CHUNK_SIZE 到 chunk_size 之间
+
+    Raises:
+        ValueError: 如果总数小于单次最小数量
+    """
+    if total < MIN_CHUNK_SIZE:
+        raise ValueError(f"题目数量不能少于{MIN_CHUNK_SIZE}道")
+
+    chunks = -(-total // chunk_size)
+    base, extra = divmod(total, chunks)
+    return [base + 1 if i < extra else base for i in range(chunks)]
+
+
+@dataclass
+class BulkResult:
+    """批量生成的合并结果。"""
+    questions: List[QuestionResponse]
+    requested: int
+    chunks: int = 0
+    failed_chunks: int = 0
+    retries: int = 0
+    duplicates_removed: int = 0
+    elapsed_ms: int = 0
+    errors: List[str] = field(default_factory=list)
+    # 最近一次被限流或熔断拒绝的异常，全部失败时由调用方映射为 429/503
+    rejection: Optional[Union[RateLimitExceededError, CircuitOpenError]] = None
+
+    def summary(self) -> Dict[str, Any]:
+        """返回不含题目列表的统计信息。"""
+        return {
+            "requested": self.requested,
+            "generated": len(self.questions),
+            "chunks": self.chunks,
+            "failed_chunks": self.failed_chunks,
+            "retries": self.retries,
+            "duplicates_removed": self.duplicates_removed,
+            "elapsed_ms": self.elapsed_ms,
+            "errors": self.errors
+        }
+
+
+class BulkGenerator:
+    """并发分片生成器。"""
+
+    def __init__(
+        self,
+        ai_service: AIService,
+        concurrency: int = 4,
+        chunk_retries: int = 2,
+        max_rounds: int = 3,
+        max_count: int = 200,
+        retry_policy: Optional[RetryPolicy] = None
+    ):
+        """
+        初始化批量生成器。
+
+        Args:
+            ai_service: 实际生成题目的AI服务
+            concurrency: 同时进行的上游请求数上限
+            chunk_retries: 单个分片失败后的最大重试次数
+            max_rounds: 去重后数量不足时补充生成的最多轮数（含首轮）
+            max_count: 单次批量生成允许的最大题目数
+            retry_policy: 分片重试前的退避策略
+        """
+        self.ai_service = ai_service
+        self.max_count = max_count
+        self.concurrency = concurrency
+        self.chunk_retries = chunk_retries
+        self.max_rounds = max_rounds
+        self.retry_policy = retry_policy or RetryPolicy()
+
+    async def _run_chunk(
+        self,
+        req: QuestionRequest,
+        count: int,
+        semaphore: asyncio.Semaphore,
+        result: BulkResult
+    ) -> List[QuestionResponse]:
+        """
+        生成单个分片，失败时按退避策略等待后仅重试该分片。
+
+        被限流或熔断拒绝时不再重试：上游刚被判定为过载或不可用，立即重试只会加重负担。
+        """
+        # 分片之间参数相同，必须跳过响应缓存，否则会得到完全相同的题目
+        chunk_req = replace(req, count=count, bypass_cache=True)
+
+        last_error: Optional[Exception] = None
+        for attempt in range(self.chunk_retries + 1):
+            if attempt:
+                result.retries += 1
+                await asyncio.sleep(self.retry_policy.delay(attempt))
+            try:
+                async with semaphore:
+                    response = await self.ai_service.generate_question(chunk_req)
+                return response.questions
+            except asyncio.CancelledError:
+                raise
+            except (RateLimitExceededError, CircuitOpenError) as e:
+                last_error = e
+                result.rejection = e
+                break
+            except Exception as e:
+                last_error = e
+
+        result.failed_chunks += 1
+        result.errors.append(f"分片（{count}道）生成失败：{last_error}")
+        return []
+
+    async def iter_questions(
+        self,
+        req: QuestionRequest,
+        total: int,
+        result: Optional[BulkResult] = None
+    ) -> AsyncIterator[QuestionResponse]:
+        """
+        并发生成并按完成顺序逐个返回去重后的题目。
+
+        Args:
+            req: 题目生成请求（count 字段被忽略）
+            total: 需要生成的题目总数
+            result: 用于累计统计信息的结果对象
+
+        Yields:
+            QuestionResponse: 去重后的题目，最多 total 道
+
+        Raises:
+            ValueError: 如果数量超出范围或请求无效
+        """
+        if total < MIN_CHUNK_SIZE or total > self.max_count:
+            raise ValueError(f"题目数量必须在{MIN_CHUNK_SIZE}-{self.max_count}之间")
+
+        req = validate_question_request(replace(req, count=MIN_CHUNK_SIZE))
+        if result is None:
+            result = BulkResult(questions=[], requested=total)
+
+        start_time = time.time()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        seen: Set[str] = set()
+        produced = 0
+
+        for _ in range(self.max_rounds):
+            remaining = total - produced
+            if remaining <= 0:
+                break
+
+            counts = split_counts(max(remaining, MIN_CHUNK_SIZE))
+            result.chunks += len(counts)
+            failed_before = result.failed_chunks
+            tasks = [
+                asyncio.ensure_future(self._run_chunk(req, count, semaphore, result))
+                for count in counts
+            ]
+            try:
+                for finished in asyncio.as_completed(tasks):
+                    for question in await finished:
+                        if produced >= total:
+                            continue
+                        key = normalize_title(question.title)
+                        if key in seen:
+                            result.duplicates_removed += 1
+                            continue
+                        seen.add(key)
+                        produced += 1
+                        result.questions.append(question)
+                        yield question
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+            if result.failed_chunks - failed_before == len(counts):
+                # 本轮分片全部失败时不再补充
+                break
+
+        result.elapsed_ms = round((time.time() - start_time) * 1000)
+
+    async def generate(self, req: QuestionRequest, total: int) -> BulkResult:
+        """
+        并发生成并返回合并后的结果。
+
+        Args:
+            req: 题目生成请求（count 字段被忽略）
+            total: 需要生成的题目总数
+
+        Returns:
+            BulkResult: 合并去重后的题目和统计信息
+
+        Raises:
+            ValueError: 如果数量超出范围或所有分片都生成失败
+            RateLimitExceededError: 如果所有分片都失败且有分片被限流拒绝
+            CircuitOpenError: 如果所有分片都失败且有分片被熔断拒绝
+        """
+        result = BulkResult(questions=[], requested=total)
+        async for _ in self.iter_questions(req, total, result):
+            pass
+
+        if not result.questions and result.errors:
+            if result.rejection is not None:
+                raise result.rejection
+            raise ValueError(result.errors[-1])
+        return result
+
+
+def create_bulk_generator(ai_service: AIService, config: AIConfig) -> BulkGenerator:
+    """
+    创建批量生成器的工厂函数。
+
+    Args:
+        ai_service: AI服务实例
+        config: AI配置
+
+    Returns:
+        BulkGenerator: 配置好的批量生成器
+    """
+    return BulkGenerator(
+        ai_service,
+        concurrency=config.bulk_concurrency,
+        chunk_retries=config.bulk_chunk_retries,
+        max_count=config.bulk_max_count,
+        retry_policy=create_retry_policy(config)
+    )
@@ -0,0 +1,274 @@
+"""
+AI题目生成的响应缓存。
+相同请求在有效期内直接返回缓存结果，避免重复调用上游模型。
+"""
+
+import json
+import time
+import hashlib
+import asyncio
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Dict, Optional, Tuple
+import aiosqlite
+
+from app.config.config import AIConfig, QuestionRequest, QuestionResponses, QuestionResponse
+from app.services.serialization import dumps_text, loads
+
+
+def normalize_keyword(keyword: str) -> str:
+    """规范化关键字：去除首尾空白、合并连续空白并转为小写。"""
+    return " ".join(keyword.split()).lower()
+
+
+def build_cache_key(req: QuestionRequest, prompt: Optional[str] = None) -> str:
+    """
+    根据规范化的请求（及可选的提示词）生成缓存键。
+
+    Args:
+        req: 已应用默认值的题目生成请求
+        prompt: 发送给模型的提示词，提示词模板变化时缓存随之失效
+
+    Returns:
+        SHA-256十六进制缓存键
+    """
+    parts = {
+        "keyword": normalize_keyword(req.keyword),
+        "model": req.model,
+        "language": req.language,
+        "type": req.type,
+        "count": req.count
+    }
+    if prompt is not None:
+        parts["prompt"] = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def dump_responses(responses: QuestionResponses) -> str:
+    """将题目响应序列化为JSON字符串。"""
+    return dumps_text(asdict(responses))
+
+
+def load_responses(data: str) -> QuestionResponses:
+    """从JSON字符串还原题目响应。"""
+    items = loads(data)["questions"]
+    return QuestionResponses(questions=[QuestionResponse(**item) for item in items])
+
+
+class QuestionCache(ABC):
+    """题目响应缓存的抽象基类。"""
+
+    backend = ""
+
+    def __init__(self, ttl: float, max_entries: int):
+        """
+        初始化缓存公共设置。
+
+        Args:
+            ttl: 缓存有效期（秒）
+            max_entries: 最多缓存的条目数，超出时淘汰最久未使用的条目
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def open(self) -> None:
+        """打开缓存持有的资源。"""
+        pass
+
+    async def close(self) -> None:
+        """释放缓存持有的资源。"""
+        pass
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[QuestionResponses]:
+        """读取未过期的缓存结果。"""
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: QuestionResponses) -> None:
+        """写入缓存结果。"""
+        pass
+
+    @abstractmethod
+    async def size(self) -> int:
+        """当前缓存条目数。"""
+        pass
+
+    async def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计。
+
+        Returns:
+            包含条目数、命中数和命中率的字典
+        """
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "size": await self.size(),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions
+        }
+
+
+class MemoryQuestionCache(QuestionCache):
+    """进程内LRU缓存。"""
+
+    backend = "memory"
+
+    def __init__(self, ttl: float, max_entries: int):
+        super().__init__(ttl, max_entries)
+        self._entries: "OrderedDict[str, Tuple[QuestionResponses, float]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[QuestionResponses]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: QuestionResponses) -> None:
+        self._entries[key] = (value, time.time() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def size(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteQuestionCache(QuestionCache):
+    """基于SQLite的持久化LRU缓存，服务重启后仍然有效。"""
+
+    backend = "sqlite"
+
+    CREATE_SQL = """
+    CREATE TABLE IF NOT EXISTS ai_cache (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        last_access REAL NOT NULL
+    )
+    """
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        """
+        初始化SQLite缓存。
+
+        Args:
+            path: 缓存数据库文件路径
+            ttl: 缓存有效期（秒）
+            max_entries: 最多缓存的条目数
+        """
+        super().__init__(ttl, max_entries)
+        self.path = path
+        self._db: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def open(self) -> None:
+        if self._db is not None:
+            return
+        async with self._lock:
+            if self._db is not None:
+                return
+            db = await aiosqlite.connect(self.path)
+            await db.execute("PRAGMA journal_mode = WAL")
+            await db.execute("PRAGMA synchronous = NORMAL")
+            await db.execute(self.CREATE_SQL)
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ai_cache_last_access ON ai_cache(last_access)"
+            )
+            await db.execute("DELETE FROM ai_cache WHERE expires_at <= ?", (time.time(),))
+            await db.commit()
+            self._db = db
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def get(self, key: str) -> Optional[QuestionResponses]:
+        await self.open()
+        now = time.time()
+        async with self._lock:
+            cursor = await self._db.execute(
+                "SELECT value, expires_at FROM ai_cache WHERE key = ?", (key,)
+            )
+            row = await cursor.fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            if now >= row[1]:
+                await self._db.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+                await self._db.commit()
+                self.misses += 1
+                return None
+
+            await self._db.execute(
+                "UPDATE ai_cache SET last_access = ? WHERE key = ?", (now, key)
+            )
+            await self._db.commit()
+
+        self.hits += 1
+        return load_responses(row[0])
+
+    async def set(self, key: str, value: QuestionResponses) -> None:
+        await self.open()
+        now = time.time()
+        async with self._lock:
+            await self._db.execute(
+                "INSERT OR REPLACE INTO ai_cache (key, value, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, dump_responses(value), now + self.ttl, now)
+            )
+            cursor = await self._db.execute(
+                "DELETE FROM ai_cache WHERE key IN ("
+                "SELECT key FROM ai_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self.evictions += max(cursor.rowcount, 0)
+            await self._db.commit()
+
+    async def size(self) -> int:
+        await self.open()
+        async with self._lock:
+            cursor = await self._db.execute("SELECT COUNT(*) FROM ai_cache")
+            row = await cursor.fetchone()
+        return row[0] if row else 0
+
+
+def create_question_cache(config: AIConfig) -> Optional[QuestionCache]:
+    """
+    根据配置创建题目响应缓存。
+
+    Args:
+        config: AI配置
+
+    Returns:
+        QuestionCache实例，缓存关闭时返回None
+    """
+    if config.cache_backend == "memory":
+        return MemoryQuestionCache(config.cache_ttl, config.cache_max_entries)
+    if config.cache_backend == "sqlite":
+        return SQLiteQuestionCache(config.cache_path, config.cache_ttl, config.cache_max_entries)
+    return None
@@ -4,10 +4,17 @@ AI服务客户端接口和实现。
 """
 
 from abc import ABC, abstractmethod
-from typing import Optional
+from dataclasses import replace
+from typing import Any, AsyncIterator, Callable, Dict, Optional
 
-from app.config.config import AIConfig, QuestionRequest, QuestionResponses, validate_question_request
-from app.services.deepseek import DeepSeekClient
+from app.config.config import (
+    AIConfig, QuestionRequest, QuestionResponse, QuestionResponses, validate_question_request
+)
+from app.services.router import ProviderRouter, create_provider_router
+from app.services.singleflight import SingleFlight
+from app.services.cache import (
+    QuestionCache, build_cache_key, create_question_cache, normalize_keyword
+)
 
 
 class AIService(ABC):
@@ -18,6 +25,27 @@ class AIService(ABC):
         """使用AI服务生成题目。"""
         pass
 
+    async def generate_question_stream(self, req: QuestionRequest) -> AsyncIterator[QuestionResponse]:
+        """
+        流式生成题目。默认实现等待完整结果后逐个返回，
+        支持流式的服务应覆盖此方法。
+        """
+        response = await self.generate_question(req)
+        for question in response.questions:
+            yield question
+
+    async def start(self) -> None:
+        """启动服务持有的长期资源（如HTTP连接池）。"""
+        pass
+
+    async def close(self) -> None:
+        """释放服务持有的长期资源。"""
+        pass
+
+    async def stats(self) -> Dict[str, Any]:
+        """获取服务运行统计。"""
+        return {}
+
 
 class AIServiceImpl(AIService):
     """支持多个提供商的AI服务实现。"""
@@ -27,17 +55,30 @@ class AIServiceImpl(AIService):
         使用配置初始化AI服务。
 
         Args:
-            config: 包含API密钥和设置的AI配置
+            config: 包含提供商、限流和路由设置的AI配置
+        """
+        self.router: ProviderRouter = create_provider_router(config)
+
+    async def start(self) -> None:
+        """创建各提供商的共享HTTP客户端。"""
+        await self.router.start()
+
+    async def close(self) -> None:
+        """关闭各提供商的HTTP客户端。"""
+        await self.router.close()
+
+    async def stats(self) -> Dict[str, Any]:
         """
-        self.deepseek: Optional[DeepSeekClient] = None
+        获取各提供商的连接、限流、熔断和延迟统计。
 
-        # 初始化可用的客户端
-        if config.deepseek_key:
-            self.deepseek = DeepSeekClient(config.deepseek_key, config.timeout)
+        Returns:
+            providers 为各提供商统计，router 为路由统计
+        """
+        return self.router.stats()
 
     async def generate_question(self, req: QuestionRequest) -> QuestionResponses:
         """
-        使用指定的AI模型生成题目。
+        使用指定的提供商生成题目，model 为 "auto" 时由路由器选择。
 
         Args:
             req: 题目生成请求
@@ -50,15 +91,174 @@ class AIServiceImpl(AIService):
         """
         # 验证并设置默认值
         req = validate_question_request(req)
+        return await self.router.generate(req)
+
+    async def generate_question_stream(self, req: QuestionRequest) -> AsyncIterator[QuestionResponse]:
+        """
+        使用指定的提供商流式生成题目。
+
+        Args:
+            req: 题目生成请求
+
+        Yields:
+            QuestionResponse: 逐个生成的题目
+
+        Raises:
+            ValueError: 如果模型不受支持或未配置
+        """
+        req = validate_question_request(req)
+        async for question in self.router.generate_stream(req):
+            yield question
+
+
+class CachedAIService(AIService):
+    """在AI服务前增加响应缓存的装饰器。"""
+
+    def __init__(
+        self,
+        inner: AIService,
+        cache: QuestionCache,
+        prompt_builder: Optional[Callable[[QuestionRequest], str]] = None
+    ):
+        """
+        初始化缓存装饰器。
+
+        Args:
+            inner: 实际调用上游的AI服务
+            cache: 响应缓存
+            prompt_builder: 生成提示词的函数，提供时提示词参与缓存键
+        """
+        self.inner = inner
+        self.cache = cache
+        self.prompt_builder = prompt_builder
+        self.bypasses = 0
+
+    def _cache_key(self, req: QuestionRequest) -> str:
+        """计算已验证请求的缓存键。"""
+        prompt = None
+        if self.prompt_builder:
+            # 用规范化后的关键字生成提示词，仅用于识别提示词模板的变化
+            prompt = self.prompt_builder(replace(req, keyword=normalize_keyword(req.keyword)))
+        return build_cache_key(req, prompt)
 
-        # 路由到适当的服务
-        if req.model == "deepseek" or req.model == "":
-            if not self.deepseek:
-                raise ValueError("DeepSeek API密钥未配置")
-            return await self.deepseek.generate(req)
+    async def _lookup(self, req: QuestionRequest, key: str) -> Optional[QuestionResponses]:
+        """读取缓存；请求要求跳过缓存时记录并返回None。"""
+        if req.bypass_cache:
+            self.bypasses += 1
+            return None
+        return await self.cache.get(key)
+
+    async def generate_question(self, req: QuestionRequest) -> QuestionResponses:
+        """
+        优先返回缓存结果，未命中或请求跳过缓存时调用上游并写入缓存。
+
+        Args:
+            req: 题目生成请求
+
+        Returns:
+            QuestionResponses: 生成的题目
+        """
+        req = validate_question_request(req)
+        key = self._cache_key(req)
 
-        else:
-            raise ValueError("不支持的AI模型")
+        cached = await self._lookup(req, key)
+        if cached is not None:
+            return cached
+
+        response = await self.inner.generate_question(req)
+        await self.cache.set(key, response)
+        return response
+
+    async def generate_question_stream(self, req: QuestionRequest) -> AsyncIterator[QuestionResponse]:
+        """
+        命中缓存时直接逐个返回；否则透传上游流，完整结束后写入缓存。
+
+        Args:
+            req: 题目生成请求
+
+        Yields:
+            QuestionResponse: 逐个生成的题目
+        """
+        req = validate_question_request(req)
+        key = self._cache_key(req)
+
+        cached = await self._lookup(req, key)
+        if cached is not None:
+            for question in cached.questions:
+                yield question
+            return
+
+        questions = []
+        async for question in self.inner.generate_question_stream(req):
+            questions.append(question)
+            yield question
+
+        await self.cache.set(key, QuestionResponses(questions=questions))
+
+    async def start(self) -> None:
+        await self.cache.open()
+        await self.inner.start()
+
+    async def close(self) -> None:
+        await self.inner.close()
+        await self.cache.close()
+
+    async def stats(self) -> Dict[str, Any]:
+        result = await self.inner.stats()
+        result["cache"] = await self.cache.stats()
+        result["cache"]["bypasses"] = self.bypasses
+        return result
+
+
+class CoalescingAIService(AIService):
+    """将并发的相同生成请求合并为一次上游调用的装饰器。"""
+
+    def __init__(self, inner: AIService):
+        """
+        初始化合并装饰器。
+
+        Args:
+            inner: 被包装的AI服务（通常为带缓存的服务，合并后的结果一并写入缓存）
+        """
+        self.inner = inner
+        self.flight = SingleFlight()
+
+    async def generate_question(self, req: QuestionRequest) -> QuestionResponses:
+        """
+        相同请求正在进行时等待其结果，否则发起新的调用。
+
+        要求跳过缓存的请求期望得到新的题目（如批量生成的各个分片），不参与合并。
+
+        Args:
+            req: 题目生成请求
+
+        Returns:
+            QuestionResponses: 生成的题目
+        """
+        req = validate_question_request(req)
+        if req.bypass_cache:
+            return await self.inner.generate_question(req)
+
+        return await self.flight.do(
+            build_cache_key(req),
+            lambda: self.inner.generate_question(req)
+        )
+
+    async def generate_question_stream(self, req: QuestionRequest) -> AsyncIterator[QuestionResponse]:
+        """流式请求逐个返回题目，直接透传。"""
+        async for question in self.inner.generate_question_stream(req):
+            yield question
+
+    async def start(self) -> None:
+        await self.inner.start()
+
+    async def close(self) -> None:
+        await self.inner.close()
+
+    async def stats(self) -> Dict[str, Any]:
+        result = await self.inner.stats()
+        result["coalescing"] = self.flight.stats()
+        return result
 
 
 def create_ai_service(config: AIConfig) -> AIService:
@@ -71,4 +271,19 @@ def create_ai_service(config: AIConfig) -> AIService:
     Returns:
         AIService: 配置好的AI服务实例
     """
-    return AIServiceImpl(config)
+    service = AIServiceImpl(config)
+
+    result: AIService = service
+
+    cache = create_question_cache(config)
+    if cache is not None:
+        prompt_builder = None
+        if config.cache_key_prompt:
+            prompt_builder = service.router.prompt_builder()
+        result = CachedAIService(result, cache, prompt_builder)
+
+    # 合并层在缓存之外，共享调用完成后由其写入缓存，不受单个客户端取消的影响
+    if config.coalesce:
+        result = CoalescingAIService(result)
+
+    return result
@@ -1,36 +1,227 @@
 """
 DeepSeek AI服务客户端实现。
-处理与DeepSeek API的通信以生成题目。
+处理与DeepSeek API（及其他OpenAI兼容接口）的通信以生成题目。
 """
 
 import json
+import time
 import asyncio
-from typing import Dict, Any, List
+import importlib.util
+from typing import Dict, Any, AsyncIterator, List, Optional
 import httpx
 
 from app.config.config import (
     QuestionRequest, QuestionResponses, QuestionResponse,
     SINGLE_SELECT, MULTI_SELECT, CODING
 )
+from app.services.streaming import JSONArrayStreamParser, iter_sse_data
+from app.services.limiter import AdmissionController, parse_retry_after
+from app.services.resilience import CIRCUIT_CLOSED, CIRCUIT_OPEN, CircuitBreaker, RetryPolicy
 
 
 DEEPSEEK_ENDPOINT = "https://ai.forestsx.top/v1"
+DEEPSEEK_MODEL = "deepseek-chat"
 
+# HTTP/2 需要可选依赖 h2（pip install httpx[http2]）
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# 值得重试的上游状态码
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class UpstreamError(ValueError):
+    """上游调用失败（连接失败、超时、可重试状态码重试耗尽或响应体无法解析），与请求本身无关。"""
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """判断异常是否说明上游不可用（连接失败、超时或5xx），用于熔断计数。"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
 
-class DeepSeekClient:
-    """DeepSeek AI API的客户端。"""
 
-    def __init__(self, api_key: str, timeout: int = 30):
+class DeepSeekClient:
+    """DeepSeek AI API的客户端，也可用于其他OpenAI兼容的chat completions接口。"""
+
+    def __init__(
+        self,
+        api_key: str,
+        timeout: int = 30,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry: float = 60.0,
+        http2: bool = True,
+        limiter: Optional[AdmissionController] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        base_url: str = DEEPSEEK_ENDPOINT,
+        model: str = DEEPSEEK_MODEL
+    ):
         """
         初始化DeepSeek客户端。
 
         Args:
             api_key: DeepSeek API密钥
             timeout: 请求超时时间（秒）
+            max_connections: 连接池最大连接数
+            max_keepalive: 保持空闲的最大连接数
+            keepalive_expiry: 空闲连接保持时间（秒）
+            http2: 是否启用HTTP/2（需安装h2）
+            limiter: 上游调用的准入控制器，默认只按连接数限制并发
+            breaker: 上游熔断器，默认按上游地址创建
+            retry_policy: 重试策略
+            base_url: OpenAI兼容接口的地址
+            model: 请求体中的模型名称
         """
         self.api_key = api_key
         self.timeout = timeout
-        self.base_url = DEEPSEEK_ENDPOINT
+        self.base_url = base_url
+        self.model = model
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.limiter = limiter or AdmissionController(max_in_flight=max_connections)
+        self.breaker = breaker or CircuitBreaker(self.base_url)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # 连接复用统计
+        self._requests = 0
+        self._new_connections = 0
+        self._http_versions: Dict[str, int] = {}
+        self._retries = 0
+        self._prompt_tokens = 0
+        self._completion_tokens = 0
+
+    async def start(self) -> None:
+        """创建长连接复用的HTTP客户端。"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                headers={"Authorization": f"Bearer {self.api_key}"}
+            )
+
+    async def close(self) -> None:
+        """关闭HTTP客户端及其连接池。"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """获取共享HTTP客户端，未启动时按需创建。"""
+        if self._client is None or self._client.is_closed:
+            await self.start()
+        return self._client
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        """httpcore跟踪回调，统计新建的TCP连接数。"""
+        if event_name == "connection.connect_tcp.complete":
+            self._new_connections += 1
+
+    def available(self) -> bool:
+        """熔断器未打开时可以接受请求（半开状态用于探测）。"""
+        return self.breaker.state != CIRCUIT_OPEN
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取上游连接复用统计。
+
+        Returns:
+            包含请求数、新建连接数和复用率的字典
+        """
+        reused = max(self._requests - self._new_connections, 0)
+        return {
+            "endpoint": self.base_url,
+            "model": self.model,
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "requests": self._requests,
+            "new_connections": self._new_connections,
+            "reused_connections": reused,
+            "reuse_rate": round(reused / self._requests, 4) if self._requests else 0.0,
+            "http_versions": dict(self._http_versions),
+            "retries": self._retries,
+            "tokens": {
+                "prompt": self._prompt_tokens,
+                "completion": self._completion_tokens
+            },
+            "breaker": self.breaker.stats(),
+            "admission": self.limiter.stats()
+        }
+
+    def _estimate_tokens(self, payload: Dict[str, Any]) -> int:
+        """
+        预估一次调用消耗的token数：提示词按每字符一个token计（中文的上限），
+        加上 max_tokens。实际用量在响应返回后修正。
+        """
+        prompt_chars = sum(len(message["content"]) for message in payload["messages"])
+        return prompt_chars + payload.get("max_tokens", 0)
+
+    def _settle_usage(self, reserved: int, result: Dict[str, Any]) -> None:
+        """按响应中的 usage 归还预估多扣的token额度，并累计token用量。"""
+        usage = result.get("usage") or {}
+        used = usage.get("total_tokens")
+        if isinstance(used, int):
+            self.limiter.settle(reserved, used)
+        self._prompt_tokens += usage.get("prompt_tokens") or 0
+        self._completion_tokens += usage.get("completion_tokens") or 0
+
+    def _attempt_timeout(self, deadline: float) -> float:
+        """
+        本次尝试的超时时间：不超过配置的超时，也不超过总时限的剩余时间。
+
+        Raises:
+            UpstreamError: 如果已经超过总时限
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise UpstreamError(f"API请求超过总时限（{self.retry_policy.deadline}秒）")
+        return min(self.timeout, remaining)
+
+    def _retry_delay(self, error: Exception, attempt: int, deadline: float) -> Optional[float]:
+        """
+        判断是否重试以及重试前的等待时间。
+
+        Args:
+            error: 本次尝试的异常
+            attempt: 已失败的次数
+            deadline: 请求的截止时间（monotonic）
+
+        Returns:
+            等待秒数；不应重试时返回None
+        """
+        if attempt >= self.retry_policy.max_attempts:
+            return None
+
+        # 上游已判定不可用时不再重试，由熔断器快速失败
+        if self.breaker.state != CIRCUIT_CLOSED:
+            return None
+
+        delay = self.retry_policy.delay(attempt)
+        if isinstance(error, httpx.HTTPStatusError):
+            status = error.response.status_code
+            if status not in RETRYABLE_STATUS:
+                return None
+
+            retry_after = parse_retry_after(error.response)
+            if status in (429, 503) and retry_after is not None:
+                # 交给准入控制器统一暂停所有新请求
+                self.limiter.backoff(retry_after)
+                delay = retry_after
+
+        if time.monotonic() + delay >= deadline:
+            return None
+
+        self._retries += 1
+        return 0.0 if self.limiter.is_blocked() else delay
 
     def _build_prompt(self, req: QuestionRequest) -> str:
         """
@@ -115,6 +306,53 @@ class DeepSeekClient:
             return "单选题"
         return "编程题"
 
+    def _validate_item(self, item: Any, req: QuestionRequest) -> QuestionResponse:
+        """
+        验证单个题目对象。
+
+        Args:
+            item: 解析出的题目对象
+            req: 用于验证的原始请求
+
+        Returns:
+            QuestionResponse: 验证后的题目
+
+        Raises:
+            ValueError: 如果题目格式无效
+        """
+        # 验证必需字段
+        if not isinstance(item, dict) or "title" not in item:
+            raise ValueError("缺少题目标题")
+
+        answers = item.get("answers", [])
+        rights = item.get("rights", [])
+
+        # 验证非编程题的答案和选项
+        if req.type in [SINGLE_SELECT, MULTI_SELECT]:
+            if len(answers) != 4:
+                raise ValueError("选择题必须有4个选项")
+
+            # 验证选项前缀
+            for i, answer in enumerate(answers):
+                expected_prefix = f"{chr(ord('A') + i)}:"
+                if not answer.startswith(expected_prefix):
+                    raise ValueError(f"选项 {i+1} 前缀错误，应以 '{expected_prefix}' 开头")
+
+            # 验证答案
+            if len(set(rights)) != len(rights):
+                raise ValueError("答案重复")
+
+            if req.type == MULTI_SELECT:
+                sorted_rights = sorted(rights)
+                if sorted_rights != rights:
+                    raise ValueError(f"答案必须按字母顺序排列，当前顺序：{rights}")
+
+        return QuestionResponse(
+            title=item["title"],
+            answers=answers,
+            rights=rights
+        )
+
     def _parse_response(self, content: str, req: QuestionRequest) -> QuestionResponses:
         """
         解析DeepSeek API响应。
@@ -156,55 +394,16 @@ class DeepSeekClient:
         if len(items) != req.count:
             raise ValueError(f"题目数量错误，预期 {req.count} 道，实际 {len(items)} 道")
 
-        questions = []
-        for item in items:
-            # 验证必需字段
-            if "title" not in item:
-                raise ValueError("缺少题目标题")
-
-            answers = item.get("answers", [])
-            rights = item.get("rights", [])
-
-            # 验证非编程题的答案和选项
-            if req.type in [SINGLE_SELECT, MULTI_SELECT]:
-                if len(answers) != 4:
-                    raise ValueError("选择题必须有4个选项")
-
-                # 验证选项前缀
-                for i, answer in enumerate(answers):
-                    expected_prefix = f"{chr(ord('A') + i)}:"
-                    if not answer.startswith(expected_prefix):
-                        raise ValueError(f"选项 {i+1} 前缀错误，应以 '{expected_prefix}' 开头")
-
-                # 验证答案
-                if len(set(rights)) != len(rights):
-                    raise ValueError("答案重复")
-
-                if req.type == MULTI_SELECT:
-                    sorted_rights = sorted(rights)
-                    if sorted_rights != rights:
-                        raise ValueError(f"答案必须按字母顺序排列，当前顺序：{rights}")
-
-            questions.append(QuestionResponse(
-                title=item["title"],
-                answers=answers,
-                rights=rights
-            ))
+        questions = [self._validate_item(item, req) for item in items]
 
         return QuestionResponses(questions=questions)
     
-    async def generate(self, req: QuestionRequest) -> QuestionResponses:
+    def _check_request(self, req: QuestionRequest) -> None:
         """
-        使用DeepSeek API生成题目。
-
-        Args:
-            req: 题目生成请求
-
-        Returns:
-            QuestionResponses: 生成的题目
+        检查请求是否满足上游调用的前提条件。
 
         Raises:
-            ValueError: 如果请求无效或API调用失败
+            ValueError: 如果请求无效
         """
         if not req.keyword:
             raise ValueError("关键字不能为空")
@@ -215,10 +414,19 @@ class DeepSeekClient:
         if req.count > 10:
             raise ValueError("单次生成题目数量不能超过10道")
 
-        prompt = self._build_prompt(req)
+    def _build_payload(self, req: QuestionRequest, stream: bool = False) -> Dict[str, Any]:
+        """
+        构建chat completions请求体。
+
+        Args:
+            req: 题目生成请求
+            stream: 是否请求流式返回
 
+        Returns:
+            请求体字典
+        """
         payload = {
-            "model": "deepseek-chat",
+            "model": self.model,
             "messages": [
                 {
                     "role": "system",
@@ -226,38 +434,137 @@ class DeepSeekClient:
                 },
                 {
                     "role": "user",
-                    "content": prompt
+                    "content": self._build_prompt(req)
                 }
             ],
             "temperature": 0.3,
             "max_tokens": 2000
         }
+        if stream:
+            payload["stream"] = True
+        return payload
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+    async def generate(self, req: QuestionRequest) -> QuestionResponses:
+        """
+        使用DeepSeek API生成题目。
+
+        Args:
+            req: 题目生成请求
+
+        Returns:
+            QuestionResponses: 生成的题目
+
+        Raises:
+            ValueError: 如果请求无效或题目格式/数量错误
+            UpstreamError: 如果API调用失败或超过总时限
+            RateLimitExceededError: 如果准入控制拒绝了请求
+            CircuitOpenError: 如果上游熔断器处于打开状态
+        """
+        self._check_request(req)
+        payload = self._build_payload(req)
+        reserved = self._estimate_tokens(payload)
+
+        client = await self._get_client()
+        deadline = self.retry_policy.start()
 
-        max_retries = 3
-        for attempt in range(max_retries):
+        attempt = 0
+        while True:
             try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    response = await client.post(
-                        f"{self.base_url}/chat/completions",
-                        json=payload,
-                        headers=headers
-                    )
+                with self.breaker.guard(is_upstream_failure):
+                    async with self.limiter.acquire(reserved):
+                        self._requests += 1
+                        response = await client.post(
+                            "/chat/completions",
+                            json=payload,
+                            timeout=self._attempt_timeout(deadline),
+                            extensions={"trace": self._trace}
+                        )
+                    version = response.http_version
+                    self._http_versions[version] = self._http_versions.get(version, 0) + 1
                     response.raise_for_status()
 
-                    result = response.json()
-                    content = result["choices"][0]["message"]["content"]
+                result = response.json()
+                self._settle_usage(reserved, result)
+                content = result["choices"][0]["message"]["content"]
 
-                    return self._parse_response(content, req)
+                return self._parse_response(content, req)
 
             except (httpx.HTTPError, KeyError, json.JSONDecodeError) as e:
-                if attempt == max_retries - 1:
-                    raise ValueError(f"API请求失败（尝试{max_retries}次）：{e}")
+                attempt += 1
+                delay = self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    raise UpstreamError(f"API请求失败（尝试{attempt}次）：{e}") from e
+
+                await asyncio.sleep(delay)
+
+    async def generate_stream(self, req: QuestionRequest) -> AsyncIterator[QuestionResponse]:
+        """
+        流式生成题目，每个题目对象闭合并通过验证后立即返回。
+
+        仅在尚未返回任何题目时重试，避免重复输出。
 
-                # 重试前等待
-                await asyncio.sleep((attempt + 1) * 2)
-                continue
+        Args:
+            req: 题目生成请求
+
+        Yields:
+            QuestionResponse: 逐个生成的题目
+
+        Raises:
+            ValueError: 如果请求无效或题目格式/数量错误
+            UpstreamError: 如果API调用失败或超过总时限
+            RateLimitExceededError: 如果准入控制拒绝了请求
+            CircuitOpenError: 如果上游熔断器处于打开状态
+        """
+        self._check_request(req)
+        payload = self._build_payload(req, stream=True)
+        reserved = self._estimate_tokens(payload)
+
+        client = await self._get_client()
+        deadline = self.retry_policy.start()
+
+        attempt = 0
+        while True:
+            emitted = 0
+            try:
+                with self.breaker.guard(is_upstream_failure):
+                    async with self.limiter.acquire(reserved), client.stream(
+                        "POST",
+                        "/chat/completions",
+                        json=payload,
+                        timeout=self._attempt_timeout(deadline),
+                        extensions={"trace": self._trace}
+                    ) as response:
+                        self._requests += 1
+                        version = response.http_version
+                        self._http_versions[version] = self._http_versions.get(version, 0) + 1
+                        response.raise_for_status()
+
+                        parser = JSONArrayStreamParser()
+                        async for chunk in iter_sse_data(response):
+                            delta = chunk["choices"][0].get("delta", {}).get("content")
+                            if not delta:
+                                continue
+
+                            for item in parser.feed(delta):
+                                emitted += 1
+                                if emitted > req.count:
+                                    raise ValueError(f"题目数量错误，预期 {req.count} 道，实际超过 {req.count} 道")
+                                yield self._validate_item(item, req)
+
+                            if parser.finished:
+                                break
+
+                if not parser.started:
+                    raise ValueError("响应内容不是有效的JSON数组")
+
+                if emitted != req.count:
+                    raise ValueError(f"题目数量错误，预期 {req.count} 道，实际 {emitted} 道")
+                return
+
+            except (httpx.HTTPError, KeyError, IndexError, json.JSONDecodeError) as e:
+                attempt += 1
+                delay = None if emitted > 0 else self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    raise UpstreamError(f"API请求失败（尝试{attempt}次）：{e}") from e
+
+                await asyncio.sleep(delay)
@@ -0,0 +1,150 @@
+"""
+题库流式导出。
+按id分批读取题目并逐批编码为NDJSON或CSV，可选地在输出时gzip压缩，内存占用与题库大小无关。
+导出格式与 importer 的导入格式一致，导出的文件可以直接重新导入。
+"""
+
+import io
+import csv
+import zlib
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.services.serialization import RawJSON, dumps
+from app.services.importer import SUPPORTED_FORMATS
+from app.storage.database import Database
+
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = ("id", "type", "title", "language", "answers", "rights")
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+GZIP_LEVEL = 6
+
+
+def encode_ndjson(rows: List[Dict[str, Any]]) -> bytes:
+    """
+    将一批题目编码为NDJSON。answers/rights 已是JSON文本，以 RawJSON 原样写出而不解码再编码。
+
+    Args:
+        rows: Database.iter_questions 返回的一批题目
+
+    Returns:
+        每行一个题目对象的UTF-8字节串
+    """
+    lines = [
+        dumps({
+            "id": row["id"],
+            "type": row["type"],
+            "title": row["title"],
+            "language": row["language"],
+            "answers": RawJSON(row["answers"]),
+            "rights": RawJSON(row["rights"])
+        })
+        for row in rows
+    ]
+    lines.append(b"")
+    return b"\n".join(lines)
+
+
+def encode_csv(rows: List[Dict[str, Any]], header: bool = False) -> bytes:
+    """
+    将一批题目编码为CSV，answers/rights 列为JSON数组文本。
+
+    Args:
+        rows: 一批题目
+        header: 是否在前面写入表头
+
+    Returns:
+        UTF-8字节串，行以 \\r\\n 结尾
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows([row[name] for name in EXPORT_COLUMNS] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+class QuestionExporter:
+    """分批读取、逐批编码的题库导出器。"""
+
+    def __init__(self, database: Database, batch_size: int = 1000):
+        """
+        初始化导出器。
+
+        Args:
+            database: 数据库实例
+            batch_size: 每次从数据库读取的行数
+        """
+        self.database = database
+        self.batch_size = batch_size
+
+    async def stream(
+        self,
+        fmt: str,
+        search: str = "",
+        question_type: Optional[int] = None,
+        gzip: bool = False
+    ) -> AsyncIterator[bytes]:
+        """
+        逐批生成导出内容。
+
+        Args:
+            fmt: ndjson 或 csv
+            search: 标题搜索词，与分页查询的过滤条件相同
+            question_type: 按题目类型过滤
+            gzip: 是否输出gzip压缩流
+
+        Yields:
+            编码（及压缩）后的字节块
+
+        Raises:
+            ValueError: 如果格式不支持
+        """
+        if fmt not in SUPPORTED_FORMATS:
+            raise ValueError(f"不支持的导出格式: {fmt}")
+
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if gzip else None
+        rows = 0
+
+        try:
+            if fmt == "csv":
+                header = encode_csv([], header=True)
+                header = compressor.compress(header) if compressor else header
+                if header:
+                    yield header
+
+            async for batch in self.database.iter_questions(self.batch_size, search, question_type):
+                rows += len(batch)
+                chunk = encode_ndjson(batch) if fmt == "ndjson" else encode_csv(batch)
+                if compressor:
+                    chunk = compressor.compress(chunk)
+                    if not chunk:
+                        # 压缩器还在缓冲，等下一批再输出
+                        continue
+                yield chunk
+
+            if compressor:
+                yield compressor.flush()
+        except Exception:
+            # 响应头已经发出，只能中断连接，客户端会收到不完整的文件
+            logger.exception("题库导出中断", extra={"rows": rows})
+            raise
+
+        logger.info("题库导出完成", extra={"format": fmt, "gzip": gzip, "rows": rows})
+
+
+def create_question_exporter(database: Database) -> QuestionExporter:
+    """
+    按数据库配置创建导出器。
+
+    Args:
+        database: 数据库实例，从其配置读取批大小
+
+    Returns:
+        配置好的 QuestionExporter
+    """
+    return QuestionExporter(database, database.config.export_batch_size)
@@ -0,0 +1,365 @@
+"""
+题库流式导入。
+逐块读取请求体，按行解析NDJSON或CSV并校验，有效行按配置的行数分批在独立事务中写入，
+无效行记录错误后跳过，整个导入过程只保留一个批次的数据在内存中。
+"""
+
+import csv
+import time
+import codecs
+import logging
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from app.services.serialization import loads
+from app.storage.database import Database
+
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ("ndjson", "csv")
+
+REQUIRED_FIELDS = ("type", "title", "language", "answers", "rights")
+
+# CSV 表头必须包含的列，answers/rights 列为JSON数组文本
+CSV_COLUMNS = REQUIRED_FIELDS
+
+# 单行（CSV为单条记录）的最大字符数，超过时记为错误并跳到下一行
+MAX_RECORD_CHARS = 1 << 20
+
+# 解析结果：(行号, 题目字典或解析错误)
+ParsedRow = Tuple[int, Union[Dict[str, Any], ValueError]]
+
+
+def validate_question(question: Any) -> Dict[str, Any]:
+    """
+    校验单个题目的字段和类型。
+
+    Args:
+        question: 待校验的题目
+
+    Returns:
+        原题目字典
+
+    Raises:
+        ValueError: 如果缺少字段或字段类型错误
+    """
+    if not isinstance(question, dict):
+        raise ValueError("题目必须是JSON对象")
+
+    for name in REQUIRED_FIELDS:
+        if name not in question:
+            raise ValueError(f"缺少必需字段: {name}")
+
+    if question["type"] not in [1, 2, 3]:
+        raise ValueError("类型无效")
+
+    if not isinstance(question["title"], str) or not question["title"].strip():
+        raise ValueError("标题不能为空")
+
+    if not isinstance(question["language"], str):
+        raise ValueError("编程语言格式错误")
+
+    if not isinstance(question["answers"], list):
+        raise ValueError("选项格式错误")
+
+    if not isinstance(question["rights"], list):
+        raise ValueError("答案格式错误")
+
+    return question
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[str]]]:
+    """
+    将字节块流拆分为文本行。
+
+    只扫描每个块新解码出的文本，未结束的行分段保存；超长行只报告一次，
+    其剩余部分直到换行符都被丢弃，且不计为新的一行。
+
+    Args:
+        chunks: 请求体字节块
+
+    Yields:
+        (行号, 行文本) 元组，行文本不含换行符；超长行的文本为None
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    parts: List[str] = []
+    pending_chars = 0
+    line_no = 0
+    skipping = False
+
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        start = 0
+        while True:
+            end = text.find("\n", start)
+            if end < 0:
+                break
+            line_no += 1
+            if skipping:
+                # 超长行的剩余部分，行号已在报告时占用
+                skipping = False
+            else:
+                line = text[start:end]
+                if parts:
+                    parts.append(line)
+                    line = "".join(parts)
+                    parts, pending_chars = [], 0
+                yield line_no, line.rstrip("\r") if len(line) <= MAX_RECORD_CHARS else None
+            start = end + 1
+
+        if skipping or start == len(text):
+            continue
+        parts.append(text[start:])
+        pending_chars += len(text) - start
+        if pending_chars > MAX_RECORD_CHARS:
+            yield line_no + 1, None
+            parts, pending_chars = [], 0
+            skipping = True
+
+    tail = decoder.decode(b"", final=True)
+    if not skipping and (parts or tail):
+        line = "".join(parts) + tail
+        yield line_no + 1, line.rstrip("\r") if len(line) <= MAX_RECORD_CHARS else None
+
+
+async def parse_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    """
+    逐行解析NDJSON，每个非空行是一个题目对象。
+
+    Args:
+        chunks: 请求体字节块
+
+    Yields:
+        (行号, 题目字典或解析错误)
+    """
+    async for line_no, line in iter_lines(chunks):
+        if line is None:
+            yield line_no, ValueError(f"单行超过{MAX_RECORD_CHARS}个字符")
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield line_no, loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f"JSON解析失败: {e}")
+
+
+def _parse_csv_list(value: str, name: str) -> List[Any]:
+    """解析CSV中的JSON数组单元格，空单元格视为空数组。"""
+    if not value.strip():
+        return []
+    try:
+        items = loads(value)
+    except ValueError:
+        items = None
+    if not isinstance(items, list):
+        raise ValueError(f"{name} 列必须是JSON数组")
+    return items
+
+
+def _csv_row_to_question(header: List[str], values: List[str]) -> Dict[str, Any]:
+    """将CSV记录按表头转换为题目字典。"""
+    if len(values) != len(header):
+        raise ValueError(f"列数为{len(values)}，与表头的{len(header)}列不一致")
+
+    row = dict(zip(header, values))
+    try:
+        question_type = int(row["type"])
+    except ValueError:
+        raise ValueError("类型无效")
+
+    return {
+        "type": question_type,
+        "title": row["title"],
+        "language": row["language"],
+        "answers": _parse_csv_list(row["answers"], "answers"),
+        "rights": _parse_csv_list(row["rights"], "rights")
+    }
+
+
+async def parse_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    """
+    逐条解析带表头的CSV。
+
+    引号内的换行会使一条记录跨越多行，按引号个数的奇偶判断记录是否结束。
+
+    Args:
+        chunks: 请求体字节块
+
+    Yields:
+        (记录起始行号, 题目字典或解析错误)
+
+    Raises:
+        ValueError: 如果表头缺少必需的列
+    """
+    header: Optional[List[str]] = None
+    parts: List[str] = []
+    quotes = 0
+    start = 0
+
+    async for line_no, line in iter_lines(chunks):
+        if line is None:
+            yield line_no, ValueError(f"单条记录超过{MAX_RECORD_CHARS}个字符")
+            parts, quotes = [], 0
+            continue
+
+        if not parts:
+            start = line_no
+        parts.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            if sum(len(part) for part in parts) > MAX_RECORD_CHARS:
+                yield start, ValueError(f"单条记录超过{MAX_RECORD_CHARS}个字符")
+                parts, quotes = [], 0
+            continue
+
+        record = "\n".join(parts)
+        parts, quotes = [], 0
+        if not record.strip():
+            continue
+
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            missing = [name for name in CSV_COLUMNS if name not in header]
+            if missing:
+                raise ValueError(f"CSV表头缺少列: {', '.join(missing)}")
+            continue
+
+        try:
+            yield start, _csv_row_to_question(header, values)
+        except ValueError as e:
+            yield start, e
+
+    if parts:
+        yield start, ValueError("引号未闭合")
+
+
+@dataclass
+class ImportResult:
+    """流式导入的统计结果。"""
+    format: str
+    rows: int = 0
+    inserted: int = 0
+    failed: int = 0
+    chunks: int = 0
+    bytes: int = 0
+    elapsed_ms: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, Any]:
+        """返回响应用的统计信息。"""
+        seconds = self.elapsed_ms / 1000
+        return {
+            "format": self.format,
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "chunks": self.chunks,
+            "bytes": self.bytes,
+            "elapsed_ms": self.elapsed_ms,
+            "rows_per_second": round(self.rows / seconds) if seconds else None,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
+
+
+class QuestionImporter:
+    """分批事务写入的题库导入器。"""
+
+    def __init__(self, database: Database, chunk_size: int = 1000, max_errors: int = 100):
+        """
+        初始化导入器。
+
+        Args:
+            database: 数据库实例
+            chunk_size: 每个事务写入的行数，批次之间释放写锁，其他写操作可以穿插执行
+            max_errors: 结果中最多列出的行错误数，超出的只计数
+        """
+        self.database = database
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+
+    async def run(
+        self,
+        body: AsyncIterator[bytes],
+        fmt: str,
+        result: ImportResult,
+        chunk_size: Optional[int] = None
+    ) -> ImportResult:
+        """
+        导入请求体中的全部题目。
+
+        result 由调用方创建并在导入过程中更新，写入失败中断时可从中读取已提交的行数。
+
+        Args:
+            body: 请求体字节块
+            fmt: ndjson 或 csv
+            result: 统计结果
+            chunk_size: 本次导入的事务大小，默认使用初始化时的设置
+
+        Returns:
+            更新后的 result
+
+        Raises:
+            ValueError: 如果格式不支持或CSV表头无效
+            Exception: 写入数据库失败时抛出，之前的批次已经提交
+        """
+        if fmt not in SUPPORTED_FORMATS:
+            raise ValueError(f"不支持的导入格式: {fmt}")
+
+        size = chunk_size or self.chunk_size
+        start = time.perf_counter()
+
+        async def counted() -> AsyncIterator[bytes]:
+            async for chunk in body:
+                result.bytes += len(chunk)
+                yield chunk
+
+        parser = parse_ndjson if fmt == "ndjson" else parse_csv
+        batch: List[Dict[str, Any]] = []
+
+        try:
+            async for row_no, parsed in parser(counted()):
+                result.rows += 1
+                try:
+                    if isinstance(parsed, ValueError):
+                        raise parsed
+                    batch.append(validate_question(parsed))
+                except ValueError as e:
+                    result.failed += 1
+                    if len(result.errors) < self.max_errors:
+                        result.errors.append({"row": row_no, "error": str(e)})
+                    continue
+
+                if len(batch) >= size:
+                    await self._flush(batch, result)
+                    batch = []
+
+            if batch:
+                await self._flush(batch, result)
+        finally:
+            result.elapsed_ms = round((time.perf_counter() - start) * 1000)
+
+        logger.info("题库导入完成", extra={**result.summary(), "errors": len(result.errors)})
+        return result
+
+    async def _flush(self, batch: List[Dict[str, Any]], result: ImportResult) -> None:
+        """在一个事务中写入一批题目。"""
+        await self.database.batch_insert_questions(batch)
+        result.inserted += len(batch)
+        result.chunks += 1
+
+
+def create_question_importer(database: Database) -> QuestionImporter:
+    """
+    按数据库配置创建导入器。
+
+    Args:
+        database: 数据库实例，从其配置读取事务大小和错误列表上限
+
+    Returns:
+        配置好的 QuestionImporter
+    """
+    return QuestionImporter(database, database.config.import_chunk_size, database.config.import_max_errors)
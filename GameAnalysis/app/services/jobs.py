@@ -0,0 +1,305 @@
+"""
+AI题目生成的后台任务队列。
+提交后立即返回任务ID，由有界的工作协程在后台执行，状态持久化到SQLite。
+"""
+
+import time
+import uuid
+import asyncio
+import logging
+from dataclasses import asdict
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.config.config import AIConfig, QuestionRequest, validate_question_request
+from app.services.client import AIService
+from app.services.bulk import BulkGenerator, BulkResult, MAX_CHUNK_SIZE
+from app.services.logs import bind_request, reset_request
+from app.storage.database import Database
+
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+FINISHED_STATUSES = {JOB_SUCCEEDED, JOB_FAILED}
+
+
+class JobQueueFullError(RuntimeError):
+    """待执行任务数达到上限时抛出的异常。"""
+
+
+def format_job(job: Dict[str, Any], include_result: bool = False) -> Dict[str, Any]:
+    """
+    将任务记录转换为API响应格式，附带排队和执行耗时。
+
+    Args:
+        job: Database.get_job 返回的任务字典
+        include_result: 是否包含生成的题目（RawJSON，响应时原样写出）
+
+    Returns:
+        任务状态字典
+    """
+    now = time.time()
+    started_at = job["started_at"]
+    finished_at = job["finished_at"]
+
+    queued_until = started_at or now
+    data = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "total": job["total"],
+        "request": job["request"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "queue_ms": round((queued_until - job["created_at"]) * 1000),
+        "run_ms": round(((finished_at or now) - started_at) * 1000) if started_at else None
+    }
+    if include_result:
+        data["questions"] = job["result"]
+    return data
+
+
+class JobManager:
+    """后台生成任务管理器。"""
+
+    def __init__(
+        self,
+        ai_service: AIService,
+        bulk_generator: BulkGenerator,
+        database: Database,
+        workers: int = 2,
+        max_pending: int = 100,
+        job_timeout: float = 300.0
+    ):
+        """
+        初始化任务管理器。
+
+        Args:
+            ai_service: AI服务实例
+            bulk_generator: 超过单次上限时使用的批量生成器
+            database: 持久化任务状态的数据库
+            workers: 同时执行的任务数
+            max_pending: 允许排队的最大任务数
+            job_timeout: 单个任务的最长执行时间（秒）
+        """
+        self.ai_service = ai_service
+        self.bulk_generator = bulk_generator
+        self.database = database
+        self.workers = workers
+        self.max_pending = max_pending
+        self.job_timeout = job_timeout
+
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._changed: Dict[str, asyncio.Event] = {}
+
+    async def start(self) -> None:
+        """启动工作协程，并恢复重启前未完成的任务。"""
+        for job_id in await self.database.get_unfinished_job_ids():
+            # 重启前正在执行的任务从头重新执行
+            await self.database.update_job(job_id, status=JOB_PENDING, progress=0, started_at=None)
+            self._queue.put_nowait(job_id)
+
+        if self._queue.qsize():
+            logger.info("恢复未完成的生成任务", extra={"jobs": self._queue.qsize()})
+
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"generation-job-worker-{i}"))
+
+    async def close(self) -> None:
+        """停止工作协程。执行中的任务保持 running 状态，下次启动时恢复。"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def submit(self, req: QuestionRequest, total: int) -> str:
+        """
+        提交生成任务。
+
+        Args:
+            req: 题目生成请求（count 字段被 total 覆盖）
+            total: 需要生成的题目总数
+
+        Returns:
+            任务ID
+
+        Raises:
+            ValueError: 如果请求无效
+            JobQueueFullError: 如果排队任务数已达上限
+        """
+        if total > self.bulk_generator.max_count:
+            raise ValueError(f"题目数量不能超过{self.bulk_generator.max_count}道")
+
+        if self._queue.qsize() >= self.max_pending:
+            raise JobQueueFullError("任务队列已满，请稍后重试")
+
+        req.count = min(total, MAX_CHUNK_SIZE)
+        req = validate_question_request(req)
+
+        job_id = uuid.uuid4().hex
+        await self.database.create_job(job_id, asdict(req), total, time.time())
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务记录。"""
+        return await self.database.get_job(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取队列统计。
+
+        Returns:
+            包含工作协程数和排队任务数的字典
+        """
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "max_pending": self.max_pending,
+            "watched_jobs": len(self._changed)
+        }
+
+    def _notify(self, job_id: str) -> None:
+        """唤醒正在等待该任务状态变化的订阅者。"""
+        event = self._changed.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def watch(self, job_id: str, heartbeat: float = 15.0) -> AsyncIterator[Dict[str, Any]]:
+        """
+        订阅任务状态变化，每次变化（或心跳超时）返回最新的任务记录，任务结束后停止。
+
+        Args:
+            job_id: 任务ID
+            heartbeat: 无变化时重新读取状态的间隔（秒）
+
+        Yields:
+            任务记录字典
+        """
+        while True:
+            event = self._changed.setdefault(job_id, asyncio.Event())
+
+            job = await self.database.get_job(job_id)
+            if job is None or job["status"] in FINISHED_STATUSES:
+                # 任务已结束，不会再有通知
+                self._changed.pop(job_id, None)
+
+            if job is None:
+                return
+
+            yield job
+            if job["status"] in FINISHED_STATUSES:
+                return
+
+            try:
+                await asyncio.wait_for(event.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self) -> None:
+        """从队列中依次取出任务执行。"""
+        while True:
+            job_id = await self._queue.get()
+            # 任务日志以任务ID作为关联ID
+            tokens = bind_request(job_id)
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("生成任务执行异常")
+            finally:
+                reset_request(tokens)
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        """执行单个任务并记录状态和耗时。"""
+        job = await self.database.get_job(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return
+
+        req = QuestionRequest(**job["request"])
+        total = job["total"]
+
+        await self.database.update_job(job_id, status=JOB_RUNNING, progress=0, started_at=time.time())
+        self._notify(job_id)
+
+        questions: List[Dict[str, Any]] = []
+
+        async def produce() -> None:
+            if total <= MAX_CHUNK_SIZE:
+                stream = self.ai_service.generate_question_stream(req)
+            else:
+                stream = self.bulk_generator.iter_questions(
+                    req, total, BulkResult(questions=[], requested=total)
+                )
+            async for q in stream:
+                questions.append(asdict(q))
+                await self.database.update_job(job_id, progress=len(questions))
+                self._notify(job_id)
+
+        try:
+            await asyncio.wait_for(produce(), self.job_timeout)
+            if not questions:
+                raise ValueError("未生成任何题目")
+        except asyncio.TimeoutError:
+            await self._finish(job_id, JOB_FAILED, questions, f"任务超时（{self.job_timeout}秒）")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._finish(job_id, JOB_FAILED, questions, str(e))
+        else:
+            await self._finish(job_id, JOB_SUCCEEDED, questions, None)
+
+    async def _finish(
+        self,
+        job_id: str,
+        status: str,
+        questions: List[Dict[str, Any]],
+        error: Optional[str]
+    ) -> None:
+        """记录任务的最终状态。"""
+        await self.database.update_job(
+            job_id,
+            status=status,
+            progress=len(questions),
+            result=questions,
+            error=error,
+            finished_at=time.time()
+        )
+        self._notify(job_id)
+
+
+def create_job_manager(
+    ai_service: AIService,
+    bulk_generator: BulkGenerator,
+    database: Database,
+    config: AIConfig
+) -> JobManager:
+    """
+    创建任务管理器的工厂函数。
+
+    Args:
+        ai_service: AI服务实例
+        bulk_generator: 批量生成器
+        database: 数据库实例
+        config: AI配置
+
+    Returns:
+        JobManager: 配置好的任务管理器
+    """
+    return JobManager(
+        ai_service,
+        bulk_generator,
+        database,
+        workers=config.job_workers,
+        max_pending=config.job_max_pending,
+        job_timeout=config.job_timeout
+    )
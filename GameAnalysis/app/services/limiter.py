@@ -0,0 +1,289 @@
+"""
+上游AI调用的准入控制。
+限制同时进行的请求数，按每分钟请求数和token数限流，
+超出等待上限时快速拒绝，并遵循上游返回的 Retry-After。
+"""
+
+import time
+import asyncio
+import email.utils
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from app.config.config import AIConfig
+
+
+class RateLimitExceededError(RuntimeError):
+    """准入控制拒绝请求时抛出的异常。"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    """
+    解析响应中的 Retry-After 头。
+
+    Args:
+        response: 上游HTTP响应
+
+    Returns:
+        需要等待的秒数，没有或无法解析时返回None
+    """
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    # HTTP-date 格式
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+class TokenBucket:
+    """
+    按分钟速率补充的令牌桶。
+
+    capacity 默认等于每分钟速率，即允许一分钟额度内的突发。
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        """
+        初始化令牌桶。
+
+        Args:
+            per_minute: 每分钟补充的令牌数
+            capacity: 桶容量，默认等于 per_minute
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> float:
+        """当前可用的令牌数。"""
+        self._refill()
+        return self._tokens
+
+    def delay(self, amount: float) -> float:
+        """
+        获取 amount 个令牌需要等待的秒数，0表示可以立即获取。
+
+        超过容量的请求按容量计算，避免永远无法获取。
+        """
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self._tokens >= amount:
+            return 0.0
+        return (amount - self._tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        """扣除令牌，调用前应确认 delay(amount) 为0。"""
+        self._refill()
+        self._tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        """归还多扣的令牌。"""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class AdmissionController:
+    """上游请求的准入控制器。"""
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_wait: float = 10.0,
+        max_queue: int = 100
+    ):
+        """
+        初始化准入控制器。
+
+        Args:
+            max_in_flight: 同时进行的上游请求数上限
+            requests_per_minute: 每分钟请求数上限，0表示不限制
+            tokens_per_minute: 每分钟token数上限，0表示不限制
+            max_wait: 单个请求排队的最长时间（秒），超出则拒绝
+            max_queue: 允许排队的最大请求数，超出立即拒绝
+        """
+        self.max_in_flight = max_in_flight
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._in_flight = 0
+        self._waiting = 0
+        self._blocked_until = 0.0
+
+        # 统计
+        self.admitted = 0
+        self.rejected = 0
+        self.throttled = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _reject(self, message: str, retry_after: float) -> RateLimitExceededError:
+        self.rejected += 1
+        return RateLimitExceededError(message, max(retry_after, 1.0))
+
+    def _rate_delay(self, tokens: int) -> float:
+        """距离请求数和token数额度都满足还需等待的秒数。"""
+        delay = 0.0
+        if self.request_bucket:
+            delay = max(delay, self.request_bucket.delay(1))
+        if self.token_bucket:
+            delay = max(delay, self.token_bucket.delay(tokens))
+        return delay
+
+    @asynccontextmanager
+    async def acquire(self, tokens: int = 0) -> AsyncIterator[None]:
+        """
+        获取一次上游调用的许可，退出时释放并发槽位。
+
+        Args:
+            tokens: 本次调用预计消耗的token数
+
+        Raises:
+            RateLimitExceededError: 如果排队已满或预计等待超过 max_wait
+        """
+        if self._waiting >= self.max_queue:
+            raise self._reject("上游请求排队已满，请稍后重试", self.max_wait)
+
+        start = time.monotonic()
+        deadline = start + self.max_wait
+        self._waiting += 1
+        try:
+            if self._slots.locked():
+                try:
+                    await asyncio.wait_for(self._slots.acquire(), self.max_wait)
+                except asyncio.TimeoutError:
+                    raise self._reject("上游并发已满，请稍后重试", self.max_wait)
+            else:
+                # 有空闲槽位时不会挂起
+                await self._slots.acquire()
+
+            try:
+                # 上游要求的退避期和限流额度，预计等待超过截止时间时直接拒绝
+                while True:
+                    now = time.monotonic()
+                    delay = max(self._blocked_until - now, self._rate_delay(tokens))
+                    if delay <= 0:
+                        break
+                    if now + delay > deadline:
+                        raise self._reject("上游调用频率超限，请稍后重试", delay)
+                    await asyncio.sleep(delay)
+            except BaseException:
+                self._slots.release()
+                raise
+
+            if self.request_bucket:
+                self.request_bucket.consume(1)
+            if self.token_bucket:
+                self.token_bucket.consume(tokens)
+        finally:
+            self._waiting -= 1
+
+        waited = time.monotonic() - start
+        self.admitted += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    def settle(self, reserved: int, used: int) -> None:
+        """
+        按实际用量修正token额度，归还预估多扣的部分。
+
+        Args:
+            reserved: acquire 时预估的token数
+            used: 上游返回的实际token数
+        """
+        if self.token_bucket and used < reserved:
+            self.token_bucket.refund(reserved - used)
+
+    def backoff(self, retry_after: float) -> None:
+        """
+        上游返回 Retry-After 时暂停所有新请求。
+
+        Args:
+            retry_after: 需要等待的秒数
+        """
+        self.throttled += 1
+        self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    def is_blocked(self) -> bool:
+        """是否处于上游要求的暂停期。"""
+        return self._blocked_until > time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取准入控制统计。
+
+        Returns:
+            包含并发数、排队深度、拒绝数和等待时间的字典
+        """
+        result = {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self._in_flight,
+            "queue_depth": self._waiting,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+            "blocked_for_ms": max(round((self._blocked_until - time.monotonic()) * 1000), 0),
+            "wait_time_ms": {
+                "total": round(self._wait_total * 1000, 2),
+                "avg": round(self._wait_total * 1000 / self.admitted, 2) if self.admitted else 0.0,
+                "max": round(self._wait_max * 1000, 2)
+            }
+        }
+        if self.request_bucket:
+            result["requests_available"] = round(self.request_bucket.available(), 2)
+        if self.token_bucket:
+            result["tokens_available"] = round(self.token_bucket.available(), 2)
+        return result
+
+
+def create_admission_controller(config: AIConfig) -> AdmissionController:
+    """
+    创建准入控制器的工厂函数。
+
+    Args:
+        config: AI配置
+
+    Returns:
+        AdmissionController: 配置好的准入控制器
+    """
+    return AdmissionController(
+        max_in_flight=config.max_in_flight,
+        requests_per_minute=config.requests_per_minute,
+        tokens_per_minute=config.tokens_per_minute,
+        max_wait=config.queue_max_wait,
+        max_queue=config.queue_max_size
+    )
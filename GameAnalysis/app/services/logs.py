@@ -0,0 +1,266 @@
+"""
+结构化异步日志。
+调用方只做消息插值并放入有界队列，格式化和写出在后台线程完成，请求路径不会阻塞在stdout上。
+每个请求带关联ID（X-Request-ID），DEBUG日志按请求整体采样。
+"""
+
+import sys
+import copy
+import json
+import time
+import uuid
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from contextvars import ContextVar, Token
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.config.config import LoggingConfig
+
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+# 客户端传入的关联ID超过该长度时改为生成新的ID
+MAX_REQUEST_ID_LENGTH = 64
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_debug_sampled: ContextVar[Optional[bool]] = ContextVar("debug_sampled", default=None)
+
+# LogRecord 自带的属性，其余属性视为通过 extra 传入的结构化字段
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional["AsyncQueueHandler"] = None
+_slow_query_seconds = 0.0
+
+query_logger = logging.getLogger("app.storage.database")
+request_logger = logging.getLogger("app.api.request")
+
+
+def get_request_id() -> Optional[str]:
+    """当前上下文的关联ID，不在请求或任务中时返回None。"""
+    return _request_id.get()
+
+
+def bind_request(request_id: str, debug_sampled: Optional[bool] = None) -> Tuple[Token, Token]:
+    """
+    为当前上下文设置关联ID和DEBUG采样结果。
+
+    Args:
+        request_id: 关联ID
+        debug_sampled: 是否记录该上下文的DEBUG日志，None表示逐条按采样率决定
+
+    Returns:
+        传给 reset_request 的令牌
+    """
+    return _request_id.set(request_id), _debug_sampled.set(debug_sampled)
+
+
+def reset_request(tokens: Tuple[Token, Token]) -> None:
+    """恢复 bind_request 之前的上下文。"""
+    _request_id.reset(tokens[0])
+    _debug_sampled.reset(tokens[1])
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class ContextFilter(logging.Filter):
+    """附加关联ID，并按采样结果丢弃DEBUG日志。在调用方线程执行。"""
+
+    def __init__(self, debug_sample_rate: float = 1.0):
+        super().__init__()
+        self.debug_sample_rate = debug_sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG:
+            sampled = _debug_sampled.get()
+            if sampled is None:
+                sampled = random.random() < self.debug_sample_rate
+            if not sampled:
+                return False
+        record.request_id = _request_id.get()
+        return True
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃日志而不是阻塞，格式化推迟到后台线程。"""
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 只做消息插值和异常文本化，使记录可以安全地跨线程传递
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行JSON。"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        entry.update(_extra_fields(record))
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """便于本地阅读的单行文本，结构化字段以 key=value 附在末尾。"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.request_id = getattr(record, "request_id", None) or "-"
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+def setup_logging(config: LoggingConfig) -> None:
+    """
+    将根日志器替换为异步队列处理器，输出由后台线程写到stderr。重复调用时替换之前的设置。
+
+    Args:
+        config: 日志配置
+    """
+    global _listener, _handler, _slow_query_seconds
+
+    root = logging.getLogger()
+    if _listener is not None:
+        _listener.stop()
+        root.removeHandler(_handler)
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if config.format == "json" else TextFormatter())
+
+    _handler = AsyncQueueHandler(queue.Queue(config.queue_size))
+    _handler.addFilter(ContextFilter(config.debug_sample_rate))
+    _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=False)
+
+    root.addHandler(_handler)
+    root.setLevel(config.level)
+    _slow_query_seconds = config.slow_query_ms / 1000
+    _listener.start()
+
+
+def flush_logging() -> None:
+    """写出队列中剩余的日志并停止后台线程。"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        logging.getLogger().removeHandler(_handler)
+        _listener = None
+
+
+def logging_stats() -> Dict[str, Any]:
+    """获取日志队列统计。"""
+    if _handler is None:
+        return {"queued": 0, "dropped": 0}
+    return {"queued": _handler.queue.qsize(), "dropped": _handler.dropped}
+
+
+def log_query(method: str, elapsed: float) -> None:
+    """记录一次数据库调用：超过慢查询阈值记WARNING，否则记（采样的）DEBUG。"""
+    elapsed_ms = round(elapsed * 1000, 3)
+    if _slow_query_seconds and elapsed >= _slow_query_seconds:
+        query_logger.warning("慢数据库调用", extra={"method": method, "elapsed_ms": elapsed_ms})
+    elif query_logger.isEnabledFor(logging.DEBUG):
+        query_logger.debug("数据库调用", extra={"method": method, "elapsed_ms": elapsed_ms})
+
+
+def get_header(scope: Dict[str, Any], name: bytes) -> Optional[str]:
+    """
+    从ASGI scope中读取请求头，供各个ASGI中间件共用。
+
+    Args:
+        scope: ASGI连接scope
+        name: 小写的请求头名称
+
+    Returns:
+        请求头的值，不存在时返回None
+    """
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class RequestContextMiddleware:
+    """
+    为每个请求绑定关联ID的ASGI中间件。
+
+    优先使用客户端传入的 X-Request-ID，否则生成新的ID，并在响应头中返回；
+    同时按采样率决定该请求的DEBUG日志是否全部记录，使采样到的请求日志完整。
+    """
+
+    def __init__(self, app: Callable, debug_sample_rate: float = 1.0):
+        self.app = app
+        self.debug_sample_rate = debug_sample_rate
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = get_header(scope, REQUEST_ID_HEADER)
+        if not request_id or len(request_id) > MAX_REQUEST_ID_LENGTH or not request_id.isprintable():
+            request_id = uuid.uuid4().hex
+
+        tokens = bind_request(request_id, random.random() < self.debug_sample_rate)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_request_id(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER, request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_logger.debug("请求完成", extra={
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)
+            })
+            reset_request(tokens)
+
+
+atexit.register(flush_logging)
@@ -0,0 +1,280 @@
+"""
+Prometheus文本格式的运行指标。
+提供计数器和直方图、记录路由延迟的ASGI中间件，以及数据库方法计时装饰器。
+指标在进程内聚合，由 /api/metrics 按 Prometheus 文本格式导出。
+"""
+
+import time
+import functools
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Sequence, Tuple, TypeVar
+
+from app.services.logs import log_query
+from app.services.profiling import record_span
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 路由和上游调用的延迟分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 数据库方法的延迟分桶（秒）
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# 未匹配到路由的请求统一记为该标签，避免任意路径造成标签爆炸
+UNMATCHED_ROUTE = "unmatched"
+
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """将标签格式化为 {name="value",...}，没有标签时返回空字符串。"""
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_metric(
+    name: str,
+    kind: str,
+    help_text: str,
+    samples: Iterable[Tuple[Dict[str, Any], float]]
+) -> str:
+    """
+    将一组样本格式化为Prometheus文本，用于抓取时才计算的指标。
+
+    Args:
+        name: 指标名
+        kind: counter 或 gauge
+        help_text: 指标说明
+        samples: (标签字典, 值) 序列
+
+    Returns:
+        以换行结尾的文本，没有样本时返回空字符串
+    """
+    lines = []
+    for labels, value in samples:
+        if value is None:
+            continue
+        lines.append(f"{name}{format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+    if not lines:
+        return ""
+    return f"# HELP {name} {help_text}\n# TYPE {name} {kind}\n" + "\n".join(lines) + "\n"
+
+
+class Counter:
+    """单调递增的计数器。"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        """按标签值（与 labels 顺序一致）增加计数。"""
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram:
+    """固定分桶的直方图。"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各分桶计数（非累计，末位为+Inf）, 总和, 次数]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """记录一次观测值。"""
+        series = self._series.get(label_values)
+        if series is None:
+            series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            self._series[label_values] = series
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = []
+        bucket_labels = self.labels + ("le",)
+        for key, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = format_labels(bucket_labels, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """进程内指标注册表。"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def _register(self, metric: Any) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"指标已注册: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        """
+        导出全部已注册指标。
+
+        Returns:
+            Prometheus文本格式，没有样本的指标也会输出 HELP/TYPE
+        """
+        parts = []
+        for metric in self._metrics.values():
+            parts.append(f"# HELP {metric.name} {metric.help_text}")
+            parts.append(f"# TYPE {metric.name} {metric.kind}")
+            parts.extend(metric.render())
+        return "\n".join(parts) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "按路由和状态码统计的HTTP请求数", ("method", "route", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "按路由统计的HTTP请求耗时（流式响应含推送时间）", ("method", "route")
+)
+DB_LATENCY = REGISTRY.histogram(
+    "db_query_duration_seconds", "按Database方法统计的耗时（含等待连接，嵌套调用分别计入）",
+    ("method",), QUERY_BUCKETS
+)
+DB_WRITE_QUEUE_WAIT = REGISTRY.histogram(
+    "db_write_queue_wait_seconds", "写操作在写合并队列中等待所在事务开始执行的时间", (), QUERY_BUCKETS
+)
+DB_ERRORS = REGISTRY.counter("db_query_errors_total", "按Database方法统计的失败次数", ("method",))
+AI_UPSTREAM_LATENCY = REGISTRY.histogram(
+    "ai_upstream_duration_seconds", "按提供商统计的上游生成耗时（含重试）", ("provider", "outcome")
+)
+
+
+def route_template(scope: Dict[str, Any]) -> str:
+    """
+    取请求匹配到的路由模板（如 /api/questions/jobs/{job_id}），而不是实际路径。
+
+    新版 FastAPI 的子路由按嵌套方式匹配，路由对象的模板不含 include_router 的前缀，
+    此时用实际路径中模板之前的部分补全前缀。
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return UNMATCHED_ROUTE
+    if ":path}" in template:
+        return template
+    prefix = scope["path"].rsplit("/", template.count("/"))[0]
+    return prefix + template
+
+
+class MetricsMiddleware:
+    """
+    记录每个HTTP请求的路由、状态码和耗时的ASGI中间件。
+
+    使用纯ASGI实现而非 BaseHTTPMiddleware，不会缓冲响应体，对流式响应没有影响；
+    路由标签取匹配到的路由模板，未匹配的请求归为 unmatched。
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # 路由匹配后 FastAPI 会把路由对象写入 scope
+            route = route_template(scope)
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method, route, str(status))
+            HTTP_LATENCY.observe(time.perf_counter() - start, method, route)
+
+
+def timed_query(fn: F) -> F:
+    """记录 Database 方法耗时和失败次数的装饰器，慢调用同时写入日志，启用剖析时记录为 db 区间。"""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        except Exception:
+            DB_ERRORS.inc(name)
+            raise
+        finally:
+            end = time.perf_counter()
+            elapsed = end - start
+            DB_LATENCY.observe(elapsed, name)
+            log_query(name, elapsed)
+            record_span(f"db:{name}", start, end)
+
+    return wrapper  # type: ignore[return-value]
@@ -0,0 +1,277 @@
+"""
+慢请求剖析。
+为每个请求记录数据库、上游AI调用和JSON序列化的耗时区间（span），
+超过阈值或带 X-Profile 请求头的请求保存耗时分解，最近的结果保存在环形缓冲区中供下载。
+"""
+
+import io
+import time
+import uuid
+import hmac
+import pstats
+import marshal
+import cProfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.config.config import ProfilingConfig
+from app.services.logs import get_header, get_request_id
+
+
+PROFILE_HEADER = b"x-profile"
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+
+# 单个请求最多记录的区间数，超过后只计数
+MAX_SPANS = 500
+
+# 文本剖析结果中保留的函数数
+PSTATS_LIMIT = 40
+
+# 区间名称前缀到耗时分解类别的映射
+SPAN_CATEGORIES = {"db": "db_ms", "upstream": "upstream_ms", "serialize": "serialize_ms"}
+
+
+@dataclass
+class RequestTrace:
+    """一个请求内记录的耗时区间。"""
+    start: float
+    spans: List[Tuple[str, float, float]] = field(default_factory=list)  # (名称, 开始, 结束)
+    dropped: int = 0
+
+    def add(self, name: str, start: float, end: float) -> None:
+        if len(self.spans) < MAX_SPANS:
+            self.spans.append((name, start, end))
+        else:
+            self.dropped += 1
+
+
+_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+def record_span(name: str, start: float, end: float) -> None:
+    """
+    记录一个耗时区间，当前请求未启用剖析时什么也不做。
+
+    Args:
+        name: 区间名称，以 "db:"、"upstream:" 或 "serialize" 开头的计入对应的耗时分解
+        start: 开始时间（time.perf_counter）
+        end: 结束时间（time.perf_counter）
+    """
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(name, start, end)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """以上下文管理器的方式记录耗时区间。"""
+    if _trace.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, start, time.perf_counter())
+
+
+def _union_ms(intervals: List[Tuple[float, float]]) -> float:
+    """区间并集的总长度（毫秒），嵌套和并发的区间不重复计算。"""
+    total = 0.0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return round(total * 1000, 3)
+
+
+def build_breakdown(trace: RequestTrace, end: float) -> Dict[str, float]:
+    """
+    按类别汇总请求耗时。
+
+    Args:
+        trace: 请求的耗时区间
+        end: 请求结束时间
+
+    Returns:
+        各类别耗时（毫秒），other_ms 为不在任何区间内的时间（路由、参数校验、业务逻辑等）
+    """
+    by_category: Dict[str, List[Tuple[float, float]]] = {key: [] for key in SPAN_CATEGORIES.values()}
+    for name, start, stop in trace.spans:
+        category = SPAN_CATEGORIES.get(name.split(":", 1)[0])
+        if category:
+            by_category[category].append((start, stop))
+
+    breakdown = {category: _union_ms(intervals) for category, intervals in by_category.items()}
+    covered = _union_ms([(start, stop) for _, start, stop in trace.spans])
+    breakdown["other_ms"] = round(max((end - trace.start) * 1000 - covered, 0.0), 3)
+    return breakdown
+
+
+class ProfileStore:
+    """保存最近 N 个剖析结果的环形缓冲区。"""
+
+    def __init__(self, size: int = 50):
+        self.size = size
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pstats: Dict[str, bytes] = {}
+        self.captured = 0
+
+    def add(self, profile: Dict[str, Any], raw_stats: Optional[bytes] = None) -> None:
+        """保存剖析结果，超出容量时丢弃最旧的。"""
+        self._profiles[profile["id"]] = profile
+        if raw_stats is not None:
+            self._pstats[profile["id"]] = raw_stats
+        self.captured += 1
+        while len(self._profiles) > self.size:
+            oldest, _ = self._profiles.popitem(last=False)
+            self._pstats.pop(oldest, None)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        return self._profiles.get(profile_id)
+
+    def get_pstats(self, profile_id: str) -> Optional[bytes]:
+        """cProfile 原始数据（与 pstats.Stats.dump_stats 的文件格式相同）。"""
+        return self._pstats.get(profile_id)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """按时间倒序列出剖析结果摘要。"""
+        keys = ("id", "request_id", "method", "path", "status", "started_at", "total_ms", "trigger")
+        return [
+            {key: profile[key] for key in keys}
+            for profile in reversed(self._profiles.values())
+        ]
+
+
+def check_admin_token(expected: str, provided: Optional[str]) -> bool:
+    """用常量时间比较管理令牌；未配置令牌时一律拒绝。"""
+    if not expected:
+        return False
+    return provided is not None and hmac.compare_digest(expected.encode(), provided.encode())
+
+
+class ProfilingMiddleware:
+    """
+    为每个请求记录耗时区间，保存慢请求和显式要求剖析的请求的耗时分解。
+
+    带 X-Profile: 1 请求头（配置了令牌时还需 X-Admin-Token）的请求额外运行 cProfile。
+    cProfile 作用于整个线程，结果会包含同时在处理的其他请求，且同一时间只运行一个。
+    """
+
+    def __init__(self, app: Callable, store: ProfileStore, slow_ms: float = 1000.0, admin_token: str = ""):
+        self.app = app
+        self.store = store
+        self.slow_seconds = slow_ms / 1000
+        self.admin_token = admin_token
+        self._profiler_busy = False
+
+    def _wants_profile(self, scope: Dict[str, Any]) -> bool:
+        if get_header(scope, PROFILE_HEADER) not in ("1", "true"):
+            return False
+        return check_admin_token(self.admin_token, get_header(scope, ADMIN_TOKEN_HEADER))
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        forced = self._wants_profile(scope)
+        profiler = None
+        if forced and not self._profiler_busy:
+            profiler = cProfile.Profile()
+            self._profiler_busy = True
+            profiler.enable()
+
+        trace = RequestTrace(start=time.perf_counter())
+        token = _trace.set(trace)
+        started_at = time.time()
+        status = 500
+        response_start = None
+
+        async def send_with_timing(message: Dict[str, Any]) -> None:
+            nonlocal status, response_start
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_start = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            end = time.perf_counter()
+            _trace.reset(token)
+            if profiler is not None:
+                profiler.disable()
+                self._profiler_busy = False
+
+            if forced or end - trace.start >= self.slow_seconds:
+                self._save(scope, trace, end, started_at, status, response_start, forced, profiler)
+
+    def _save(
+        self,
+        scope: Dict[str, Any],
+        trace: RequestTrace,
+        end: float,
+        started_at: float,
+        status: int,
+        response_start: Optional[float],
+        forced: bool,
+        profiler: Optional[cProfile.Profile]
+    ) -> None:
+        profile: Dict[str, Any] = {
+            "id": uuid.uuid4().hex[:12],
+            "request_id": get_request_id(),
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": scope.get("query_string", b"").decode("latin-1"),
+            "status": status,
+            "started_at": started_at,
+            "trigger": "header" if forced else "slow",
+            "total_ms": round((end - trace.start) * 1000, 3),
+            "response_start_ms": round((response_start - trace.start) * 1000, 3) if response_start else None,
+            "breakdown": build_breakdown(trace, end),
+            "spans": [
+                {
+                    "name": name,
+                    "start_ms": round((start - trace.start) * 1000, 3),
+                    "duration_ms": round((stop - start) * 1000, 3)
+                }
+                for name, start, stop in trace.spans
+            ],
+            "spans_dropped": trace.dropped
+        }
+
+        raw_stats = None
+        if profiler is not None:
+            stats = pstats.Stats(profiler)
+            output = io.StringIO()
+            stats.stream = output
+            stats.sort_stats("cumulative").print_stats(PSTATS_LIMIT)
+            profile["cprofile"] = output.getvalue()
+            raw_stats = marshal.dumps(stats.stats)
+
+        self.store.add(profile, raw_stats)
+
+
+def create_profile_store(config: ProfilingConfig) -> Optional[ProfileStore]:
+    """
+    根据配置创建剖析结果缓冲区。
+
+    Args:
+        config: 剖析配置
+
+    Returns:
+        未启用剖析时返回None
+    """
+    if not config.enabled:
+        return None
+    return ProfileStore(config.buffer_size)
@@ -0,0 +1,258 @@
+"""
+上游AI调用的容错策略。
+按上游地址熔断，并使用带抖动的指数退避和总时限控制重试。
+"""
+
+import time
+import random
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+from app.config.config import AIConfig
+
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """熔断器打开期间拒绝调用时抛出的异常。"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    单个上游地址的熔断器。
+
+    closed 状态下连续失败达到阈值后打开；打开期间直接拒绝调用；
+    经过恢复时间后进入 half_open，只放行少量探测请求，探测成功则关闭，
+    失败则重新打开。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        """
+        初始化熔断器。
+
+        Args:
+            name: 熔断器名称（通常为上游地址），用于日志和统计
+            failure_threshold: 打开熔断器所需的连续失败次数
+            recovery_timeout: 打开后进入半开状态前等待的时间（秒）
+            half_open_max_calls: 半开状态下同时放行的探测请求数
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+        # 统计
+        self.rejected = 0
+        self.transitions: Dict[str, int] = {}
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+
+        key = f"{self._state}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        logger.warning("熔断器状态变化", extra={"upstream": self.name, "transition": key})
+
+        self._state = state
+        self._probes = 0
+        if state == CIRCUIT_OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CIRCUIT_CLOSED:
+            self._failures = 0
+
+    @property
+    def state(self) -> str:
+        """当前状态，打开时间超过恢复时间后视为半开。"""
+        if self._state == CIRCUIT_OPEN and self.retry_after() <= 0:
+            self._transition(CIRCUIT_HALF_OPEN)
+        return self._state
+
+    def retry_after(self) -> float:
+        """距离允许探测还需等待的秒数。"""
+        if self._state != CIRCUIT_OPEN:
+            return 0.0
+        return max(self._opened_at + self.recovery_timeout - time.monotonic(), 0.0)
+
+    def before_call(self) -> None:
+        """
+        调用上游前检查是否放行。
+
+        Raises:
+            CircuitOpenError: 如果熔断器打开或半开状态的探测名额已满
+        """
+        state = self.state
+        if state == CIRCUIT_CLOSED:
+            return
+
+        if state == CIRCUIT_HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return
+
+        self.rejected += 1
+        raise CircuitOpenError(
+            "上游服务暂时不可用，请稍后重试",
+            max(self.retry_after(), 1.0)
+        )
+
+    def record_success(self) -> None:
+        """记录一次成功调用。"""
+        if self._state == CIRCUIT_HALF_OPEN:
+            self._transition(CIRCUIT_CLOSED)
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        """记录一次上游故障。"""
+        if self._state == CIRCUIT_HALF_OPEN:
+            self._transition(CIRCUIT_OPEN)
+            return
+
+        self._failures += 1
+        if self._state == CIRCUIT_CLOSED and self._failures >= self.failure_threshold:
+            self._transition(CIRCUIT_OPEN)
+
+    def release(self) -> None:
+        """调用未得出结论（如被取消）时归还半开状态的探测名额。"""
+        if self._state == CIRCUIT_HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    @contextmanager
+    def guard(self, is_failure: Callable[[BaseException], bool]) -> Iterator[None]:
+        """
+        保护一次上游调用：正常结束记为成功，is_failure 判定为故障的异常记为失败，
+        其他异常（如取消、本地限流）不影响熔断状态。
+
+        Args:
+            is_failure: 判断异常是否属于上游故障的函数
+
+        Raises:
+            CircuitOpenError: 如果熔断器拒绝了调用
+        """
+        self.before_call()
+        try:
+            yield
+        except BaseException as e:
+            if is_failure(e):
+                self.record_failure()
+            else:
+                self.release()
+            raise
+        else:
+            self.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取熔断器统计。
+
+        Returns:
+            包含状态、连续失败数和状态变化次数的字典
+        """
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "failure_threshold": self.failure_threshold,
+            "retry_after_ms": round(self.retry_after() * 1000),
+            "rejected": self.rejected,
+            "transitions": dict(self.transitions)
+        }
+
+
+class RetryPolicy:
+    """带抖动的指数退避重试策略，所有尝试共享一个总时限。"""
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 10.0,
+        deadline: float = 60.0
+    ):
+        """
+        初始化重试策略。
+
+        Args:
+            max_attempts: 最多尝试次数（含首次）
+            base_delay: 第一次重试前的基准等待时间（秒）
+            max_delay: 单次等待时间上限（秒）
+            deadline: 单个请求所有尝试的总时限（秒）
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def delay(self, attempt: int) -> float:
+        """
+        第 attempt 次失败后的等待时间。取指数退避上限的一半再加上随机的另一半，
+        避免大量请求在同一时刻重试。
+
+        Args:
+            attempt: 已失败的次数，从1开始
+
+        Returns:
+            等待秒数
+        """
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return cap / 2 + random.uniform(0, cap / 2)
+
+    def start(self) -> float:
+        """返回本次请求的截止时间（monotonic）。"""
+        return time.monotonic() + self.deadline
+
+
+def create_circuit_breaker(name: str, config: AIConfig) -> CircuitBreaker:
+    """
+    创建熔断器的工厂函数。
+
+    Args:
+        name: 上游名称或地址
+        config: AI配置
+
+    Returns:
+        CircuitBreaker: 配置好的熔断器
+    """
+    return CircuitBreaker(
+        name,
+        failure_threshold=config.breaker_failure_threshold,
+        recovery_timeout=config.breaker_recovery_timeout,
+        half_open_max_calls=config.breaker_half_open_calls
+    )
+
+
+def create_retry_policy(config: AIConfig) -> RetryPolicy:
+    """
+    创建重试策略的工厂函数。
+
+    Args:
+        config: AI配置
+
+    Returns:
+        RetryPolicy: 配置好的重试策略
+    """
+    return RetryPolicy(
+        max_attempts=config.retry_max_attempts,
+        base_delay=config.retry_base_delay,
+        max_delay=config.retry_max_delay,
+        deadline=config.request_deadline
+    )
@@ -0,0 +1,468 @@
+"""
+多提供商AI路由。
+维护已注册的提供商，按观测到的延迟、错误率和成本选择后端，
+并在首选提供商响应慢时发起对冲请求以降低长尾延迟。
+"""
+
+import time
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+import httpx
+
+from app.config.config import (
+    AUTO_MODEL, AIConfig, QuestionRequest, QuestionResponse, QuestionResponses
+)
+from app.services.deepseek import (
+    DEEPSEEK_ENDPOINT, DEEPSEEK_MODEL, RETRYABLE_STATUS, DeepSeekClient, UpstreamError, is_upstream_failure
+)
+from app.services.limiter import RateLimitExceededError, create_admission_controller
+from app.services.metrics import AI_UPSTREAM_LATENCY
+from app.services.profiling import record_span
+from app.services.resilience import CircuitOpenError, create_circuit_breaker, create_retry_policy
+from app.services.stub import StubClient
+
+
+# 样本数少于该值的提供商优先被选中，以便尽快获得延迟数据
+MIN_SAMPLES = 5
+
+# 没有延迟数据时发起对冲请求前的等待时间（秒）
+DEFAULT_HEDGE_DELAY = 5.0
+
+# 错误率对打分的放大系数
+ERROR_PENALTY = 4.0
+
+# 请求没有到达上游、由本地准入控制或熔断器拒绝的异常
+LOCAL_REJECTIONS = (RateLimitExceededError, CircuitOpenError)
+
+
+def should_failover(error: BaseException) -> bool:
+    """
+    判断失败是否应切换到下一个提供商。
+
+    只有上游不可用（连接失败、超时、5xx、429，或本地限流/熔断拒绝）才切换；
+    请求参数或题目格式错误换一个提供商也不会成功，直接返回给调用方。
+    """
+    if isinstance(error, (UpstreamError, asyncio.TimeoutError) + LOCAL_REJECTIONS):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return is_upstream_failure(error)
+
+
+class LatencyTracker:
+    """记录最近若干次调用的耗时和成败。"""
+
+    def __init__(self, window: int = 100):
+        """
+        初始化统计窗口。
+
+        Args:
+            window: 保留的最近调用数
+        """
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, latency: float, ok: bool) -> None:
+        """
+        记录一次调用。失败调用只计入错误率，不计入延迟分布。
+
+        Args:
+            latency: 耗时（秒）
+            ok: 是否成功
+        """
+        self.requests += 1
+        self._outcomes.append(ok)
+        if ok:
+            self._latencies.append(latency)
+        else:
+            self.errors += 1
+
+    @property
+    def samples(self) -> int:
+        return len(self._outcomes)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """最近成功调用耗时的第 p 百分位（秒），没有数据时返回None。"""
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(int(len(ordered) * p), len(ordered) - 1)
+        return ordered[index]
+
+    def error_rate(self) -> float:
+        """最近调用的失败比例。"""
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.percentile(0.5)
+        p95 = self.percentile(0.95)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate(), 4),
+            "p50_ms": round(p50 * 1000) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000) if p95 is not None else None
+        }
+
+
+class Provider:
+    """已注册的提供商：客户端、成本和延迟统计。"""
+
+    def __init__(self, name: str, client: Any, cost: float = 1.0, window: int = 100):
+        """
+        Args:
+            name: 提供商名称，即请求中的 model 字段
+            client: DeepSeekClient 或接口一致的客户端
+            cost: 相对成本
+            window: 延迟统计窗口
+        """
+        self.name = name
+        self.client = client
+        self.cost = cost
+        self.tracker = LatencyTracker(window)
+
+    def record(self, latency: float, ok: bool) -> None:
+        """记录一次完成的调用到路由统计、延迟直方图和当前请求的剖析区间。"""
+        self.tracker.record(latency, ok)
+        AI_UPSTREAM_LATENCY.observe(latency, self.name, "ok" if ok else "error")
+        end = time.perf_counter()
+        record_span(f"upstream:{self.name}", end - latency, end)
+
+
+class ProviderRouter:
+    """按延迟、错误率和成本在提供商之间路由，并支持对冲请求。"""
+
+    def __init__(
+        self,
+        hedge_enabled: bool = True,
+        hedge_delay: float = 0.0,
+        cost_weight: float = 0.5
+    ):
+        """
+        初始化路由器。
+
+        Args:
+            hedge_enabled: 是否启用对冲请求
+            hedge_delay: 发起对冲请求前的等待时间（秒），0表示使用首选提供商的p95延迟
+            cost_weight: 成本在打分中的权重
+        """
+        self.hedge_enabled = hedge_enabled
+        self.hedge_delay = hedge_delay
+        self.cost_weight = cost_weight
+        self.providers: Dict[str, Provider] = {}
+
+        # 统计
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def register(self, provider: Provider) -> None:
+        """
+        注册提供商。
+
+        Raises:
+            ValueError: 如果名称已被使用
+        """
+        if provider.name in self.providers or provider.name == AUTO_MODEL:
+            raise ValueError(f"AI提供商名称重复或为保留名称: {provider.name}")
+        self.providers[provider.name] = provider
+
+    async def start(self) -> None:
+        for provider in self.providers.values():
+            await provider.client.start()
+
+    async def close(self) -> None:
+        for provider in self.providers.values():
+            await provider.client.close()
+
+    def prompt_builder(self) -> Optional[Callable[[QuestionRequest], str]]:
+        """返回第一个真实提供商的提示词生成函数，用于缓存键。"""
+        for provider in self.providers.values():
+            if isinstance(provider.client, DeepSeekClient):
+                return provider.client._build_prompt
+        return None
+
+    def score(self, provider: Provider) -> Tuple[int, float]:
+        """
+        计算提供商的打分，越小越优先。
+
+        样本不足的提供商排在最前（按样本数），其余按
+        平均(p50, p95) × (1 + 错误率惩罚) × (1 + 成本权重 × 成本) 排序。
+        """
+        tracker = provider.tracker
+        if tracker.samples < MIN_SAMPLES:
+            return (0, float(tracker.samples))
+
+        p50 = tracker.percentile(0.5)
+        p95 = tracker.percentile(0.95)
+        # 全部失败时没有延迟数据，按请求超时级别的延迟处理
+        latency = (p50 + p95) / 2 if p50 is not None else 60.0
+        penalty = 1 + ERROR_PENALTY * tracker.error_rate()
+        return (1, latency * penalty * (1 + self.cost_weight * provider.cost))
+
+    def candidates(self, model: str) -> List[Provider]:
+        """
+        按优先级返回可用于该模型的提供商。
+
+        Args:
+            model: 提供商名称或 "auto"
+
+        Returns:
+            提供商列表，第一个为首选
+
+        Raises:
+            ValueError: 如果模型不受支持或没有注册任何提供商
+        """
+        if model != AUTO_MODEL:
+            provider = self.providers.get(model)
+            if provider is None:
+                raise ValueError("不支持的AI模型")
+            return [provider]
+
+        if not self.providers:
+            raise ValueError("未配置任何AI提供商")
+
+        ranked = sorted(self.providers.values(), key=self.score)
+        available = [p for p in ranked if p.client.available()]
+        # 全部熔断时仍按顺序尝试，由熔断器返回明确的错误
+        return available or ranked
+
+    def _hedge_after(self, provider: Provider) -> float:
+        """首选提供商多久未返回时发起对冲请求。"""
+        if self.hedge_delay > 0:
+            return self.hedge_delay
+        p95 = provider.tracker.percentile(0.95)
+        if p95 is None or provider.tracker.samples < MIN_SAMPLES:
+            return DEFAULT_HEDGE_DELAY
+        return p95
+
+    def _record_failure(self, provider: Provider, error: BaseException, latency: float) -> None:
+        """
+        将上游失败计入提供商的错误率。
+
+        被本地限流或熔断器拒绝的调用没有到达上游，熔断状态已经让提供商排在后面，
+        不再重复计入；请求或题目格式错误与提供商的可用性无关，也不计入。
+        """
+        if should_failover(error) and not isinstance(error, LOCAL_REJECTIONS):
+            provider.record(latency, False)
+
+    async def _call(self, provider: Provider, req: QuestionRequest) -> QuestionResponses:
+        """调用单个提供商并记录耗时；被取消的调用不计入统计。"""
+        start = time.monotonic()
+        try:
+            result = await provider.client.generate(req)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._record_failure(provider, e, time.monotonic() - start)
+            raise
+        provider.record(time.monotonic() - start, True)
+        return result
+
+    async def generate(self, req: QuestionRequest) -> QuestionResponses:
+        """
+        生成题目。首选提供商超过对冲等待时间仍未返回时，向次选提供商发起同样的请求，
+        采用先成功的结果并取消另一个；首选因上游不可用失败时立即切换到下一个提供商，
+        请求或题目格式错误直接抛出。
+
+        Args:
+            req: 已验证的题目生成请求
+
+        Returns:
+            QuestionResponses: 生成的题目
+
+        Raises:
+            ValueError: 如果模型不受支持，或请求、题目格式错误
+            Exception: 所有提供商都失败时抛出最后一个错误
+        """
+        candidates = self.candidates(req.model)
+        primary = candidates[0]
+        backups = candidates[1:]
+
+        pending: Dict["asyncio.Future[QuestionResponses]", Provider] = {}
+        started: Dict[str, float] = {}
+
+        def launch(provider: Provider) -> None:
+            started[provider.name] = time.monotonic()
+            pending[asyncio.ensure_future(self._call(provider, req))] = provider
+
+        launch(primary)
+        hedge: Optional[Provider] = None
+        hedge_at = None
+        if self.hedge_enabled and backups:
+            hedge_at = time.monotonic() + self._hedge_after(primary)
+
+        last_error: Optional[BaseException] = None
+        won = False
+        try:
+            while pending:
+                timeout = None
+                if hedge_at is not None:
+                    timeout = max(hedge_at - time.monotonic(), 0)
+
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    # 首选提供商太慢，发起一次对冲请求
+                    hedge = backups.pop(0)
+                    launch(hedge)
+                    self.hedges += 1
+                    hedge_at = None
+                    continue
+
+                for future in done:
+                    provider = pending.pop(future)
+                    if future.exception() is None:
+                        won = True
+                        if provider is hedge:
+                            self.hedge_wins += 1
+                        return future.result()
+                    last_error = future.exception()
+                    if not should_failover(last_error):
+                        raise last_error
+
+                if not pending and backups:
+                    # 全部失败，切换到下一个提供商
+                    launch(backups.pop(0))
+                    self.failovers += 1
+                    hedge_at = None
+        finally:
+            now = time.monotonic()
+            for future, provider in pending.items():
+                future.cancel()
+                if won:
+                    # 输给对冲请求的一方至少耗时这么久，作为延迟样本记录，
+                    # 否则慢的提供商永远没有样本，会一直被当作首选
+                    provider.tracker.record(now - started[provider.name], True)
+
+        raise last_error
+
+    async def generate_stream(self, req: QuestionRequest) -> AsyncIterator[QuestionResponse]:
+        """
+        流式生成题目。流式请求不做对冲，首选提供商在返回任何题目前因上游不可用失败时切换到下一个。
+
+        Args:
+            req: 已验证的题目生成请求
+
+        Yields:
+            QuestionResponse: 逐个生成的题目
+        """
+        candidates = self.candidates(req.model)
+
+        for index, provider in enumerate(candidates):
+            emitted = 0
+            start = time.monotonic()
+            try:
+                async for question in provider.client.generate_stream(req):
+                    emitted += 1
+                    yield question
+            except Exception as e:
+                self._record_failure(provider, e, time.monotonic() - start)
+                if emitted or index == len(candidates) - 1 or not should_failover(e):
+                    raise
+                self.failovers += 1
+                continue
+
+            provider.record(time.monotonic() - start, True)
+            return
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取各提供商和路由统计。
+
+        Returns:
+            providers 为各提供商的客户端统计和延迟统计，router 为对冲和切换次数
+        """
+        ranked = sorted(self.providers.values(), key=self.score)
+        return {
+            "providers": {
+                provider.name: {
+                    **provider.client.stats(),
+                    "cost": provider.cost,
+                    "available": provider.client.available(),
+                    "latency": provider.tracker.stats()
+                }
+                for provider in ranked
+            },
+            "router": {
+                "ranking": [provider.name for provider in ranked],
+                "hedge_enabled": self.hedge_enabled,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "failovers": self.failovers
+            }
+        }
+
+
+def _create_openai_client(
+    api_key: str,
+    base_url: str,
+    model: str,
+    config: AIConfig
+) -> DeepSeekClient:
+    """按共享的连接、限流和容错配置创建OpenAI兼容客户端。"""
+    return DeepSeekClient(
+        api_key,
+        config.timeout,
+        max_connections=config.max_connections,
+        max_keepalive=config.max_keepalive,
+        keepalive_expiry=config.keepalive_expiry,
+        http2=config.http2,
+        # 限流额度和熔断状态按提供商分别维护
+        limiter=create_admission_controller(config),
+        breaker=create_circuit_breaker(base_url, config),
+        retry_policy=create_retry_policy(config),
+        base_url=base_url,
+        model=model
+    )
+
+
+def create_provider_router(config: AIConfig) -> ProviderRouter:
+    """
+    根据配置注册提供商并创建路由器。
+
+    Args:
+        config: AI配置
+
+    Returns:
+        ProviderRouter: 配置好的路由器
+    """
+    router = ProviderRouter(
+        hedge_enabled=config.hedge_enabled,
+        hedge_delay=config.hedge_delay,
+        cost_weight=config.router_cost_weight
+    )
+
+    if config.deepseek_key:
+        base_url = config.deepseek_base_url or DEEPSEEK_ENDPOINT
+        router.register(Provider(
+            "deepseek",
+            _create_openai_client(config.deepseek_key, base_url, DEEPSEEK_MODEL, config),
+            cost=config.deepseek_cost,
+            window=config.router_window
+        ))
+
+    for item in config.providers:
+        router.register(Provider(
+            item.name,
+            _create_openai_client(item.api_key, item.base_url, item.model, config),
+            cost=item.cost,
+            window=config.router_window
+        ))
+
+    if config.stub_provider:
+        router.register(Provider(
+            "stub",
+            StubClient(latency=config.stub_latency),
+            cost=0.0,
+            window=config.router_window
+        ))
+
+    return router
@@ -0,0 +1,120 @@
+"""
+JSON序列化后端。
+安装了 orjson 时使用 orjson，否则回退到标准库 json；两者都输出紧凑、不转义非ASCII字符的UTF-8。
+已编码的JSON（如数据库中的JSON列）用 RawJSON 包装后可原样嵌入响应，不经过解码再编码。
+"""
+
+import json
+import uuid
+from typing import Any, Dict, Union
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+class RawJSON:
+    """已编码的JSON片段，序列化时原样写入输出。"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: Union[str, bytes]):
+        """
+        Args:
+            data: 合法的JSON文本，调用方负责保证其有效性
+        """
+        self.data = data.encode("utf-8") if isinstance(data, str) else data
+
+    def __repr__(self) -> str:
+        return f"RawJSON({len(self.data)} bytes)"
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, RawJSON) and other.data == self.data
+
+    def __hash__(self) -> int:
+        return hash(self.data)
+
+    def decode(self) -> Any:
+        """解码为Python对象。"""
+        return loads(self.data)
+
+
+class _Fragments:
+    """
+    序列化过程中收集 RawJSON 片段。
+
+    两个后端都不支持在输出中嵌入原始字节，先将片段替换为带随机标记的占位字符串，
+    编码完成后再替换回片段内容。
+    """
+
+    def __init__(self):
+        self.nonce = ""
+        self.parts: Dict[bytes, bytes] = {}
+
+    def default(self, obj: Any) -> Any:
+        if isinstance(obj, RawJSON):
+            if not self.nonce:
+                self.nonce = uuid.uuid4().hex
+            key = f"\x00{self.nonce}:{len(self.parts)}\x00"
+            # 两个后端都把控制字符 \x00 编码为 \u0000
+            self.parts[json.dumps(key).encode()] = obj.data
+            return key
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def splice(self, output: bytes) -> bytes:
+        for placeholder, data in self.parts.items():
+            output = output.replace(placeholder, data, 1)
+        return output
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    将对象编码为UTF-8 JSON字节串。
+
+    Args:
+        obj: 可JSON序列化的对象，可以包含 RawJSON
+
+    Returns:
+        紧凑格式的JSON字节串
+
+    Raises:
+        TypeError: 如果对象包含无法序列化的类型
+    """
+    fragments = _Fragments()
+    if orjson is not None:
+        output = orjson.dumps(obj, default=fragments.default, option=orjson.OPT_NON_STR_KEYS)
+    else:
+        output = json.dumps(
+            obj, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=fragments.default
+        ).encode("utf-8")
+    return fragments.splice(output) if fragments.parts else output
+
+
+def dumps_text(obj: Any) -> str:
+    """将对象编码为JSON字符串，用于写入TEXT列或SSE消息。"""
+    return dumps(obj).decode("utf-8")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    解码JSON文本。
+
+    Raises:
+        ValueError: 如果不是合法的JSON（json.JSONDecodeError 和 orjson.JSONDecodeError 都是其子类）
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """使用 dumps 编码的JSON响应，支持嵌入 RawJSON。"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
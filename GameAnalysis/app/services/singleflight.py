@@ -0,0 +1,88 @@
+"""
+并发相同请求的合并（single-flight）。
+同一时刻的相同调用只执行一次，结果分发给所有等待者。
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class _Call:
+    """一次进行中的共享调用。"""
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    按键合并并发调用。
+
+    共享调用在独立的任务中执行，等待者通过 asyncio.shield 等待结果，
+    因此某个等待者被取消（如客户端断开）不会中断其他人的调用；
+    只有最后一个等待者也离开时才取消共享调用。
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+
+        # 统计
+        self.leaders = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        执行或加入键为 key 的调用。
+
+        Args:
+            key: 判断调用是否相同的键
+            fn: 没有进行中的调用时执行的协程函数
+
+        Returns:
+            共享调用的结果；调用失败时所有等待者收到同一个异常
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # 没有人再需要结果，释放上游资源
+                self._forget(key, call)
+                call.task.cancel()
+                self.abandoned += 1
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        """移除已结束或被放弃的调用，后续相同请求重新发起。"""
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取合并统计。
+
+        Returns:
+            包含进行中的调用数、发起数、合并数和放弃数的字典
+        """
+        total = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesce_rate": round(self.coalesced / total, 4) if total else 0.0,
+            "abandoned": self.abandoned
+        }
@@ -0,0 +1,136 @@
+"""
+流式生成的解析工具。
+解析上游SSE数据帧，并从逐步到达的文本中增量提取JSON数组元素。
+"""
+
+import json
+from typing import Any, AsyncIterator, Dict, List
+import httpx
+
+from app.services.serialization import dumps_text, loads
+
+
+class JSONArrayStreamParser:
+    """
+    增量解析顶层JSON数组。
+
+    每次 feed 一段文本，返回其中已经闭合的数组元素对象。数组开始前的
+    内容（如markdown代码块标记）会被跳过；只跟踪括号深度和字符串状态，
+    不会重复扫描已经处理过的文本。
+    """
+
+    def __init__(self):
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._buffer: List[str] = []
+
+    @property
+    def started(self) -> bool:
+        """是否已经遇到数组起始的 '['。"""
+        return self._started
+
+    @property
+    def finished(self) -> bool:
+        """是否已经遇到数组结束的 ']'。"""
+        return self._finished
+
+    def feed(self, text: str) -> List[Any]:
+        """
+        输入一段文本。
+
+        Args:
+            text: 新到达的文本片段
+
+        Returns:
+            本次闭合的数组元素列表
+
+        Raises:
+            ValueError: 如果元素不是合法JSON
+        """
+        items = []
+        for char in text:
+            if self._finished:
+                break
+
+            if not self._started:
+                if char == "[":
+                    self._started = True
+                continue
+
+            if self._depth == 0:
+                # 数组层级：跳过元素之间的逗号和空白
+                if char == "]":
+                    self._finished = True
+                elif char in "{[":
+                    self._depth = 1
+                    self._buffer = [char]
+                elif not char.isspace() and char != ",":
+                    raise ValueError(f"数组元素必须是对象，遇到意外字符: {char!r}")
+                continue
+
+            self._buffer.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    raw = "".join(self._buffer)
+                    self._buffer = []
+                    try:
+                        items.append(loads(raw))
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"响应解析失败: {e}")
+
+        return items
+
+
+async def iter_sse_data(response: httpx.Response) -> AsyncIterator[Dict[str, Any]]:
+    """
+    逐个读取chat completions流式响应中的数据帧。
+
+    Args:
+        response: 以 stream 方式打开的HTTP响应
+
+    Yields:
+        每个 data: 帧解析后的JSON对象，遇到 [DONE] 时结束
+    """
+    async for line in response.aiter_lines():
+        line = line.strip()
+        if not line.startswith("data:"):
+            continue
+
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+
+        yield loads(data)
+
+
+def format_sse(event: str, data: Any) -> str:
+    """
+    格式化一条Server-Sent Events消息。
+
+    Args:
+        event: 事件名称
+        data: 可JSON序列化的事件数据
+
+    Returns:
+        SSE消息文本
+    """
+    payload = dumps_text(data)
+    return f"event: {event}\ndata: {payload}\n\n"
@@ -0,0 +1,103 @@
+"""
+本地桩AI提供商。
+不访问网络，按请求生成格式正确的占位题目，用于离线开发和测试。
+"""
+
+import random
+import asyncio
+import itertools
+from typing import Any, AsyncIterator, Dict, List
+
+from app.config.config import (
+    QuestionRequest, QuestionResponses, QuestionResponse,
+    SINGLE_SELECT, MULTI_SELECT
+)
+from app.services.deepseek import UpstreamError
+
+
+class StubClient:
+    """与 DeepSeekClient 接口一致的本地桩客户端。"""
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, failure_rate: float = 0.0):
+        """
+        初始化桩客户端。
+
+        Args:
+            latency: 每次生成的模拟耗时（秒）
+            jitter: 在 latency 基础上随机增加的最大耗时（秒）
+            failure_rate: 模拟失败的概率（0-1）
+        """
+        self.base_url = "stub://local"
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._serial = itertools.count(1)
+        self._requests = 0
+        self._failures = 0
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def available(self) -> bool:
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """获取桩客户端统计。"""
+        return {
+            "endpoint": self.base_url,
+            "latency": self.latency,
+            "failure_rate": self.failure_rate,
+            "requests": self._requests,
+            "failures": self._failures
+        }
+
+    def _maybe_fail(self) -> None:
+        """按 failure_rate 模拟一次上游故障。"""
+        if self.failure_rate and random.random() < self.failure_rate:
+            self._failures += 1
+            raise UpstreamError("桩提供商模拟失败")
+
+    async def _simulate(self) -> None:
+        """模拟上游耗时和故障。"""
+        self._requests += 1
+        await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        self._maybe_fail()
+
+    def _make_question(self, req: QuestionRequest) -> QuestionResponse:
+        """生成一道满足格式要求的占位题目，标题带序号保证不重复。"""
+        serial = next(self._serial)
+        title = f"关于{req.keyword}（{req.language}）的第{serial}道示例题？"
+
+        if req.type == SINGLE_SELECT:
+            answers = [f"{letter}: 示例选项{letter}" for letter in "ABCD"]
+            return QuestionResponse(title=title, answers=answers, rights=["A"])
+        if req.type == MULTI_SELECT:
+            answers = [f"{letter}: 示例选项{letter}" for letter in "ABCD"]
+            return QuestionResponse(title=title, answers=answers, rights=["A", "C"])
+        return QuestionResponse(title=title, answers=None, rights=None)
+
+    async def generate(self, req: QuestionRequest) -> QuestionResponses:
+        """
+        生成占位题目。
+
+        Args:
+            req: 题目生成请求
+
+        Returns:
+            QuestionResponses: req.count 道占位题目
+        """
+        await self._simulate()
+        questions: List[QuestionResponse] = [self._make_question(req) for _ in range(req.count)]
+        return QuestionResponses(questions=questions)
+
+    async def generate_stream(self, req: QuestionRequest) -> AsyncIterator[QuestionResponse]:
+        """逐个返回占位题目，模拟耗时平均分摊到每道题；模拟的故障发生在第一道题之前。"""
+        self._requests += 1
+        for index in range(req.count):
+            await asyncio.sleep(self.latency / req.count)
+            if index == 0:
+                self._maybe_fail()
+            yield self._make_question(req)
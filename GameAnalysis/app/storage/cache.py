@@ -0,0 +1,99 @@
+"""
+存储层查询结果缓存。
+缓存分页列表的总数，写操作时整体失效。
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class CountCache:
+    """
+    按过滤条件缓存COUNT结果的有界LRU缓存。
+
+    每次写操作递增 generation 并清空缓存；查询开始前记录的 generation
+    与写入时不一致说明期间发生过写操作，此时结果不再写入缓存，
+    避免把过期的计数重新放回去。
+    """
+
+    def __init__(self, max_size: int = 256, ttl: float = 30.0):
+        """
+        初始化计数缓存。
+
+        Args:
+            max_size: 最多缓存的过滤条件组合数，0表示关闭缓存
+            ttl: 缓存有效期（秒），用于兜底其他进程直接写库的情况
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation = 0
+        self._entries: "OrderedDict[Hashable, Tuple[int, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[int]:
+        """
+        读取缓存的计数。
+
+        Args:
+            key: 过滤条件组成的缓存键
+
+        Returns:
+            缓存的计数，未命中或已过期时返回None
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: int, generation: int) -> None:
+        """
+        写入计数。
+
+        Args:
+            key: 过滤条件组成的缓存键
+            value: 计数结果
+            generation: 开始查询时的 generation
+        """
+        if self.max_size <= 0 or generation != self.generation:
+            return
+
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """写操作后清空全部缓存。"""
+        self.generation += 1
+        self.invalidations += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计。
+
+        Returns:
+            包含条目数和命中情况的字典
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations
+        }
@@ -3,56 +3,197 @@
 处理SQLite数据库连接和CRUD操作。
 """
 
-import json
 import sqlite3
-from typing import List, Dict, Any, Optional, Tuple
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from contextlib import asynccontextmanager
 import aiosqlite
 
+from app.config.config import DatabaseConfig, validate_database_config
+from app.storage.pool import ConnectionPool
+from app.storage.cache import CountCache
+from app.storage.migrations import run_migrations
+from app.storage.diagnostics import QueryLog, explain_query
+from app.storage.writer import WRITE_INSERT, WRITE_DELETE, WriteBatch, WriteCoalescer
+from app.services.metrics import DB_WRITE_QUEUE_WAIT, timed_query
+from app.services.serialization import RawJSON, dumps_text, loads
 
 
+# trigram分词器无法匹配少于3个字符的词，这类词改用LIKE过滤
+FTS_MIN_TERM_LENGTH = 3
 
-CREATE_TABLE_SQL = """
-CREATE TABLE IF NOT EXISTS questions (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    title TEXT NOT NULL,
-    type INTEGER NOT NULL,
-    language TEXT NOT NULL,
-    answers TEXT NOT NULL,
-    rights TEXT NOT NULL
-);
+# bm25列权重：标题命中比选项命中更相关
+FTS_RANK = "bm25(questions_fts, 10.0, 1.0)"
+
+INSERT_QUESTION_SQL = """
+INSERT INTO questions (type, title, language, answers, rights)
+VALUES (?, ?, ?, ?, ?)
 """
 
+# 按id删除时每条语句最多包含的id数，低于旧版SQLite默认的999个参数上限
+DELETE_CHUNK_SIZE = 500
+
+
+def build_fts_query(search: str) -> Tuple[str, List[str]]:
+    """
+    将用户输入拆分为FTS5查询和需要LIKE匹配的短词。
+
+    每个词都作为短语加引号，避免用户输入中的FTS5语法字符生效；
+    trigram分词下短语即子串匹配，天然支持前缀和中文词内匹配。
+
+    Args:
+        search: 用户搜索词，空白分隔的多个词按AND组合
+
+    Returns:
+        (FTS5 MATCH表达式, 短词列表)的元组，MATCH表达式可能为空
+    """
+    phrases = []
+    short_terms = []
+    for term in search.split():
+        if len(term) < FTS_MIN_TERM_LENGTH:
+            short_terms.append(term)
+        else:
+            phrases.append('"' + term.replace('"', '""') + '"')
+    return " ".join(phrases), short_terms
+
+
+class DeleteConflictError(RuntimeError):
+    """按条件删除时匹配行数超过上限或与调用方确认的行数不一致时抛出的异常。"""
+
+    def __init__(self, message: str, matched: int):
+        super().__init__(message)
+        self.matched = matched
+
 
 class Database:
     """SQLite操作的数据库包装器。"""
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, config: Optional[DatabaseConfig] = None):
         """
-        初始化数据库连接。
+        初始化数据库连接池（连接在首次使用时建立）。
 
         Args:
             db_path: SQLite数据库文件路径
+            config: 连接池和PRAGMA配置，默认使用DatabaseConfig的默认值
         """
         self.db_path = db_path
+        self.config = config or DatabaseConfig(path=db_path)
+        validate_database_config(self.config)
+
+        self.schema_version = 0
+        self.count_cache = CountCache(self.config.count_cache_size, self.config.count_cache_ttl)
+        self.pool = ConnectionPool(
+            db_path,
+            max_readers=self.config.pool_size,
+            acquire_timeout=self.config.pool_timeout,
+            on_connect=self._configure_connection
+        )
+        self.query_log: Optional[QueryLog] = None
+        self.writer: Optional[WriteCoalescer] = None
+        if self.config.write_batch_size > 0:
+            self.writer = WriteCoalescer(
+                self.apply_writes,
+                max_batch=self.config.write_batch_size,
+                max_latency=self.config.write_batch_latency_ms / 1000,
+                on_wait=DB_WRITE_QUEUE_WAIT.observe
+            )
+
+    async def _configure_connection(self, db: aiosqlite.Connection) -> None:
+        """为每个新连接设置PRAGMA（取值已在配置验证中限定）。"""
+        config = self.config
+        await db.execute(f"PRAGMA busy_timeout = {int(config.busy_timeout)}")
+        await db.execute(f"PRAGMA synchronous = {config.synchronous}")
+        await db.execute(f"PRAGMA cache_size = {int(config.cache_size)}")
+        await db.execute(f"PRAGMA mmap_size = {int(config.mmap_size)}")
+        await db.execute(f"PRAGMA temp_store = {config.temp_store}")
 
     async def init_db(self) -> None:
-        """初始化数据库并创建表。"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(CREATE_TABLE_SQL)
-            await db.commit()
+        """设置日志模式、执行结构迁移并预热连接池。"""
+        async with self.pool.writer() as db:
+            # journal_mode 持久化在数据库文件中，只需在写连接上设置一次
+            await db.execute(f"PRAGMA journal_mode = {self.config.journal_mode}")
+            self.schema_version = await run_migrations(db)
+        await self.pool.open()
 
     async def close(self) -> None:
-        """关闭数据库连接（兼容性占位符）。"""
-        pass
-    
+        """执行完写队列中的操作后关闭连接池中的全部连接。"""
+        if self.writer is not None:
+            await self.writer.close()
+        await self.pool.close()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """获取连接池统计信息。"""
+        return self.pool.stats()
+
+    def write_stats(self) -> Dict[str, Any]:
+        """获取写合并统计信息。"""
+        if self.writer is None:
+            return {"enabled": False}
+        return self.writer.stats()
+
+    def enable_query_log(self, size: int = 100) -> None:
+        """
+        开始记录只读查询，供 explain_queries 诊断。
+
+        Args:
+            size: 最多保留的不同查询数
+        """
+        self.query_log = QueryLog(size)
+
+    async def explain_queries(self, run: bool = True) -> List[Dict[str, Any]]:
+        """
+        对最近执行过的只读查询执行 EXPLAIN QUERY PLAN。
+
+        查询按SQL文本去重，使用最近一次执行时的参数重放，用于在线上确认查询是否命中索引。
+
+        Args:
+            run: 是否实际执行每个查询一次并统计耗时和返回行数
+
+        Returns:
+            每个查询的SQL、执行次数、计划文本和索引使用摘要，最近执行的在前
+
+        Raises:
+            ValueError: 如果没有调用 enable_query_log 开始记录
+        """
+        if self.query_log is None:
+            raise ValueError("查询记录未启用")
+
+        results = []
+        async with self.get_read_connection() as db:
+            for entry in self.query_log.entries():
+                try:
+                    plan = await explain_query(db, entry["sql"], entry["params"], run)
+                except sqlite3.Error as e:
+                    plan = {"error": str(e)}
+                results.append({"sql": entry["sql"], "calls": entry["calls"], **plan})
+        return results
+
+    async def list_indexes(self, table: str = "questions") -> List[str]:
+        """
+        列出表上的索引名（不计入查询记录）。
+
+        Args:
+            table: 表名，来自代码常量
+
+        Returns:
+            索引名列表
+        """
+        async with self.get_read_connection() as db:
+            cursor = await db.execute(f"PRAGMA index_list({table})")
+            return [row["name"] for row in await cursor.fetchall()]
+
     @asynccontextmanager
     async def get_connection(self):
-        """获取数据库连接上下文管理器。"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        """获取数据库连接上下文管理器（写连接，串行化）。"""
+        async with self.pool.writer() as db:
             yield db
 
+    @asynccontextmanager
+    async def get_read_connection(self):
+        """获取只读连接上下文管理器。"""
+        async with self.pool.reader() as db:
+            yield db
+
+    @timed_query
     async def select(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
         """
         执行SELECT查询并返回结果。
@@ -64,11 +205,14 @@ class Database:
         Returns:
             表示行的字典列表
         """
-        async with self.get_connection() as db:
+        if self.query_log is not None:
+            self.query_log.record(query, params)
+        async with self.get_read_connection() as db:
             cursor = await db.execute(query, params)
             rows = await cursor.fetchall()
             return [dict(row) for row in rows]
 
+    @timed_query
     async def get(self, query: str, params: tuple = ()) -> Optional[Dict[str, Any]]:
         """
         执行SELECT查询并返回单个结果。
@@ -80,11 +224,14 @@ class Database:
         Returns:
             表示单行的字典或None
         """
-        async with self.get_connection() as db:
+        if self.query_log is not None:
+            self.query_log.record(query, params)
+        async with self.get_read_connection() as db:
             cursor = await db.execute(query, params)
             row = await cursor.fetchone()
             return dict(row) if row else None
 
+    @timed_query
     async def execute(self, query: str, params: tuple = ()) -> int:
         """
         执行INSERT/UPDATE/DELETE查询。
@@ -99,8 +246,10 @@ class Database:
         async with self.get_connection() as db:
             cursor = await db.execute(query, params)
             await db.commit()
+            self.count_cache.invalidate()
             return cursor.rowcount
 
+    @timed_query
     async def execute_many(self, query: str, params_list: List[tuple]) -> int:
         """
         使用多个参数集执行查询。
@@ -115,6 +264,7 @@ class Database:
         async with self.get_connection() as db:
             cursor = await db.executemany(query, params_list)
             await db.commit()
+            self.count_cache.invalidate()
             return cursor.rowcount
     
 
@@ -123,21 +273,18 @@ class Database:
         """
         批量插入多个题目。
 
+        只计时实际执行的 apply_writes，在写合并队列中的等待记入 db_write_queue_wait_seconds。
+
         Args:
             questions: 题目字典列表
 
         Raises:
             ValueError: 如果批量插入失败
         """
-        query = """
-        INSERT INTO questions (type, title, language, answers, rights)
-        VALUES (?, ?, ?, ?, ?)
-        """
-
         params_list = []
         for q in questions:
-            answers_json = json.dumps(q["answers"], ensure_ascii=False)
-            rights_json = json.dumps(q["rights"], ensure_ascii=False)
+            answers_json = dumps_text(q["answers"])
+            rights_json = dumps_text(q["rights"])
 
             params_list.append((
                 q["type"],
@@ -147,14 +294,17 @@ class Database:
                 rights_json
             ))
 
-        async with self.get_connection() as db:
-            await db.executemany(query, params_list)
-            await db.commit()
+        if self.writer is not None:
+            await self.writer.insert(params_list)
+        else:
+            await self.apply_writes([(WRITE_INSERT, params_list)])
 
     async def batch_delete_questions(self, question_ids: List[int]) -> int:
         """
         根据ID批量删除题目。
 
+        与 batch_insert_questions 相同，只计时实际执行的 apply_writes。
+
         Args:
             question_ids: 要删除的题目ID列表
 
@@ -164,31 +314,139 @@ class Database:
         if not question_ids:
             return 0
 
-        placeholders = ",".join("?" * len(question_ids))
-        query = f"DELETE FROM questions WHERE id IN ({placeholders})"
+        if self.writer is not None:
+            return await self.writer.delete(list(question_ids))
+        return (await self.apply_writes([(WRITE_DELETE, list(question_ids))]))[0]
+
+    @timed_query
+    async def apply_writes(self, operations: WriteBatch) -> List[int]:
+        """
+        在一个事务中依次执行多个插入/删除操作。
+
+        启用写合并时由写队列调用，并发请求的操作共享一次写锁和一次提交；任一操作失败时整个事务回滚。
+
+        删除操作的id按 DELETE_CHUNK_SIZE 分块执行，同一操作的所有分块仍在这一个事务中。
+
+        Args:
+            operations: (操作类型, 参数列表) 序列，插入为每行的参数元组，删除为题目id
 
-        return await self.execute(query, tuple(question_ids))
+        Returns:
+            每个操作影响的行数
+        """
+        results = []
+        async with self.get_connection() as db:
+            for kind, params in operations:
+                if kind == WRITE_INSERT:
+                    await db.executemany(INSERT_QUESTION_SQL, params)
+                    results.append(len(params))
+                elif kind == WRITE_DELETE:
+                    deleted = 0
+                    # 分块执行，避免超过SQLite的参数个数上限和生成过长的语句
+                    for start in range(0, len(params), DELETE_CHUNK_SIZE):
+                        chunk = params[start:start + DELETE_CHUNK_SIZE]
+                        placeholders = ",".join("?" * len(chunk))
+                        cursor = await db.execute(f"DELETE FROM questions WHERE id IN ({placeholders})", tuple(chunk))
+                        deleted += cursor.rowcount
+                    results.append(deleted)
+                else:
+                    raise ValueError(f"无效的写操作: {kind}")
+            await db.commit()
+            self.count_cache.invalidate()
+        return results
     
-    async def get_questions_paginated(
+    @timed_query
+    async def delete_questions_by_filter(
+        self,
+        question_type: Optional[int] = None,
+        language: Optional[str] = None,
+        search: str = "",
+        min_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        expected_count: Optional[int] = None,
+        dry_run: bool = False
+    ) -> int:
+        """
+        删除符合过滤条件的全部题目，不需要先查询id。
+
+        条件之间为AND关系。先在写事务内统计匹配行数，超过 delete_max_rows
+        或与 expected_count 不一致时回滚，否则用一条DELETE语句删除，计数和删除之间不会插入其他写操作。
+
+        Args:
+            question_type: 按题目类型过滤
+            language: 按编程语言精确匹配
+            search: 标题搜索词，与分页查询的过滤条件相同
+            min_id: id下限（包含）
+            max_id: id上限（包含）
+            expected_count: 调用方确认的匹配行数，为None时不校验
+            dry_run: 为True时只统计匹配行数，不删除
+
+        Returns:
+            删除的行数；dry_run 时为匹配的行数
+
+        Raises:
+            ValueError: 如果没有任何过滤条件
+            DeleteConflictError: 如果匹配行数超过上限或与 expected_count 不一致
+        """
+        conditions, params = self._build_filters(search, question_type)
+
+        if language is not None:
+            conditions.append("language = ?")
+            params.append(language)
+
+        if min_id is not None:
+            conditions.append("id >= ?")
+            params.append(min_id)
+
+        if max_id is not None:
+            conditions.append("id <= ?")
+            params.append(max_id)
+
+        if not conditions:
+            raise ValueError("按条件删除至少需要一个过滤条件")
+
+        where_clause = " AND ".join(conditions)
+        count_query = f"SELECT COUNT(*) FROM questions WHERE {where_clause}"
+
+        if dry_run:
+            async with self.get_read_connection() as db:
+                cursor = await db.execute(count_query, tuple(params))
+                return (await cursor.fetchone())[0]
+
+        async with self.get_connection() as db:
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = await db.execute(count_query, tuple(params))
+                matched = (await cursor.fetchone())[0]
+                if matched > self.config.delete_max_rows:
+                    raise DeleteConflictError(
+                        f"匹配{matched}行，超过单次删除上限{self.config.delete_max_rows}行", matched
+                    )
+                if expected_count is not None and matched != expected_count:
+                    raise DeleteConflictError(f"匹配{matched}行，与确认的{expected_count}行不一致", matched)
+
+                cursor = await db.execute(f"DELETE FROM questions WHERE {where_clause}", tuple(params))
+                await db.commit()
+            except BaseException:
+                await db.rollback()
+                raise
+            self.count_cache.invalidate()
+            return cursor.rowcount
+
+    def _build_filters(
         self,
-        page: int = 1,
-        page_size: int = 10,
         search: str = "",
         question_type: Optional[int] = None
-    ) -> Tuple[List[Dict[str, Any]], int]:
+    ) -> Tuple[List[str], List[Any]]:
         """
-        获取分页题目，支持可选的搜索和类型过滤。
+        构建列表查询共用的过滤条件。
 
         Args:
-            page: 页码（从1开始）
-            page_size: 每页项目数
             search: 标题搜索词
             question_type: 按题目类型过滤
 
         Returns:
-            (题目列表, 总数)的元组
+            (条件列表, 参数列表)的元组
         """
-        # 构建WHERE条件
         conditions = []
         params = []
 
@@ -200,15 +458,187 @@ class Database:
             conditions.append("title LIKE ?")
             params.append(f"%{search}%")
 
+        return conditions, params
+
+    def _build_fts_filters(
+        self,
+        search: str,
+        question_type: Optional[int] = None
+    ) -> Tuple[str, List[str], List[Any], bool]:
+        """
+        构建全文搜索的FROM子句和过滤条件。
+
+        Args:
+            search: 搜索词
+            question_type: 按题目类型过滤
+
+        Returns:
+            (FROM子句, 条件列表, 参数列表, 是否使用全文索引)的元组
+        """
+        match_query, short_terms = build_fts_query(search)
+
+        conditions = []
+        params: List[Any] = []
+
+        if match_query:
+            conditions.append("questions_fts MATCH ?")
+            params.append(match_query)
+
+        if question_type is not None:
+            conditions.append("q.type = ?")
+            params.append(question_type)
+
+        for term in short_terms:
+            conditions.append("(q.title LIKE ? OR q.answers LIKE ?)")
+            params.extend([f"%{term}%", f"%{term}%"])
+
+        if match_query:
+            from_clause = "questions_fts JOIN questions q ON q.id = questions_fts.rowid"
+        else:
+            # 全部是短词时无法使用全文索引
+            from_clause = "questions q"
+
+        return from_clause, conditions, params, bool(match_query)
+
+    def _count_source(
+        self,
+        search: str,
+        question_type: Optional[int],
+        fts: bool
+    ) -> Tuple[Tuple[Any, ...], str, List[str], List[Any]]:
+        """构建计数查询的缓存键、FROM子句和过滤条件。"""
+        key = ("fts" if fts else "like", search, question_type)
+        if fts:
+            from_clause, conditions, params, _ = self._build_fts_filters(search, question_type)
+        else:
+            conditions, params = self._build_filters(search, question_type)
+            from_clause = "questions"
+        return key, from_clause, conditions, params
+
+    @timed_query
+    async def count_questions(
+        self,
+        search: str = "",
+        question_type: Optional[int] = None,
+        fts: bool = False
+    ) -> int:
+        """
+        统计符合过滤条件的题目数量，结果按过滤条件缓存到下一次写操作。
+
+        Args:
+            search: 搜索词
+            question_type: 按题目类型过滤
+            fts: 是否按全文搜索条件计数
+
+        Returns:
+            题目总数
+        """
+        key, from_clause, conditions, params = self._count_source(search, question_type, fts)
+
+        cached = self.count_cache.get(key)
+        if cached is not None:
+            return cached
+
+        generation = self.count_cache.generation
+
         where_clause = ""
         if conditions:
             where_clause = "WHERE " + " AND ".join(conditions)
 
-        # 获取总数
-        count_query = f"SELECT COUNT(*) as count FROM questions {where_clause}"
+        count_query = f"SELECT COUNT(*) as count FROM {from_clause} {where_clause}"
         count_result = await self.get(count_query, tuple(params))
         total = count_result["count"] if count_result else 0
 
+        self.count_cache.set(key, total, generation)
+        return total
+
+    @timed_query
+    async def estimate_questions_count(
+        self,
+        search: str = "",
+        question_type: Optional[int] = None,
+        fts: bool = False
+    ) -> Tuple[int, bool]:
+        """
+        快速估算符合过滤条件的题目数量。
+
+        优先使用缓存的精确值；无过滤条件时用id范围估算，
+        有过滤条件时最多计数到 count_estimate_cap 行即停止。
+
+        Args:
+            search: 搜索词
+            question_type: 按题目类型过滤
+            fts: 是否按全文搜索条件计数
+
+        Returns:
+            (题目数量, 是否为精确值)的元组
+        """
+        key, from_clause, conditions, params = self._count_source(search, question_type, fts)
+
+        cached = self.count_cache.get(key)
+        if cached is not None:
+            return cached, True
+
+        if not conditions:
+            # rowid的MIN/MAX只需读取B树两端；删除过的id会使估算偏大
+            row = await self.get("SELECT MIN(id) AS min_id, MAX(id) AS max_id FROM questions")
+            if not row or row["max_id"] is None:
+                return 0, True
+            return row["max_id"] - row["min_id"] + 1, False
+
+        generation = self.count_cache.generation
+        cap = self.config.count_estimate_cap
+
+        where_clause = "WHERE " + " AND ".join(conditions)
+        count_query = f"""
+        SELECT COUNT(*) as count FROM (
+            SELECT 1 FROM {from_clause} {where_clause} LIMIT ?
+        )
+        """
+        count_result = await self.get(count_query, tuple(params + [cap]))
+        total = count_result["count"] if count_result else 0
+
+        if total < cap:
+            self.count_cache.set(key, total, generation)
+            return total, True
+        return total, False
+
+    def count_cache_stats(self) -> Dict[str, Any]:
+        """获取计数缓存统计信息。"""
+        return self.count_cache.stats()
+
+    @timed_query
+    async def get_questions_paginated(
+        self,
+        page: int = 1,
+        page_size: int = 10,
+        search: str = "",
+        question_type: Optional[int] = None,
+        count_total: bool = True
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        获取分页题目，支持可选的搜索和类型过滤。
+
+        Args:
+            page: 页码（从1开始）
+            page_size: 每页项目数
+            search: 标题搜索词
+            question_type: 按题目类型过滤
+            count_total: 是否统计总数，为False时总数返回None
+
+        Returns:
+            (题目列表, 总数)的元组
+        """
+        # 获取总数
+        total = await self.count_questions(search, question_type) if count_total else None
+
+        # 构建WHERE条件
+        conditions, params = self._build_filters(search, question_type)
+
+        where_clause = ""
+        if conditions:
+            where_clause = "WHERE " + " AND ".join(conditions)
+
         # 获取分页数据
         offset = (page - 1) * page_size
         data_query = f"""
@@ -222,20 +652,288 @@ class Database:
         questions = await self.select(data_query, tuple(params))
 
         return questions, total
-    
+
+    @timed_query
+    async def get_questions_keyset(
+        self,
+        page_size: int = 10,
+        search: str = "",
+        question_type: Optional[int] = None,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        count_total: bool = True
+    ) -> Tuple[List[Dict[str, Any]], Optional[int], Optional[int], Optional[int]]:
+        """
+        基于游标（keyset）的分页，按id倒序排列。
+
+        通过 id 比较定位页起点，深分页不再扫描并丢弃 OFFSET 行。
+
+        Args:
+            page_size: 每页项目数
+            search: 标题搜索词
+            question_type: 按题目类型过滤
+            after_id: 返回排在该id之后（id更小）的题目
+            before_id: 返回排在该id之前（id更大）的题目
+            count_total: 是否统计总数，为False时总数返回None
+
+        Returns:
+            (题目列表, 总数, 下一页游标id, 上一页游标id)的元组
+
+        Raises:
+            ValueError: 如果同时指定 after_id 和 before_id
+        """
+        if after_id is not None and before_id is not None:
+            raise ValueError("after_id 和 before_id 不能同时指定")
+
+        total = await self.count_questions(search, question_type) if count_total else None
+
+        conditions, params = self._build_filters(search, question_type)
+
+        backward = before_id is not None
+        if after_id is not None:
+            conditions.append("id < ?")
+            params.append(after_id)
+        elif backward:
+            conditions.append("id > ?")
+            params.append(before_id)
+
+        where_clause = ""
+        if conditions:
+            where_clause = "WHERE " + " AND ".join(conditions)
+
+        # 多取一行用于判断该方向是否还有数据
+        data_query = f"""
+        SELECT id, title, type
+        FROM questions {where_clause}
+        ORDER BY id {"ASC" if backward else "DESC"}
+        LIMIT ?
+        """
+
+        params.append(page_size + 1)
+        questions = await self.select(data_query, tuple(params))
+
+        has_more = len(questions) > page_size
+        questions = questions[:page_size]
+
+        if backward:
+            questions.reverse()
+            has_next = True
+            has_prev = has_more
+        else:
+            has_next = has_more
+            has_prev = after_id is not None
+
+        next_id = questions[-1]["id"] if questions and has_next else None
+        prev_id = questions[0]["id"] if questions and has_prev else None
+
+        return questions, total, next_id, prev_id
+
+    @timed_query
+    async def get_questions_after(
+        self,
+        after_id: int = 0,
+        limit: int = 1000,
+        search: str = "",
+        question_type: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        按id升序读取一批完整的题目记录，用于导出。
+
+        Args:
+            after_id: 返回id大于该值的题目
+            limit: 最多返回的行数
+            search: 标题搜索词
+            question_type: 按题目类型过滤
+
+        Returns:
+            题目字典列表，answers/rights 为数据库中的JSON文本
+        """
+        conditions, params = self._build_filters(search, question_type)
+        conditions.append("id > ?")
+        params.extend([after_id, limit])
+
+        query = f"""
+        SELECT id, type, title, language, answers, rights
+        FROM questions WHERE {" AND ".join(conditions)}
+        ORDER BY id
+        LIMIT ?
+        """
+        return await self.select(query, tuple(params))
+
+    async def iter_questions(
+        self,
+        batch_size: Optional[int] = None,
+        search: str = "",
+        question_type: Optional[int] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        按id升序分批遍历符合过滤条件的全部题目。
+
+        每批用id定位起点并单独借用一次只读连接，遍历期间不长期占用连接或读事务，
+        消费方处理得慢也不会阻塞其他请求和WAL检查点；内存占用只与批大小有关。
+
+        Args:
+            batch_size: 每批行数，默认 export_batch_size
+            search: 标题搜索词
+            question_type: 按题目类型过滤
+
+        Yields:
+            题目字典列表
+        """
+        size = batch_size or self.config.export_batch_size
+        after_id = 0
+        while True:
+            batch = await self.get_questions_after(after_id, size, search, question_type)
+            if not batch:
+                return
+            yield batch
+            if len(batch) < size:
+                return
+            after_id = batch[-1]["id"]
+
+    @timed_query
+    async def search_questions(
+        self,
+        search: str,
+        page: int = 1,
+        page_size: int = 10,
+        question_type: Optional[int] = None,
+        count_total: bool = True
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        基于全文索引搜索题目标题和选项，按相关度排序。
+
+        Args:
+            search: 搜索词，空白分隔的多个词需同时命中
+            page: 页码（从1开始）
+            page_size: 每页项目数
+            question_type: 按题目类型过滤
+            count_total: 是否统计总数，为False时总数返回None
+
+        Returns:
+            (题目列表, 总数)的元组
+        """
+        total = await self.count_questions(search, question_type, fts=True) if count_total else None
+
+        from_clause, conditions, params, ranked = self._build_fts_filters(search, question_type)
+
+        where_clause = ""
+        if conditions:
+            where_clause = "WHERE " + " AND ".join(conditions)
+
+        if ranked:
+            order_clause = f"ORDER BY {FTS_RANK}, q.id DESC"
+        else:
+            order_clause = "ORDER BY q.id DESC"
+
+        offset = (page - 1) * page_size
+        data_query = f"""
+        SELECT q.id, q.title, q.type
+        FROM {from_clause} {where_clause}
+        {order_clause}
+        LIMIT ? OFFSET ?
+        """
+
+        params.extend([page_size, offset])
+        questions = await self.select(data_query, tuple(params))
+
+        return questions, total
+
+    @timed_query
+    async def create_job(self, job_id: str, request: Dict[str, Any], total: int, created_at: float) -> None:
+        """
+        创建待执行的生成任务记录。
+
+        Args:
+            job_id: 任务ID
+            request: 生成请求参数
+            total: 需要生成的题目总数
+            created_at: 创建时间戳
+        """
+        query = """
+        INSERT INTO generation_jobs (id, status, request, total, created_at)
+        VALUES (?, 'pending', ?, ?, ?)
+        """
+        # 任务表写入不影响题目计数，不走 execute() 以免清空计数缓存
+        async with self.get_connection() as db:
+            await db.execute(query, (job_id, dumps_text(request), total, created_at))
+            await db.commit()
+
+    @timed_query
+    async def update_job(self, job_id: str, **fields: Any) -> None:
+        """
+        更新生成任务的状态字段。
+
+        Args:
+            job_id: 任务ID
+            **fields: 要更新的字段，result 会被序列化为JSON
+
+        Raises:
+            ValueError: 如果字段名无效
+        """
+        allowed = {"status", "progress", "result", "error", "started_at", "finished_at"}
+        invalid = set(fields) - allowed
+        if invalid:
+            raise ValueError(f"无效的任务字段: {', '.join(sorted(invalid))}")
+
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = dumps_text(fields["result"])
+
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        query = f"UPDATE generation_jobs SET {assignments} WHERE id = ?"
+
+        async with self.get_connection() as db:
+            await db.execute(query, tuple(fields.values()) + (job_id,))
+            await db.commit()
+
+    @timed_query
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取生成任务。
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            任务字典，不存在时返回None。request 已解析；result 可能很大且只用于原样返回，
+            以 RawJSON 形式保留数据库中的编码，响应时直接写出而不解码再编码
+        """
+        job = await self.get("SELECT * FROM generation_jobs WHERE id = ?", (job_id,))
+        if job is None:
+            return None
+
+        job["request"] = loads(job["request"])
+        if job["result"] is not None:
+            job["result"] = RawJSON(job["result"])
+        return job
+
+    @timed_query
+    async def get_unfinished_job_ids(self) -> List[str]:
+        """
+        获取尚未完成的任务ID（按创建时间排序），用于重启后恢复执行。
+
+        Returns:
+            任务ID列表
+        """
+        rows = await self.select(
+            "SELECT id FROM generation_jobs WHERE status IN ('pending', 'running') ORDER BY created_at"
+        )
+        return [row["id"] for row in rows]
+
 
 
 
-async def init_database(db_path: str) -> Database:
+async def init_database(db_path: str, config: Optional[DatabaseConfig] = None) -> Database:
     """
     初始化数据库并返回Database实例。
 
     Args:
         db_path: SQLite数据库文件路径
+        config: 连接池和PRAGMA配置
 
     Returns:
         初始化的Database实例
     """
-    db = Database(db_path)
+    db = Database(db_path, config)
     await db.init_db()
     return db
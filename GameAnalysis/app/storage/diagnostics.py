@@ -0,0 +1,122 @@
+"""
+查询计划诊断。
+记录 Database 最近执行的只读查询（按SQL文本去重，保留最近一次的参数），
+并用 EXPLAIN QUERY PLAN 检查这些查询是否命中索引、是否需要全表扫描或临时排序。
+"""
+
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+import aiosqlite
+
+
+_INDEX_PATTERN = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+
+def normalize_query(query: str) -> str:
+    """将SQL文本中的连续空白合并为一个空格，同一查询的不同缩进视为同一条。"""
+    return " ".join(query.split())
+
+
+class QueryLog:
+    """按SQL文本去重、容量有限的最近查询记录。"""
+
+    def __init__(self, size: int = 100):
+        """
+        初始化查询记录。
+
+        Args:
+            size: 最多保留的不同查询数，超过时丢弃最久未执行的查询
+        """
+        self.size = size
+        self._queries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def record(self, query: str, params: tuple) -> None:
+        """
+        记录一次查询执行。
+
+        Args:
+            query: SQL查询字符串
+            params: 本次执行的参数，诊断时用它重放查询
+        """
+        sql = normalize_query(query)
+        entry = self._queries.get(sql)
+        if entry is None:
+            entry = {"sql": sql, "params": params, "calls": 0}
+            self._queries[sql] = entry
+            if len(self._queries) > self.size:
+                self._queries.popitem(last=False)
+        else:
+            self._queries.move_to_end(sql)
+            entry["params"] = params
+        entry["calls"] += 1
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """返回记录的查询，最近执行的在前。"""
+        return [dict(entry) for entry in reversed(self._queries.values())]
+
+    def clear(self) -> None:
+        """清空记录。"""
+        self._queries.clear()
+
+
+def summarize_plan(details: List[str]) -> Dict[str, Any]:
+    """
+    从查询计划中提取索引使用情况。
+
+    Args:
+        details: EXPLAIN QUERY PLAN 每行的 detail 文本
+
+    Returns:
+        使用的索引名、是否有不走索引的全表扫描、是否需要临时B树排序或分组
+    """
+    indexes: List[str] = []
+    for detail in details:
+        for name in _INDEX_PATTERN.findall(detail):
+            if name not in indexes:
+                indexes.append(name)
+
+    return {
+        "indexes": indexes,
+        # 虚拟表（FTS）的扫描由其自身索引完成，不计为全表扫描
+        "full_scan": any(
+            detail.startswith("SCAN ") and " USING " not in detail and "VIRTUAL TABLE" not in detail
+            for detail in details
+        ),
+        "temp_btree": any("USE TEMP B-TREE" in detail for detail in details)
+    }
+
+
+async def explain_query(
+    db: aiosqlite.Connection,
+    query: str,
+    params: Tuple[Any, ...] = (),
+    run: bool = True
+) -> Dict[str, Any]:
+    """
+    获取单个只读查询的执行计划，并可选地执行一次计时。
+
+    Args:
+        db: 只读连接
+        query: SELECT 查询
+        params: 查询参数
+        run: 是否实际执行查询并统计耗时和行数
+
+    Returns:
+        计划文本、索引使用摘要，以及（run为True时）耗时和返回行数
+    """
+    cursor = await db.execute(f"EXPLAIN QUERY PLAN {query}", params)
+    details = [row[3] for row in await cursor.fetchall()]
+
+    result: Dict[str, Any] = {"plan": details, **summarize_plan(details)}
+
+    if run:
+        start = time.perf_counter()
+        cursor = await db.execute(query, params)
+        rows = await cursor.fetchall()
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        result["rows"] = len(rows)
+
+    return result
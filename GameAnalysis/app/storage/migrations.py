@@ -0,0 +1,181 @@
+"""
+题目数据库的版本化迁移。
+通过SQLite的 user_version 记录已应用的结构版本。
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import List
+import aiosqlite
+
+
+logger = logging.getLogger(__name__)
+
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    type INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    answers TEXT NOT NULL,
+    rights TEXT NOT NULL
+);
+"""
+
+
+# 题目全文索引：外部内容表指向questions，trigram分词支持中文子串匹配
+CREATE_FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+        title,
+        answers,
+        content='questions',
+        content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN
+        INSERT INTO questions_fts(rowid, title, answers)
+        VALUES (new.id, new.title, new.answers);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN
+        INSERT INTO questions_fts(questions_fts, rowid, title, answers)
+        VALUES ('delete', old.id, old.title, old.answers);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS questions_fts_au AFTER UPDATE ON questions BEGIN
+        INSERT INTO questions_fts(questions_fts, rowid, title, answers)
+        VALUES ('delete', old.id, old.title, old.answers);
+        INSERT INTO questions_fts(rowid, title, answers)
+        VALUES (new.id, new.title, new.answers);
+    END
+    """,
+    # 为已有数据建立索引
+    "INSERT INTO questions_fts(questions_fts) VALUES ('rebuild')",
+]
+
+
+# AI生成后台任务
+CREATE_JOBS_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS generation_jobs (
+        id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        request TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        progress INTEGER NOT NULL DEFAULT 0,
+        result TEXT,
+        error TEXT,
+        created_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_generation_jobs_status ON generation_jobs(status, created_at)",
+]
+
+
+# 题目列表和过滤的索引。rowid（id）隐式附在每个索引项末尾：
+# (type, id, title) 按类型过滤时已按id有序，列表、游标翻页和按类型计数只读索引不回表；
+# (language, type) 用于按语言（及类型）过滤和删除，也是全表计数时最小的可扫描索引
+CREATE_QUESTION_INDEXES_SQL = [
+    "CREATE INDEX IF NOT EXISTS idx_questions_type_id ON questions(type, id, title)",
+    "CREATE INDEX IF NOT EXISTS idx_questions_language_type ON questions(language, type)",
+]
+
+
+@dataclass
+class Migration:
+    """单个结构迁移。"""
+    version: int
+    description: str
+    statements: List[str]
+
+
+# 按版本号递增排列；已发布的迁移不可修改，只能追加
+MIGRATIONS: List[Migration] = [
+    Migration(
+        version=1,
+        description="创建题目表",
+        statements=[CREATE_TABLE_SQL]
+    ),
+    Migration(
+        version=2,
+        description="创建题目全文索引（FTS5）",
+        statements=CREATE_FTS_SQL
+    ),
+    Migration(
+        version=3,
+        description="创建AI生成任务表",
+        statements=CREATE_JOBS_SQL
+    ),
+    Migration(
+        version=4,
+        description="创建题目列表和过滤索引",
+        statements=CREATE_QUESTION_INDEXES_SQL
+    ),
+]
+
+
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+    """
+    读取数据库当前结构版本。
+
+    Args:
+        db: 数据库连接
+
+    Returns:
+        PRAGMA user_version 的值
+    """
+    cursor = await db.execute("PRAGMA user_version")
+    row = await cursor.fetchone()
+    return row[0] if row else 0
+
+
+async def run_migrations(
+    db: aiosqlite.Connection,
+    migrations: List[Migration] = MIGRATIONS
+) -> int:
+    """
+    依次应用尚未执行的迁移，每个迁移在独立事务中完成。
+
+    Args:
+        db: 写连接
+        migrations: 按版本号递增排列的迁移列表
+
+    Returns:
+        迁移完成后的结构版本
+
+    Raises:
+        ValueError: 如果数据库版本高于程序已知的最新版本
+    """
+    current = await get_schema_version(db)
+    latest = migrations[-1].version if migrations else 0
+
+    if current > latest:
+        raise ValueError(f"数据库结构版本 {current} 高于程序支持的版本 {latest}")
+
+    for migration in migrations:
+        if migration.version <= current:
+            continue
+
+        await db.execute("BEGIN")
+        try:
+            for statement in migration.statements:
+                await db.execute(statement)
+            # PRAGMA不支持参数绑定，版本号来自代码常量
+            await db.execute(f"PRAGMA user_version = {int(migration.version)}")
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+        logger.info("数据库迁移完成", extra={"version": migration.version, "description": migration.description})
+        current = migration.version
+
+    return current
@@ -0,0 +1,291 @@
+"""
+SQLite异步连接池。
+复用aiosqlite连接，读连接有界复用，写连接单一且串行化。
+"""
+
+import time
+import sqlite3
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from contextlib import asynccontextmanager
+import aiosqlite
+
+
+ConnectHook = Callable[[aiosqlite.Connection], Awaitable[None]]
+
+
+class PoolClosedError(RuntimeError):
+    """连接池已关闭时获取连接抛出的异常。"""
+
+
+class PoolTimeoutError(TimeoutError):
+    """等待空闲连接超时抛出的异常。"""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_connection_lost(error: BaseException) -> bool:
+    """
+    判断异常是否说明连接本身已失效。
+
+    aiosqlite 在底层连接关闭后抛出 ValueError("no active connection")，
+    sqlite3 在已关闭的连接上操作时抛出 ProgrammingError；调用方代码自己抛出的
+    ValueError 等异常与连接状态无关。
+    """
+    if isinstance(error, sqlite3.ProgrammingError):
+        return "closed database" in str(error)
+    return isinstance(error, ValueError) and str(error) == "no active connection"
+
+
+class ConnectionPool:
+    """
+    aiosqlite连接池。
+
+    只读查询从最多 max_readers 个连接中借用；所有写操作共用
+    一个写连接，并通过锁串行执行，避免多个写者争抢SQLite写锁。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_readers: int = 4,
+        acquire_timeout: float = 10.0,
+        on_connect: Optional[ConnectHook] = None
+    ):
+        """
+        初始化连接池（不立即建立连接）。
+
+        Args:
+            db_path: SQLite数据库文件路径
+            max_readers: 只读连接的最大数量
+            acquire_timeout: 等待空闲连接的超时时间（秒）
+            on_connect: 每个新连接建立后执行的初始化回调
+        """
+        self.db_path = db_path
+        self.max_readers = max_readers
+        self.acquire_timeout = acquire_timeout
+        self._on_connect = on_connect
+
+        self._idle: List[aiosqlite.Connection] = []
+        self._all_readers: List[aiosqlite.Connection] = []
+        self._reader_available = asyncio.Condition()
+        self._opening = 0
+
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._writer_lock = asyncio.Lock()
+
+        self._closed = False
+
+        # 监控统计
+        self._readers_in_use = 0
+        self._writer_in_use = False
+        self._reader_waiters = 0
+        self._writer_waiters = 0
+        self._acquisitions = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    async def _connect(self) -> aiosqlite.Connection:
+        """建立一个新连接并执行初始化回调。"""
+        conn = await aiosqlite.connect(self.db_path)
+        conn.row_factory = aiosqlite.Row
+        try:
+            if self._on_connect:
+                await self._on_connect(conn)
+        except Exception:
+            await conn.close()
+            raise
+        return conn
+
+    def _record_wait(self, started: float) -> None:
+        """记录一次获取连接的等待时间。"""
+        waited = time.perf_counter() - started
+        self._acquisitions += 1
+        self._wait_time_total += waited
+        if waited > self._wait_time_max:
+            self._wait_time_max = waited
+
+    async def open(self) -> None:
+        """预热连接池：建立写连接和一个读连接。"""
+        if self._closed:
+            raise PoolClosedError("连接池已关闭")
+
+        async with self._writer_lock:
+            if self._writer is None:
+                self._writer = await self._connect()
+
+        async with self._reader_available:
+            if not self._all_readers:
+                conn = await self._connect()
+                self._all_readers.append(conn)
+                self._idle.append(conn)
+
+    async def _acquire_reader(self) -> aiosqlite.Connection:
+        """借出一个读连接，必要时新建或等待。"""
+        started = time.perf_counter()
+        deadline = started + self.acquire_timeout
+        conn = None
+
+        async with self._reader_available:
+            while True:
+                if self._closed:
+                    raise PoolClosedError("连接池已关闭")
+
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+
+                if len(self._all_readers) + self._opening < self.max_readers:
+                    # 预占名额，在锁外建立连接
+                    self._opening += 1
+                    break
+
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"等待数据库连接超时（{self.acquire_timeout}秒）"
+                    )
+
+                self._reader_waiters += 1
+                try:
+                    await asyncio.wait_for(self._reader_available.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    self._reader_waiters -= 1
+
+            if conn is not None:
+                self._readers_in_use += 1
+
+        if conn is None:
+            try:
+                conn = await self._connect()
+            except BaseException:
+                async with self._reader_available:
+                    self._opening -= 1
+                    self._reader_available.notify()
+                raise
+            async with self._reader_available:
+                self._opening -= 1
+                self._all_readers.append(conn)
+                self._readers_in_use += 1
+
+        self._record_wait(started)
+        return conn
+
+    async def _release_reader(self, conn: aiosqlite.Connection, discard: bool) -> None:
+        """归还读连接；连接异常时直接丢弃。"""
+        async with self._reader_available:
+            self._readers_in_use -= 1
+            if discard or self._closed:
+                if conn in self._all_readers:
+                    self._all_readers.remove(conn)
+            else:
+                self._idle.append(conn)
+            self._reader_available.notify()
+
+        if discard or self._closed:
+            await conn.close()
+
+    @asynccontextmanager
+    async def reader(self):
+        """获取只读连接的上下文管理器。"""
+        conn = await self._acquire_reader()
+        discard = False
+        try:
+            yield conn
+        except Exception as e:
+            # 只有连接失效时才丢弃，调用方的普通异常不影响连接复用
+            discard = is_connection_lost(e)
+            raise
+        finally:
+            await self._release_reader(conn, discard)
+
+    @asynccontextmanager
+    async def writer(self):
+        """
+        获取唯一写连接的上下文管理器。
+
+        持有期间其他写者排队等待；块内异常时回滚未提交的事务。
+        """
+        if self._closed:
+            raise PoolClosedError("连接池已关闭")
+
+        started = time.perf_counter()
+        self._writer_waiters += 1
+        try:
+            await asyncio.wait_for(self._writer_lock.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise PoolTimeoutError(f"等待写连接超时（{self.acquire_timeout}秒）")
+        finally:
+            self._writer_waiters -= 1
+
+        try:
+            if self._closed:
+                raise PoolClosedError("连接池已关闭")
+            if self._writer is None:
+                self._writer = await self._connect()
+
+            self._record_wait(started)
+            self._writer_in_use = True
+            try:
+                yield self._writer
+            except BaseException:
+                if self._writer.in_transaction:
+                    await self._writer.rollback()
+                raise
+            finally:
+                self._writer_in_use = False
+        finally:
+            self._writer_lock.release()
+
+    async def close(self) -> None:
+        """关闭连接池并释放全部连接。"""
+        if self._closed:
+            return
+        self._closed = True
+
+        async with self._reader_available:
+            idle = list(self._idle)
+            self._idle.clear()
+            for conn in idle:
+                self._all_readers.remove(conn)
+            self._reader_available.notify_all()
+
+        for conn in idle:
+            await conn.close()
+
+        async with self._writer_lock:
+            if self._writer is not None:
+                await self._writer.close()
+                self._writer = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取连接池运行统计。
+
+        Returns:
+            包含连接数、使用中数量、等待者和等待耗时的字典
+        """
+        avg_wait = self._wait_time_total / self._acquisitions if self._acquisitions else 0.0
+        return {
+            "closed": self._closed,
+            "max_readers": self.max_readers,
+            "readers_open": len(self._all_readers),
+            "readers_in_use": self._readers_in_use,
+            "readers_idle": len(self._idle),
+            "reader_waiters": self._reader_waiters,
+            "writer_open": self._writer is not None,
+            "writer_in_use": self._writer_in_use,
+            "writer_waiters": self._writer_waiters,
+            "acquisitions": self._acquisitions,
+            "timeouts": self._timeouts,
+            "wait_time_total_ms": round(self._wait_time_total * 1000, 3),
+            "wait_time_avg_ms": round(avg_wait * 1000, 3),
+            "wait_time_max_ms": round(self._wait_time_max * 1000, 3)
+        }
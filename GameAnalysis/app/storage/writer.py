@@ -0,0 +1,242 @@
+"""
+题目写操作合并。
+并发请求的插入和删除先进入队列，在短暂的等待窗口内收集后于一个事务中执行，
+多个小写操作共享一次写锁和一次提交（fsync），每个调用方仍得到自己操作的结果。
+"""
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+WRITE_INSERT = "insert"
+WRITE_DELETE = "delete"
+
+# (操作类型, 参数列表)：插入为每行的参数元组，删除为题目id
+WriteBatch = List[Tuple[str, List[Any]]]
+
+
+class WriterClosedError(RuntimeError):
+    """写队列关闭后提交写操作，或关闭时仍未执行的操作收到的异常。"""
+
+
+@dataclass
+class PendingWrite:
+    """等待执行的写操作。"""
+    kind: str
+    params: List[Any]
+    future: "asyncio.Future[int]"
+    enqueued_at: float
+
+
+class WriteCoalescer:
+    """
+    将并发写操作合并到同一事务的写队列。
+
+    第一个操作入队后最多等待 max_latency 秒，期间到达的操作一起执行；
+    累计行数达到 max_batch 时立即执行。执行期间到达的操作组成下一批，
+    因此写入繁忙时自然形成组提交。合并事务失败时逐个操作重试，只让出错的调用方收到异常。
+    """
+
+    def __init__(
+        self,
+        apply: Callable[[WriteBatch], Awaitable[List[int]]],
+        max_batch: int = 500,
+        max_latency: float = 0.002,
+        on_wait: Optional[Callable[[float], None]] = None
+    ):
+        """
+        初始化写队列。
+
+        Args:
+            apply: 在一个事务中依次执行一批写操作并返回每个操作影响行数的函数
+            max_batch: 每个事务最多包含的行数，单个超过该值的操作单独执行
+            max_latency: 操作入队后最多等待的时间（秒）
+            on_wait: 每个操作所在事务开始执行时以其排队时间（秒）调用，用于记录指标
+        """
+        self.apply = apply
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.on_wait = on_wait
+        self._closed = False
+
+        self._pending: Deque[PendingWrite] = deque()
+        self._pending_rows = 0
+        self._ready = asyncio.Event()
+        self._flusher: Optional["asyncio.Future[None]"] = None
+
+        # 统计
+        self.batches = 0
+        self.operations = 0
+        self.rows = 0
+        self.max_batch_operations = 0
+        self.fallbacks = 0
+
+    async def insert(self, params_list: List[Tuple[Any, ...]]) -> int:
+        """
+        提交插入操作并等待所在事务提交。
+
+        Args:
+            params_list: 每行的插入参数
+
+        Returns:
+            插入的行数
+        """
+        return await self._submit(WRITE_INSERT, params_list)
+
+    async def delete(self, ids: List[int]) -> int:
+        """
+        提交删除操作并等待所在事务提交。
+
+        Args:
+            ids: 要删除的题目id
+
+        Returns:
+            本操作删除的行数
+        """
+        return await self._submit(WRITE_DELETE, ids)
+
+    async def _submit(self, kind: str, params: List[Any]) -> int:
+        if self._closed:
+            raise WriterClosedError("写队列已关闭")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(PendingWrite(kind, params, future, loop.time()))
+        self._pending_rows += len(params)
+        if self._pending_rows >= self.max_batch:
+            self._ready.set()
+
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.ensure_future(self._flush_loop())
+
+        # 调用方被取消时，尚未执行的操作在取批次时丢弃
+        return await future
+
+    async def _flush_loop(self) -> None:
+        """执行队列中的操作直到队列为空。"""
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            timeout = self._pending[0].enqueued_at + self.max_latency - loop.time()
+            if timeout > 0 and self._pending_rows < self.max_batch:
+                self._ready.clear()
+                try:
+                    await asyncio.wait_for(self._ready.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self._take_batch()
+            if not batch:
+                continue
+            try:
+                await self._execute(batch)
+            except asyncio.CancelledError:
+                # 被取消时正在执行和仍在排队的调用方都收到异常，不会一直等待
+                error = WriterClosedError("写队列已取消")
+                for op in batch:
+                    self._resolve(op, error=error)
+                self._fail_pending(error)
+                raise
+
+    def _take_batch(self) -> List[PendingWrite]:
+        """从队首取出不超过 max_batch 行的操作，跳过已取消的调用方。"""
+        batch: List[PendingWrite] = []
+        rows = 0
+        while self._pending:
+            op = self._pending[0]
+            if batch and rows + len(op.params) > self.max_batch:
+                break
+            self._pending.popleft()
+            self._pending_rows -= len(op.params)
+            if op.future.done():
+                continue
+            batch.append(op)
+            rows += len(op.params)
+        return batch
+
+    async def _execute(self, batch: List[PendingWrite]) -> None:
+        """在一个事务中执行一批操作，失败时逐个重试。"""
+        if self.on_wait is not None:
+            now = asyncio.get_running_loop().time()
+            for op in batch:
+                self.on_wait(now - op.enqueued_at)
+
+        try:
+            results = await self.apply([(op.kind, op.params) for op in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                self._resolve(batch[0], error=e)
+                return
+            self.fallbacks += 1
+            logger.warning("合并写入失败，逐个重试", extra={"operations": len(batch), "error": str(e)})
+            for op in batch:
+                try:
+                    result = (await self.apply([(op.kind, op.params)]))[0]
+                except Exception as op_error:
+                    self._resolve(op, error=op_error)
+                else:
+                    self._record([op])
+                    self._resolve(op, result)
+            return
+
+        self._record(batch)
+        for op, result in zip(batch, results):
+            self._resolve(op, result)
+
+    def _record(self, batch: List[PendingWrite]) -> None:
+        self.batches += 1
+        self.operations += len(batch)
+        self.rows += sum(len(op.params) for op in batch)
+        self.max_batch_operations = max(self.max_batch_operations, len(batch))
+
+    @staticmethod
+    def _resolve(op: PendingWrite, result: int = 0, error: Optional[BaseException] = None) -> None:
+        if op.future.done():
+            return
+        if error is not None:
+            op.future.set_exception(error)
+        else:
+            op.future.set_result(result)
+
+    def _fail_pending(self, error: BaseException) -> None:
+        """让队列中尚未执行的操作全部失败。"""
+        while self._pending:
+            self._resolve(self._pending.popleft(), error=error)
+        self._pending_rows = 0
+
+    async def close(self) -> None:
+        """
+        停止接受新的写操作，等待已提交的操作执行完毕。
+
+        之后提交的操作抛出 WriterClosedError；执行过程被取消时，未执行的操作同样以该异常结束。
+        """
+        self._closed = True
+        if self._flusher is not None:
+            # wait 不会把刷新任务的取消传播给调用方
+            await asyncio.wait([self._flusher])
+        self._fail_pending(WriterClosedError("写队列已关闭"))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取写合并统计。
+
+        Returns:
+            事务数、合并的操作数和行数、单个事务最多合并的操作数以及失败重试次数
+        """
+        return {
+            "enabled": True,
+            "closed": self._closed,
+            "max_batch": self.max_batch,
+            "max_latency_ms": round(self.max_latency * 1000, 3),
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "operations": self.operations,
+            "rows": self.rows,
+            "operations_per_batch": round(self.operations / self.batches, 2) if self.batches else 0.0,
+            "max_batch_operations": self.max_batch_operations,
+            "fallbacks": self.fallbacks
+        }
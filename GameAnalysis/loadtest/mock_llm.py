@@ -0,0 +1,172 @@
+"""
+本地模拟的OpenAI兼容chat completions服务。
+按提示词中的数量和题型返回题目，可配置延迟分布、错误率、畸形JSON比例，支持流式返回。
+
+用法（在 GameAnalysis 目录下）：
+    python -m loadtest.mock_llm --port 9000 --latency-median 1.5 --error-rate 0.02
+然后以 DEEPSEEK_BASE_URL=http://127.0.0.1:9000/v1 启动服务。
+"""
+
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+import itertools
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class MockSettings:
+    """模拟服务的行为配置。"""
+    latency_median: float = 1.0  # 响应耗时中位数（秒）
+    latency_sigma: float = 0.5  # 对数正态分布的sigma，0表示固定耗时
+    error_rate: float = 0.0  # 返回500的比例
+    rate_limit_rate: float = 0.0  # 返回429（带Retry-After）的比例
+    malformed_rate: float = 0.0  # 返回无法解析的JSON内容的比例
+    retry_after: int = 1  # 429响应的Retry-After（秒）
+    stream_chunk_size: int = 24  # 流式返回时每个分片的字符数
+
+
+_COUNT = re.compile(r"请生成【(\d+)】道关于【(.+?)】的编程题")
+_serial = itertools.count(1)
+
+
+def sample_latency(settings: MockSettings) -> float:
+    """按对数正态分布采样一次响应耗时。"""
+    if settings.latency_sigma <= 0:
+        return settings.latency_median
+    return random.lognormvariate(0, settings.latency_sigma) * settings.latency_median
+
+
+def build_questions(prompt: str) -> List[Dict[str, Any]]:
+    """根据提示词中的数量、关键字和题型生成题目对象。"""
+    match = _COUNT.search(prompt)
+    count = int(match.group(1)) if match else 3
+    keyword = match.group(2) if match else "mock"
+
+    items = []
+    for _ in range(count):
+        title = f"[mock] 关于{keyword}的第{next(_serial)}道题？"
+        if "题目类型：编程题" in prompt:
+            items.append({"title": title, "answers": None, "rights": None})
+            continue
+
+        answers = [f"{letter}: 选项{letter}" for letter in "ABCD"]
+        rights = ["A", "C"] if "题目类型：多选题" in prompt else ["B"]
+        items.append({"title": title, "answers": answers, "rights": rights})
+    return items
+
+
+def create_mock_app(settings: MockSettings) -> FastAPI:
+    """
+    创建模拟服务应用。
+
+    Args:
+        settings: 行为配置
+
+    Returns:
+        FastAPI应用，提供 POST /v1/chat/completions 和 GET /v1/stats
+    """
+    app = FastAPI(title="Mock LLM")
+    counters: Dict[str, int] = {"requests": 0, "errors": 0, "rate_limited": 0, "malformed": 0}
+
+    async def stream_content(content: str, delay: float) -> AsyncIterator[str]:
+        size = settings.stream_chunk_size
+        chunks = [content[i:i + size] for i in range(0, len(content), size)] or [""]
+        per_chunk = delay / len(chunks)
+        for chunk in chunks:
+            await asyncio.sleep(per_chunk)
+            frame = {"choices": [{"index": 0, "delta": {"content": chunk}}]}
+            yield f"data: {json.dumps(frame, ensure_ascii=False)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        counters["requests"] += 1
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        delay = sample_latency(settings)
+
+        roll = random.random()
+        if roll < settings.error_rate:
+            counters["errors"] += 1
+            await asyncio.sleep(delay / 2)
+            return JSONResponse({"error": {"message": "mock upstream error"}}, status_code=500)
+
+        roll -= settings.error_rate
+        if roll < settings.rate_limit_rate:
+            counters["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "mock rate limit"}},
+                status_code=429,
+                headers={"Retry-After": str(settings.retry_after)}
+            )
+
+        content = json.dumps(build_questions(prompt), ensure_ascii=False)
+        if random.random() < settings.malformed_rate:
+            counters["malformed"] += 1
+            # 截断内容，模拟模型输出不完整的JSON
+            content = content[: max(len(content) // 2, 1)]
+
+        if body.get("stream"):
+            return StreamingResponse(stream_content(content, delay), media_type="text/event-stream")
+
+        await asyncio.sleep(delay)
+        prompt_tokens = sum(len(m["content"]) for m in body["messages"])
+        return {
+            "id": f"mock-{counters['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content),
+                "total_tokens": prompt_tokens + len(content)
+            }
+        }
+
+    @app.get("/v1/stats")
+    async def stats():
+        return dict(counters)
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地模拟的OpenAI兼容chat completions服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-median", type=float, default=1.0, help="响应耗时中位数（秒）")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="对数正态分布sigma，0为固定耗时")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回500的比例")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="返回429的比例")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="返回畸形JSON的比例")
+    parser.add_argument("--retry-after", type=int, default=1, help="429响应的Retry-After（秒）")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    settings = MockSettings(
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        malformed_rate=args.malformed_rate,
+        retry_after=args.retry_after
+    )
+    uvicorn.run(create_mock_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+端到端压测工具。
+以固定到达速率（开环）向服务发送 generate、generate_cached、batch-insert、summary、batch-delete 混合请求，
+报告吞吐量、状态码分布和延迟百分位。
+
+用法（在 GameAnalysis 目录下，服务已启动）：
+    python -m loadtest.run --url http://127.0.0.1:8080 --rps 20 --duration 30
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass, field
+from typing import Any, Callable, Awaitable, Dict, List, Optional, Set
+
+import httpx
+
+
+# 压测写入的题目标题前缀，用于查找和清理
+MARKER = "[loadtest]"
+
+DEFAULT_MIX = "generate=1,generate_cached=1,insert=2,summary=6,delete=1"
+
+# generate_cached 使用的固定关键字，预热后基本都命中缓存或合并到进行中的请求
+CACHED_KEYWORDS = ["golang并发", "python装饰器", "java集合", "css布局"]
+
+
+@dataclass
+class RouteStats:
+    """单个路由的请求结果。"""
+    latencies: List[float] = field(default_factory=list)
+    statuses: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, latency: float, status: str) -> None:
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    @property
+    def errors(self) -> int:
+        return sum(count for status, count in self.statuses.items() if not status.startswith("2"))
+
+
+def percentile(values: List[float], p: float) -> float:
+    """取第 p 百分位（最近秩），values 为空时返回0。"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(len(ordered) * p), len(ordered) - 1)
+    return ordered[index]
+
+
+def parse_mix(raw: str) -> Dict[str, float]:
+    """解析 "generate=1,summary=6" 形式的请求配比。"""
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"未知的请求类型: {name}（可选: {', '.join(SCENARIOS)}）")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class LoadTest:
+    """开环压测：按计划时间发出请求，不等待前一个请求完成。"""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        mix: Dict[str, float],
+        model: str = "auto",
+        max_outstanding: int = 500
+    ):
+        """
+        Args:
+            client: 指向被测服务的HTTP客户端
+            mix: 请求类型到权重的映射
+            model: generate 请求使用的AI提供商
+            max_outstanding: 同时未完成的请求上限，超过时丢弃并计入 dropped
+        """
+        self.client = client
+        self.mix = mix
+        self.model = model
+        self.max_outstanding = max_outstanding
+        self.results: Dict[str, RouteStats] = {name: RouteStats() for name in mix}
+        self.known_ids: Set[int] = set()
+        self.dropped = 0
+        self._outstanding = 0
+        self._serial = 0
+
+    async def _create_by_ai(self, keyword: str, no_cache: bool) -> httpx.Response:
+        return await self.client.post("/api/questions/CreateByAI", json={
+            "keyword": keyword,
+            "model": self.model,
+            "language": "go",
+            "count": 3,
+            "type": 1,
+            "no_cache": no_cache
+        })
+
+    async def generate(self) -> httpx.Response:
+        # 跳过缓存和请求合并，每个请求都到达上游，测量的是AI提供商（或模拟服务）路径
+        return await self._create_by_ai(f"golang并发 {random.getrandbits(32)}", no_cache=True)
+
+    async def generate_cached(self) -> httpx.Response:
+        return await self._create_by_ai(random.choice(CACHED_KEYWORDS), no_cache=False)
+
+    async def insert(self) -> httpx.Response:
+        questions = []
+        for _ in range(5):
+            self._serial += 1
+            questions.append({
+                "type": 1,
+                "title": f"{MARKER} 压测题目 {self._serial}-{random.getrandbits(32)}？",
+                "language": "go",
+                "answers": ["A: 1", "B: 2", "C: 3", "D: 4"],
+                "rights": ["A"]
+            })
+        return await self.client.post("/api/questions/batch-insert", json={"questions": questions})
+
+    async def summary(self) -> httpx.Response:
+        response = await self.client.get("/api/questions/summary", params={
+            "page_size": 20,
+            "search": MARKER if random.random() < 0.5 else "",
+            "total_mode": random.choice(["exact", "estimate"])
+        })
+        if response.status_code == 200:
+            # 记录压测写入的题目，供 delete 使用
+            for question in response.json()["data"]["questions"]:
+                if question["title"].startswith(MARKER):
+                    self.known_ids.add(question["id"])
+        return response
+
+    async def delete(self) -> httpx.Response:
+        ids = [self.known_ids.pop() for _ in range(min(5, len(self.known_ids)))]
+        return await self.client.request(
+            "DELETE", "/api/questions/batch-delete", json={"ids": ids or [-1]}
+        )
+
+    async def _fire(self, name: str) -> None:
+        self._outstanding += 1
+        start = time.monotonic()
+        try:
+            response = await SCENARIOS[name](self)
+            status = str(response.status_code)
+        except httpx.TimeoutException:
+            status = "timeout"
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        finally:
+            self._outstanding -= 1
+        self.results[name].record(time.monotonic() - start, status)
+
+    async def run(self, rps: float, duration: float) -> float:
+        """
+        按目标速率发送请求并等待全部完成。
+
+        Returns:
+            实际耗时（秒）
+        """
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        total = int(rps * duration)
+        tasks = []
+
+        start = time.monotonic()
+        for i in range(total):
+            delay = start + i / rps - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            if self._outstanding >= self.max_outstanding:
+                self.dropped += 1
+                continue
+            name = random.choices(names, weights)[0]
+            tasks.append(asyncio.ensure_future(self._fire(name)))
+
+        await asyncio.gather(*tasks)
+        return time.monotonic() - start
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        """汇总每个路由和总体的吞吐量与延迟。"""
+        routes = {}
+        all_latencies: List[float] = []
+        completed = 0
+        errors = 0
+        for name, stats in self.results.items():
+            all_latencies.extend(stats.latencies)
+            completed += len(stats.latencies)
+            errors += stats.errors
+            routes[name] = summarize(stats.latencies, elapsed)
+            routes[name]["statuses"] = dict(stats.statuses)
+
+        overall = summarize(all_latencies, elapsed)
+        overall["errors"] = errors
+        overall["error_rate"] = round(errors / completed, 4) if completed else 0.0
+        overall["dropped"] = self.dropped
+        overall["elapsed_s"] = round(elapsed, 2)
+        return {"overall": overall, "routes": routes}
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, Any]:
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p90_ms": round(percentile(latencies, 0.90) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 1)
+    }
+
+
+SCENARIOS: Dict[str, Callable[[LoadTest], Awaitable[httpx.Response]]] = {
+    "generate": LoadTest.generate,
+    "generate_cached": LoadTest.generate_cached,
+    "insert": LoadTest.insert,
+    "summary": LoadTest.summary,
+    "delete": LoadTest.delete
+}
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    overall = report["overall"]
+    print(
+        f"\n总计 {overall['requests']} 个请求，耗时 {overall['elapsed_s']}s，"
+        f"吞吐 {overall['throughput_rps']} req/s，错误率 {overall['error_rate']:.2%}，"
+        f"丢弃 {overall['dropped']}"
+    )
+    header = f"{'route':<16}{'count':>8}{'rps':>8}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}  statuses"
+    print(header)
+    print("-" * len(header))
+    for name, row in list(report["routes"].items()) + [("ALL", overall)]:
+        statuses = " ".join(f"{k}:{v}" for k, v in sorted(row.get("statuses", {}).items()))
+        print(
+            f"{name:<16}{row['requests']:>8}{row['throughput_rps']:>8}"
+            f"{row['p50_ms']:>9}{row['p90_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['max_ms']:>9}  {statuses}"
+        )
+    print("（延迟单位：毫秒）")
+
+
+async def run_load_test(
+    url: str,
+    rps: float,
+    duration: float,
+    mix: Dict[str, float],
+    model: str = "auto",
+    timeout: float = 60.0,
+    max_outstanding: int = 500,
+    transport: Optional[httpx.AsyncBaseTransport] = None
+) -> Dict[str, Any]:
+    """
+    执行一次压测并返回报告。
+
+    Args:
+        url: 被测服务地址
+        rps: 目标每秒请求数
+        duration: 持续时间（秒）
+        mix: 请求类型配比
+        model: generate 请求使用的AI提供商
+        timeout: 单个请求超时（秒）
+        max_outstanding: 同时未完成的请求上限
+        transport: 自定义传输层（如 httpx.ASGITransport，用于进程内压测）
+
+    Returns:
+        压测报告字典
+    """
+    limits = httpx.Limits(max_connections=max_outstanding, max_keepalive_connections=max_outstanding)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits, transport=transport) as client:
+        test = LoadTest(client, mix, model=model, max_outstanding=max_outstanding)
+        elapsed = await test.run(rps, duration)
+        return test.report(elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="题目服务端到端压测")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="被测服务地址")
+    parser.add_argument("--rps", type=float, default=10, help="目标每秒请求数")
+    parser.add_argument("--duration", type=float, default=30, help="持续时间（秒）")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"请求配比，默认 {DEFAULT_MIX}")
+    parser.add_argument("--model", default="auto", help="generate 请求使用的AI提供商")
+    parser.add_argument("--timeout", type=float, default=60, help="单个请求超时（秒）")
+    parser.add_argument("--max-outstanding", type=int, default=500, help="同时未完成的请求上限")
+    parser.add_argument("--json", dest="json_path", help="将报告写入JSON文件")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(
+        args.url, args.rps, args.duration, parse_mix(args.mix),
+        model=args.model, timeout=args.timeout, max_outstanding=args.max_outstanding
+    ))
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+AI响应解析基准：DeepSeekClient._parse_response。
+"""
+
+import json
+
+import pytest
+
+from app.config.config import QuestionRequest, SINGLE_SELECT, MULTI_SELECT, CODING
+from app.services.deepseek import DeepSeekClient
+
+
+def build_content(req: QuestionRequest, fenced: bool) -> str:
+    """构造与模型实际输出相近的响应内容。"""
+    items = []
+    for i in range(req.count):
+        title = f"在{req.language}中，关于{req.keyword}的第{i + 1}个说法，下列哪些描述是正确的？请结合实际场景分析。"
+        if req.type == CODING:
+            items.append({"title": title, "answers": None, "rights": None})
+            continue
+        answers = [f"{letter}: 关于{req.keyword}的选项{letter}，包含一段较长的解释文字用于模拟真实输出" for letter in "ABCD"]
+        rights = ["A", "C"] if req.type == MULTI_SELECT else ["B"]
+        items.append({"title": title, "answers": answers, "rights": rights})
+
+    content = json.dumps(items, ensure_ascii=False, indent=2)
+    return f"```json\n{content}\n```" if fenced else content
+
+
+CASES = {
+    "single-3": (QuestionRequest(keyword="golang并发", language="go", count=3, type=SINGLE_SELECT), False),
+    "multi-10-fenced": (QuestionRequest(keyword="python装饰器", language="python", count=10, type=MULTI_SELECT), True),
+    "coding-10": (QuestionRequest(keyword="二叉树遍历", language="java", count=10, type=CODING), False)
+}
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_parse_response(benchmark, case):
+    req, fenced = CASES[case]
+    client = DeepSeekClient("bench-key")
+    content = build_content(req, fenced)
+
+    result = benchmark(client._parse_response, content, req)
+    assert len(result.questions) == req.count
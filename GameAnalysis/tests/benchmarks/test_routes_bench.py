@@ -0,0 +1,83 @@
+"""
+端到端路由延迟基准：通过ASGI传输直接调用完整应用（含中间件、控制器和数据库），
+AI生成使用零耗时的桩提供商，只测服务自身的开销。
+"""
+
+import os
+import json
+
+import httpx
+import pytest
+
+from tests.conftest import make_questions
+
+
+SEEDED_ROWS = 20000
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory, event_loop_runner):
+    """启动应用生命周期并返回指向它的HTTP客户端。"""
+    overrides = {
+        "DB_PATH": str(tmp_path_factory.mktemp("routes") / "bench.db"),
+        "AI_STUB_PROVIDER": "true",
+        "AI_STUB_LATENCY": "0"
+    }
+    saved = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+
+    from app import main
+
+    lifespan = main.app.router.lifespan_context(main.app)
+    event_loop_runner(lifespan.__aenter__())
+    event_loop_runner(main.database.batch_insert_questions(make_questions(SEEDED_ROWS)))
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench")
+
+    yield lambda method, url, **kwargs: event_loop_runner(http.request(method, url, **kwargs))
+
+    event_loop_runner(http.aclose())
+    event_loop_runner(lifespan.__aexit__(None, None, None))
+    for name, value in saved.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+
+
+@pytest.mark.parametrize("params", [
+    {"page": 1, "page_size": 20},
+    {"page": SEEDED_ROWS // 20 - 1, "page_size": 20},
+    {"page": 1, "page_size": 20, "search": "golang"}
+], ids=["shallow", "deep", "search"])
+def test_summary(benchmark, client, params):
+    response = benchmark(client, "GET", "/api/questions/summary", params=params)
+    assert response.status_code == 200
+
+
+def test_batch_insert_route(benchmark, client):
+    body = {"questions": make_questions(100, prefix="路由基准")}
+
+    response = benchmark(client, "POST", "/api/questions/batch-insert", json=body)
+    assert response.status_code == 200
+
+
+def test_import_route(benchmark, client):
+    lines = [json.dumps(question, ensure_ascii=False) for question in make_questions(100, prefix="导入基准")]
+    body = ("\n".join(lines) + "\n").encode("utf-8")
+
+    response = benchmark(
+        client, "POST", "/api/questions/import", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    assert response.json()["data"]["inserted"] == 100
+
+
+@pytest.mark.parametrize("no_cache", [False, True], ids=["cached", "uncached"])
+def test_create_by_ai(benchmark, client, no_cache):
+    body = {
+        "keyword": "golang并发", "model": "stub", "language": "go",
+        "count": 3, "type": 1, "no_cache": no_cache
+    }
+
+    response = benchmark(client, "POST", "/api/questions/CreateByAI", json=body)
+    assert response.status_code == 200
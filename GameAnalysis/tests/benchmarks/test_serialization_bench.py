@@ -0,0 +1,42 @@
+"""
+JSON序列化基准：success_response 编码题目列表，以及任务结果的解码再编码与 RawJSON 原样写出。
+"""
+
+import json
+
+import pytest
+
+from app.api.response import success_response
+from app.services import serialization
+from app.services.serialization import RawJSON, dumps_text, loads
+from tests.conftest import make_questions
+
+
+BACKENDS = ["orjson", "json"] if serialization.orjson is not None else ["json"]
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    """依次使用 orjson 和标准库 json 后端。"""
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+
+@pytest.mark.parametrize("rows", [100, 1_000])
+def test_success_response(benchmark, backend, rows):
+    questions = make_questions(rows)
+    response = benchmark(success_response, {"total": rows, "questions": questions})
+    assert json.loads(response.body)["data"]["total"] == rows
+
+
+@pytest.mark.parametrize("passthrough", [False, True], ids=["decode", "raw"])
+def test_job_result(benchmark, backend, passthrough):
+    stored = dumps_text(make_questions(1_000))
+
+    def respond():
+        result = RawJSON(stored) if passthrough else loads(stored)
+        return success_response({"job_id": "bench", "questions": result})
+
+    response = benchmark(respond)
+    assert len(json.loads(response.body)["data"]["questions"]) == 1_000
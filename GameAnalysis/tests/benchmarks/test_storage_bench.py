@@ -0,0 +1,127 @@
+"""
+存储层热点路径基准：批量插入、并发小批量写入、分页查询、批量删除和流式导出。
+"""
+
+import asyncio
+
+import pytest
+
+from app.config.config import DatabaseConfig
+from app.services.exporter import QuestionExporter
+from app.storage.database import init_database
+from tests.conftest import make_questions, open_database
+
+
+# 分页基准使用的数据量
+SEEDED_ROWS = 50000
+PAGE_SIZE = 20
+
+
+@pytest.fixture(scope="module")
+def seeded_database(tmp_path_factory, event_loop_runner):
+    """预先写入 SEEDED_ROWS 道题目的只读数据库，模块内共享。"""
+    path = str(tmp_path_factory.mktemp("seeded") / "bench.db")
+    db = event_loop_runner(open_database(path))
+    event_loop_runner(db.batch_insert_questions(make_questions(SEEDED_ROWS)))
+    yield db
+    event_loop_runner(db.close())
+
+
+@pytest.mark.parametrize("rows", [1000, 100000], ids=["1k", "100k"])
+def test_batch_insert(benchmark, database, event_loop_runner, rows):
+    questions = make_questions(rows)
+
+    benchmark.pedantic(
+        lambda: event_loop_runner(database.batch_insert_questions(questions)),
+        rounds=5 if rows <= 1000 else 2,
+        warmup_rounds=1 if rows <= 1000 else 0
+    )
+
+
+@pytest.mark.parametrize("write_batch_size", [0, 500], ids=["direct", "coalesced"])
+def test_concurrent_small_inserts(benchmark, tmp_path, event_loop_runner, write_batch_size):
+    # 200 个并发请求各插入一道题，模拟界面上的零散写入
+    path = str(tmp_path / "bench.db")
+    db = event_loop_runner(init_database(path, DatabaseConfig(path=path, write_batch_size=write_batch_size)))
+    questions = make_questions(200)
+
+    async def insert_concurrently():
+        await asyncio.gather(*(db.batch_insert_questions([question]) for question in questions))
+
+    benchmark.pedantic(lambda: event_loop_runner(insert_concurrently()), rounds=5, warmup_rounds=1)
+    event_loop_runner(db.close())
+
+
+@pytest.mark.parametrize("page", [1, SEEDED_ROWS // PAGE_SIZE - 1], ids=["shallow", "deep"])
+@pytest.mark.parametrize("search", ["", "golang"], ids=["all", "search"])
+def test_get_questions_paginated(benchmark, seeded_database, event_loop_runner, page, search):
+    # 计数走 count_cache，这里只测分页查询本身
+    questions, _ = benchmark(
+        lambda: event_loop_runner(seeded_database.get_questions_paginated(
+            page=page, page_size=PAGE_SIZE, search=search, count_total=False
+        ))
+    )
+    assert len(questions) == PAGE_SIZE
+
+
+@pytest.mark.parametrize("page", [1, SEEDED_ROWS // PAGE_SIZE - 1], ids=["shallow", "deep"])
+def test_get_questions_by_type(benchmark, seeded_database, event_loop_runner, page):
+    # 按类型过滤时分页只读 idx_questions_type_id 覆盖索引
+    questions, _ = benchmark(
+        lambda: event_loop_runner(seeded_database.get_questions_paginated(
+            page=page, page_size=PAGE_SIZE, question_type=1, count_total=False
+        ))
+    )
+    assert len(questions) == PAGE_SIZE
+
+
+@pytest.mark.parametrize("search,expected", [("第49999题", 1), ("泄漏", 0)], ids=["fts", "short-term"])
+def test_search_questions(benchmark, seeded_database, event_loop_runner, search, expected):
+    # 3 个字符以上的词走 trigram 全文索引；2 个字符的中文词无法用 trigram 索引，
+    # 回退为对标题和选项的 LIKE 扫描，没有命中时扫描全表
+    questions, _ = benchmark(
+        lambda: event_loop_runner(seeded_database.search_questions(search, page_size=PAGE_SIZE, count_total=False))
+    )
+    assert len(questions) == expected
+
+
+@pytest.mark.parametrize("size", [1000, 10000, 100000], ids=["1k", "10k", "100k"])
+def test_batch_delete(benchmark, database, event_loop_runner, size):
+    async def insert_batch():
+        await database.batch_insert_questions(make_questions(size))
+        rows = await database.select("SELECT id FROM questions ORDER BY id DESC LIMIT ?", (size,))
+        return ([row["id"] for row in rows],), {}
+
+    deleted = benchmark.pedantic(
+        lambda ids: event_loop_runner(database.batch_delete_questions(ids)),
+        setup=lambda: event_loop_runner(insert_batch()),
+        rounds=5
+    )
+    assert deleted == size
+
+
+def test_delete_by_filter(benchmark, database, event_loop_runner):
+    size = 10000
+
+    async def insert_batch():
+        row = await database.get("SELECT COALESCE(MAX(id), 0) AS max_id FROM questions")
+        await database.batch_insert_questions(make_questions(size))
+        return (row["max_id"] + 1,), {}
+
+    deleted = benchmark.pedantic(
+        lambda min_id: event_loop_runner(database.delete_questions_by_filter(min_id=min_id)),
+        setup=lambda: event_loop_runner(insert_batch()),
+        rounds=5
+    )
+    assert deleted == size
+
+
+@pytest.mark.parametrize("fmt,gzip", [("ndjson", False), ("csv", False), ("csv", True)], ids=["ndjson", "csv", "csv-gzip"])
+def test_export(benchmark, seeded_database, event_loop_runner, fmt, gzip):
+    exporter = QuestionExporter(seeded_database, batch_size=1000)
+
+    async def export():
+        return sum([len(chunk) async for chunk in exporter.stream(fmt, gzip=gzip)])
+
+    size = benchmark.pedantic(lambda: event_loop_runner(export()), rounds=3)
+    assert size > 0
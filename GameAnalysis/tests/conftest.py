@@ -0,0 +1,56 @@
+"""
+测试公共夹具。
+基准测试以同步方式计时，协程统一在会话级事件循环中执行。
+"""
+
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+from app.config.config import DatabaseConfig, SINGLE_SELECT
+from app.storage.database import Database, init_database
+
+
+def make_questions(count: int, prefix: str = "基准题目") -> List[Dict[str, Any]]:
+    """
+    生成用于写入数据库的题目字典。
+
+    Args:
+        count: 题目数量
+        prefix: 标题前缀，便于按关键字搜索
+
+    Returns:
+        题目字典列表
+    """
+    return [
+        {
+            "type": SINGLE_SELECT,
+            "title": f"{prefix} 第{i}题：下列关于golang并发的说法哪个正确？",
+            "language": "go",
+            "answers": ["A: goroutine由操作系统调度", "B: channel可以关闭", "C: map是并发安全的", "D: select必须有default"],
+            "rights": ["B"]
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(scope="session")
+def event_loop_runner():
+    """会话级事件循环，返回执行协程的函数。"""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+async def open_database(path: str) -> Database:
+    """在 path 创建并初始化一个新数据库。"""
+    return await init_database(path, DatabaseConfig(path=path))
+
+
+@pytest.fixture
+def database(tmp_path, event_loop_runner):
+    """空数据库，测试结束后关闭。"""
+    db = event_loop_runner(open_database(str(tmp_path / "bench.db")))
+    yield db
+    event_loop_runner(db.close())
@@ -0,0 +1,162 @@
+"""
+批量生成的行为测试：分片、部分失败、退避重试，以及限流/熔断时不重试并返回 429/503。
+"""
+
+import json
+import itertools
+from typing import Callable, List, Optional
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.config.config import QuestionRequest, QuestionResponse, QuestionResponses
+from app.controllers.question import create_question_controller
+from app.services.bulk import BulkGenerator, split_counts
+from app.services.client import AIService
+from app.services.limiter import RateLimitExceededError
+from app.services.resilience import CircuitOpenError, RetryPolicy
+
+
+REQUEST = QuestionRequest(keyword="golang并发", model="auto", language="go", type=1)
+
+
+class FakeService(AIService):
+    """按分片大小生成不重复题目的AI服务，fail 返回要抛出的异常时模拟失败。"""
+
+    def __init__(self, fail: Optional[Callable[[QuestionRequest, int], Optional[Exception]]] = None):
+        self.fail = fail
+        self.calls: List[int] = []
+        self._serial = itertools.count()
+
+    async def generate_question(self, req: QuestionRequest) -> QuestionResponses:
+        self.calls.append(req.count)
+        assert req.bypass_cache
+        error = self.fail(req, len(self.calls)) if self.fail else None
+        if error:
+            raise error
+        return QuestionResponses(questions=[
+            QuestionResponse(title=f"第{next(self._serial)}题？", answers=[], rights=[])
+            for _ in range(req.count)
+        ])
+
+
+class RecordingPolicy(RetryPolicy):
+    """记录退避时间、不实际等待的重试策略。"""
+
+    def __init__(self):
+        super().__init__(base_delay=0.5, max_delay=4.0)
+        self.delays: List[float] = []
+
+    def delay(self, attempt: int) -> float:
+        self.delays.append(super().delay(attempt))
+        return 0.0
+
+
+def make_generator(service: FakeService, policy: Optional[RetryPolicy] = None, **kwargs) -> BulkGenerator:
+    return BulkGenerator(service, retry_policy=policy or RecordingPolicy(), **kwargs)
+
+
+@pytest.mark.parametrize("total,expected", [
+    (3, [3]),
+    (10, [10]),
+    (11, [6, 5]),
+    (25, [9, 8, 8]),
+    (200, [10] * 20),
+])
+def test_split_counts(total, expected):
+    assert split_counts(total) == expected
+    assert sum(expected) == total
+
+
+def test_split_counts_rejects_too_few():
+    with pytest.raises(ValueError):
+        split_counts(2)
+
+
+def test_generate_splits_into_chunks(event_loop_runner):
+    service = FakeService()
+    result = event_loop_runner(make_generator(service).generate(REQUEST, 25))
+
+    assert sorted(service.calls) == [8, 8, 9]
+    assert len(result.questions) == 25
+    assert (result.chunks, result.failed_chunks, result.retries) == (3, 0, 0)
+
+
+def test_failed_chunk_is_retried_with_backoff(event_loop_runner):
+    # 每个分片的第一次调用失败
+    service = FakeService(lambda req, call: ValueError("上游失败") if call <= 3 else None)
+    policy = RecordingPolicy()
+    result = event_loop_runner(make_generator(service, policy).generate(REQUEST, 25))
+
+    assert len(result.questions) == 25
+    assert result.retries == 3
+    assert result.failed_chunks == 0
+    # 第一次重试的等待时间在 base_delay 的一半到全部之间
+    assert len(policy.delays) == 3
+    assert all(0.25 <= delay <= 0.5 for delay in policy.delays)
+
+
+def test_partial_failure_keeps_successful_chunks(event_loop_runner):
+    service = FakeService(lambda req, call: ValueError("格式错误") if req.count == 9 else None)
+    result = event_loop_runner(make_generator(service, chunk_retries=1).generate(REQUEST, 25))
+
+    # 9 道的分片首轮和补充轮都失败，每次重试一次
+    assert len(result.questions) == 16
+    assert result.failed_chunks == 2
+    assert result.retries == 2
+    assert all("格式错误" in error for error in result.errors)
+
+
+def test_all_chunks_failing_raises_value_error(event_loop_runner):
+    service = FakeService(lambda req, call: ValueError("上游失败"))
+    with pytest.raises(ValueError, match="上游失败"):
+        event_loop_runner(make_generator(service, chunk_retries=1).generate(REQUEST, 10))
+    assert service.calls == [10, 10]
+
+
+@pytest.mark.parametrize("error", [RateLimitExceededError("限流", 2.0), CircuitOpenError("熔断", 7.0)])
+def test_rejections_are_not_retried(event_loop_runner, error):
+    service = FakeService(lambda req, call: error)
+    policy = RecordingPolicy()
+
+    with pytest.raises(type(error)):
+        event_loop_runner(make_generator(service, policy, chunk_retries=3).generate(REQUEST, 25))
+    assert len(service.calls) == 3
+    assert policy.delays == []
+
+
+def _post(event_loop_runner, database, service: FakeService, path: str) -> httpx.Response:
+    app = FastAPI()
+    app.include_router(
+        create_question_controller(service, database, make_generator(service)),
+        prefix="/api/questions"
+    )
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post(path, json={"keyword": "golang并发", "count": 20, "type": 1})
+
+    return event_loop_runner(run())
+
+
+@pytest.mark.parametrize("error,status,retry_after", [
+    (RateLimitExceededError("限流", 2.0), 429, "2"),
+    (CircuitOpenError("熔断", 6.5), 503, "7"),
+])
+def test_bulk_route_maps_rejections_to_retry_later(event_loop_runner, database, error, status, retry_after):
+    response = _post(event_loop_runner, database, FakeService(lambda req, call: error), "/api/questions/CreateByAIBulk")
+
+    assert response.status_code == status
+    assert response.headers["Retry-After"] == retry_after
+    assert response.json()["detail"]["msg"] == str(error)
+
+
+def test_bulk_stream_reports_rejection_with_retry_after(event_loop_runner, database):
+    service = FakeService(lambda req, call: CircuitOpenError("熔断", 6.5))
+    response = _post(event_loop_runner, database, service, "/api/questions/CreateByAIBulkStream")
+
+    assert response.status_code == 200
+    event, data = response.text.strip().split("\n")
+    assert event == "event: error"
+    assert json.loads(data[len("data: "):])["data"] == {"retry_after": 6.5}
@@ -0,0 +1,158 @@
+"""
+共享HTTP客户端的行为测试：生命周期内只创建一次、跨请求复用、关闭时释放，
+以及连接池上限和HTTP/2设置取自 AIConfig。
+"""
+
+import json
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+
+from app.config.config import AIConfig, QuestionRequest
+from app.services.deepseek import HTTP2_AVAILABLE, DeepSeekClient
+from app.services.resilience import RetryPolicy
+from app.services.router import create_provider_router
+
+
+REQUEST = QuestionRequest(keyword="golang并发", model="auto", language="go", count=3, type=1)
+
+
+def _completion() -> Dict[str, Any]:
+    questions = [
+        {"title": f"第{i}题？", "answers": ["A: 1", "B: 2", "C: 3", "D: 4"], "rights": ["A"]}
+        for i in range(3)
+    ]
+    return {
+        "choices": [{"message": {"content": json.dumps(questions, ensure_ascii=False)}}],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 200, "total_tokens": 300}
+    }
+
+
+class Upstream:
+    """记录上游客户端的创建参数和请求数，请求由 MockTransport 应答。"""
+
+    def __init__(self):
+        self.clients: List[httpx.AsyncClient] = []
+        self.kwargs: List[Dict[str, Any]] = []
+        self.requests = 0
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        return httpx.Response(200, json=_completion())
+
+
+@pytest.fixture
+def upstream(monkeypatch) -> Upstream:
+    """替换 httpx.AsyncClient：未指定 transport 的客户端（即上游客户端）被记录并改用模拟传输。"""
+    recorder = Upstream()
+    real_client = httpx.AsyncClient
+
+    class RecordingAsyncClient(real_client):
+        def __init__(self, **kwargs):
+            if "transport" not in kwargs:
+                recorder.kwargs.append(dict(kwargs))
+                recorder.clients.append(self)
+                kwargs["transport"] = httpx.MockTransport(recorder.handler)
+            super().__init__(**kwargs)
+
+    monkeypatch.setattr(httpx, "AsyncClient", RecordingAsyncClient)
+    return recorder
+
+
+def test_client_is_created_once_and_reused(event_loop_runner, upstream):
+    client = DeepSeekClient("test", retry_policy=RetryPolicy(max_attempts=1))
+
+    async def scenario():
+        await client.start()
+        await client.start()
+        for _ in range(3):
+            await client.generate(REQUEST)
+        return client.stats()
+
+    stats = event_loop_runner(scenario())
+
+    assert len(upstream.clients) == 1
+    assert upstream.requests == 3
+    assert stats["requests"] == 3
+
+    event_loop_runner(client.close())
+    assert upstream.clients[0].is_closed
+
+
+def test_client_is_created_lazily_and_recreated_after_close(event_loop_runner, upstream):
+    client = DeepSeekClient("test", retry_policy=RetryPolicy(max_attempts=1))
+
+    event_loop_runner(client.generate(REQUEST))
+    event_loop_runner(client.close())
+    event_loop_runner(client.generate(REQUEST))
+
+    assert len(upstream.clients) == 2
+    assert upstream.clients[0].is_closed
+    assert not upstream.clients[1].is_closed
+    event_loop_runner(client.close())
+
+
+@pytest.mark.parametrize("http2", [True, False])
+def test_pool_limits_and_http2_come_from_config(event_loop_runner, upstream, http2):
+    config = AIConfig(
+        deepseek_key="test",
+        timeout=12,
+        max_connections=7,
+        max_keepalive=3,
+        keepalive_expiry=15.0,
+        http2=http2
+    )
+    router = create_provider_router(config)
+
+    event_loop_runner(router.start())
+    try:
+        assert len(upstream.kwargs) == 1
+        kwargs = upstream.kwargs[0]
+        assert kwargs["limits"] == httpx.Limits(
+            max_connections=7, max_keepalive_connections=3, keepalive_expiry=15.0
+        )
+        # 未安装 h2 时即使配置开启也退回 HTTP/1.1
+        assert kwargs["http2"] is (http2 and HTTP2_AVAILABLE)
+        assert kwargs["timeout"] == 12
+        assert kwargs["headers"] == {"Authorization": "Bearer test"}
+    finally:
+        event_loop_runner(router.close())
+    assert upstream.clients[0].is_closed
+
+
+def test_lifespan_creates_one_shared_client_and_closes_it(tmp_path, monkeypatch, event_loop_runner, upstream):
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "test")
+    monkeypatch.setenv("DEEPSEEK_BASE_URL", "http://upstream.test")
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "lifespan.db"))
+    monkeypatch.setenv("AI_CACHE_BACKEND", "none")
+    monkeypatch.setenv("AI_MAX_CONNECTIONS", "5")
+    monkeypatch.setenv("AI_MAX_KEEPALIVE", "2")
+    monkeypatch.delenv("AI_PROVIDERS", raising=False)
+    monkeypatch.delenv("AI_STUB_PROVIDER", raising=False)
+
+    from app.main import create_app
+
+    app = create_app()
+    body = {"keyword": "golang并发", "language": "go", "count": 3, "type": 1}
+
+    async def scenario():
+        async with app.router.lifespan_context(app):
+            assert len(upstream.clients) == 1
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+                statuses = [
+                    (await http.post("/api/questions/CreateByAI", json=body)).status_code
+                    for _ in range(2)
+                ]
+            return statuses
+
+    statuses = event_loop_runner(scenario())
+
+    assert statuses == [200, 200]
+    assert len(upstream.clients) == 1
+    assert upstream.requests == 2
+    assert upstream.kwargs[0]["base_url"] == "http://upstream.test"
+    assert upstream.kwargs[0]["limits"] == httpx.Limits(
+        max_connections=5, max_keepalive_connections=2, keepalive_expiry=60.0
+    )
+    assert upstream.clients[0].is_closed
@@ -0,0 +1,87 @@
+"""
+流式导入解析的行为测试：分行、超长行和行号；以及 batch-insert 保持原有的校验规则。
+"""
+
+from typing import Any, AsyncIterator, Dict, List
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.controllers.question import create_question_controller
+from app.services import importer
+from app.services.importer import iter_lines, parse_ndjson, validate_question
+
+
+async def _chunks(parts: List[bytes]) -> AsyncIterator[bytes]:
+    for part in parts:
+        yield part
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+
+@pytest.fixture
+def small_records(monkeypatch):
+    """把单行上限调小，便于构造超长行。"""
+    monkeypatch.setattr(importer, "MAX_RECORD_CHARS", 10)
+
+
+def test_lines_split_across_chunks(event_loop_runner):
+    lines = event_loop_runner(_collect(iter_lines(_chunks([b"\xef\xbb\xbfab\nc", b"d\r\n\n", b"\xe4\xb8", b"\xad"]))))
+    assert lines == [(1, "ab"), (2, "cd"), (3, ""), (4, "中")]
+
+
+def test_long_line_reported_once_without_shifting_line_numbers(event_loop_runner, small_records):
+    chunks = [b"ok\n", b"x" * 6, b"x" * 6, b"x" * 6, b"x" * 6, b"\nnext\n", b"y" * 20 + b"\nlast"]
+    lines = event_loop_runner(_collect(iter_lines(_chunks(chunks))))
+    assert lines == [(1, "ok"), (2, None), (3, "next"), (4, None), (5, "last")]
+
+
+def test_ndjson_errors_keep_row_numbers(event_loop_runner, small_records):
+    chunks = [b'{"a":1}\n', b"z" * 30, b"\n", b"{bad\n", b'{"b":2}\n']
+    rows = event_loop_runner(_collect(parse_ndjson(_chunks(chunks))))
+    assert [row_no for row_no, _ in rows] == [1, 2, 3, 4]
+    assert [type(parsed).__name__ for _, parsed in rows] == ["dict", "ValueError", "ValueError", "dict"]
+
+
+def _batch_insert(event_loop_runner, database, questions: List[Dict[str, Any]]) -> httpx.Response:
+    app = FastAPI()
+    app.include_router(create_question_controller(None, database), prefix="/api/questions")
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post("/api/questions/batch-insert", json={"questions": questions})
+
+    return event_loop_runner(run())
+
+
+def _question(**fields) -> Dict[str, Any]:
+    question = {"type": 1, "title": "题目？", "language": "go", "answers": ["A: 1"], "rights": ["A"]}
+    question.update(fields)
+    return question
+
+
+def test_batch_insert_keeps_original_validation(event_loop_runner, database):
+    # 导入接口会拒绝空标题，batch-insert 沿用原有规则，不因导入功能改变
+    with pytest.raises(ValueError):
+        validate_question(_question(title=""))
+
+    response = _batch_insert(event_loop_runner, database, [_question(title=""), _question(language="")])
+    assert response.status_code == 200
+    assert event_loop_runner(database.count_questions()) == 2
+
+
+@pytest.mark.parametrize("question,message", [
+    ({"type": 1, "title": "t", "language": "go", "answers": []}, "题目 2 缺少必需字段: rights"),
+    (_question(type=4), "题目 2 类型无效"),
+    (_question(answers="A: 1"), "题目 2 选项格式错误"),
+    (_question(rights="A"), "题目 2 答案格式错误"),
+])
+def test_batch_insert_rejects_invalid_questions(event_loop_runner, database, question, message):
+    response = _batch_insert(event_loop_runner, database, [_question(), question])
+
+    assert response.status_code == 400
+    assert response.json()["detail"]["msg"] == f"参数错误: {message}"
+    assert event_loop_runner(database.count_questions()) == 0
@@ -0,0 +1,170 @@
+"""
+连接池的行为测试：等待超时、异常连接丢弃、写连接回滚和关闭，以及等待超时映射为503。
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.controllers.actions import create_actions_controller
+from app.main import create_app
+from app.storage.pool import ConnectionPool, PoolClosedError, PoolTimeoutError
+
+
+def test_reader_acquire_times_out_when_pool_exhausted(tmp_path, event_loop_runner):
+    async def scenario():
+        pool = ConnectionPool(str(tmp_path / "pool.db"), max_readers=1, acquire_timeout=0.05)
+        await pool.open()
+        try:
+            async with pool.reader():
+                with pytest.raises(PoolTimeoutError):
+                    async with pool.reader():
+                        pass
+                return pool.stats()
+        finally:
+            await pool.close()
+
+    stats = event_loop_runner(scenario())
+    assert stats["timeouts"] == 1
+    assert stats["readers_open"] == 1
+
+
+def test_waiting_reader_gets_released_connection(tmp_path, event_loop_runner):
+    async def scenario():
+        pool = ConnectionPool(str(tmp_path / "pool.db"), max_readers=1, acquire_timeout=1.0)
+        await pool.open()
+
+        async def hold():
+            async with pool.reader() as conn:
+                await asyncio.sleep(0.02)
+                return conn
+
+        async def wait_for_reader():
+            await asyncio.sleep(0)
+            async with pool.reader() as conn:
+                return conn
+
+        try:
+            first, second = await asyncio.gather(hold(), wait_for_reader())
+            return first is second, pool.stats()
+        finally:
+            await pool.close()
+
+    reused, stats = event_loop_runner(scenario())
+    assert reused
+    assert stats["timeouts"] == 0
+    assert stats["readers_in_use"] == 0
+
+
+def test_reader_discarded_after_connection_error(tmp_path, event_loop_runner):
+    async def scenario():
+        pool = ConnectionPool(str(tmp_path / "pool.db"), max_readers=2)
+        await pool.open()
+        try:
+            with pytest.raises(ValueError):
+                async with pool.reader() as broken:
+                    raise ValueError("no active connection")
+            after_error = pool.stats()
+            async with pool.reader() as conn:
+                replaced = conn is not broken
+            return after_error, replaced
+        finally:
+            await pool.close()
+
+    after_error, replaced = event_loop_runner(scenario())
+    assert after_error["readers_open"] == 0
+    assert after_error["readers_idle"] == 0
+    assert replaced
+
+
+@pytest.mark.parametrize("error", [KeyError("caller bug"), ValueError("参数错误")])
+def test_reader_kept_after_other_errors(tmp_path, event_loop_runner, error):
+    async def scenario():
+        pool = ConnectionPool(str(tmp_path / "pool.db"), max_readers=2)
+        await pool.open()
+        try:
+            with pytest.raises(type(error)):
+                async with pool.reader():
+                    raise error
+            return pool.stats()
+        finally:
+            await pool.close()
+
+    stats = event_loop_runner(scenario())
+    assert stats["readers_open"] == 1
+    assert stats["readers_idle"] == 1
+
+
+def test_writer_rolls_back_uncommitted_changes_on_error(tmp_path, event_loop_runner):
+    async def scenario():
+        pool = ConnectionPool(str(tmp_path / "pool.db"))
+        await pool.open()
+        try:
+            async with pool.writer() as db:
+                await db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+                await db.commit()
+            with pytest.raises(RuntimeError):
+                async with pool.writer() as db:
+                    await db.execute("INSERT INTO items (id) VALUES (1)")
+                    raise RuntimeError("abort")
+            async with pool.reader() as db:
+                cursor = await db.execute("SELECT COUNT(*) FROM items")
+                return (await cursor.fetchone())[0]
+        finally:
+            await pool.close()
+
+    assert event_loop_runner(scenario()) == 0
+
+
+def test_closed_pool_rejects_connections(tmp_path, event_loop_runner):
+    async def scenario():
+        pool = ConnectionPool(str(tmp_path / "pool.db"))
+        await pool.open()
+        await pool.close()
+        with pytest.raises(PoolClosedError):
+            async with pool.reader():
+                pass
+        with pytest.raises(PoolClosedError):
+            async with pool.writer():
+                pass
+        return pool.stats()
+
+    stats = event_loop_runner(scenario())
+    assert stats["closed"]
+    assert not stats["writer_open"]
+
+
+def _get(event_loop_runner, app, path: str) -> httpx.Response:
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get(path)
+    return event_loop_runner(run())
+
+
+def test_pool_timeout_maps_to_503_in_controller(event_loop_runner, database, monkeypatch):
+    async def exhausted(*args, **kwargs):
+        raise PoolTimeoutError("等待读连接超时（5.0秒）")
+
+    monkeypatch.setattr(database, "count_questions", exhausted)
+    app = create_app()
+    app.include_router(create_actions_controller(database), prefix="/api/stats")
+
+    response = _get(event_loop_runner, app, "/api/stats/summary")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json()["detail"]["msg"] == "等待读连接超时（5.0秒）"
+
+
+def test_pool_timeout_maps_to_503_in_app_handler(event_loop_runner):
+    app = create_app()
+
+    @app.get("/api/exhausted")
+    async def exhausted():
+        raise PoolTimeoutError("等待写连接超时（5.0秒）", retry_after=2.5)
+
+    response = _get(event_loop_runner, app, "/api/exhausted")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
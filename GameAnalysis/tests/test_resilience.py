@@ -0,0 +1,205 @@
+"""
+上游容错的行为测试：熔断器状态转换、重试退避和准入控制的 Retry-After。
+"""
+
+import time
+import asyncio
+import email.utils
+
+import httpx
+import pytest
+
+from app.api.response import retry_later_response
+from app.services import resilience
+from app.services.limiter import AdmissionController, RateLimitExceededError, parse_retry_after
+from app.services.resilience import (
+    CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN, CircuitBreaker, CircuitOpenError, RetryPolicy
+)
+
+
+class FakeClock:
+    """可手动推进的 monotonic 时钟。"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(resilience, "time", fake)
+    return fake
+
+
+def _fail(breaker: CircuitBreaker, times: int) -> None:
+    for _ in range(times):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("upstream", failure_threshold=3, recovery_timeout=30)
+
+    _fail(breaker, 2)
+    breaker.before_call()
+    breaker.record_success()
+    # 成功调用清零连续失败数
+    _fail(breaker, 2)
+    assert breaker.state == CIRCUIT_CLOSED
+
+    _fail(breaker, 1)
+    assert breaker.state == CIRCUIT_OPEN
+
+    clock.now += 10
+    with pytest.raises(CircuitOpenError) as rejected:
+        breaker.before_call()
+    assert rejected.value.retry_after == pytest.approx(20)
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_breaker_half_open_probe_success_closes(clock):
+    breaker = CircuitBreaker("upstream", failure_threshold=1, recovery_timeout=30, half_open_max_calls=1)
+    _fail(breaker, 1)
+
+    clock.now += 30
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    breaker.before_call()
+    # 探测名额已被占用
+    with pytest.raises(CircuitOpenError) as rejected:
+        breaker.before_call()
+    assert rejected.value.retry_after == 1.0
+
+    breaker.record_success()
+    assert breaker.state == CIRCUIT_CLOSED
+    assert breaker.stats()["transitions"] == {
+        "closed->open": 1, "open->half_open": 1, "half_open->closed": 1
+    }
+
+
+def test_breaker_half_open_probe_failure_reopens(clock):
+    breaker = CircuitBreaker("upstream", failure_threshold=1, recovery_timeout=30)
+    _fail(breaker, 1)
+
+    clock.now += 31
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+    # 重新打开时恢复计时从头开始
+    assert breaker.retry_after() == pytest.approx(30)
+
+
+def test_breaker_guard_releases_probe_for_non_failures(clock):
+    breaker = CircuitBreaker("upstream", failure_threshold=1, recovery_timeout=5)
+    _fail(breaker, 1)
+    clock.now += 5
+
+    with pytest.raises(KeyError):
+        with breaker.guard(lambda error: isinstance(error, ConnectionError)):
+            raise KeyError("cancelled locally")
+    assert breaker.state == CIRCUIT_HALF_OPEN
+
+    with pytest.raises(ConnectionError):
+        with breaker.guard(lambda error: isinstance(error, ConnectionError)):
+            raise ConnectionError("upstream down")
+    assert breaker.state == CIRCUIT_OPEN
+
+
+def test_retry_delay_grows_with_jitter_and_cap():
+    policy = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=4.0)
+    for attempt, cap in [(1, 1.0), (2, 2.0), (3, 4.0), (6, 4.0)]:
+        for _ in range(20):
+            assert cap / 2 <= policy.delay(attempt) <= cap
+
+
+def _response(retry_after: str) -> httpx.Response:
+    return httpx.Response(429, headers={"Retry-After": retry_after})
+
+
+def test_parse_retry_after_seconds_and_http_date():
+    assert parse_retry_after(_response("7")) == 7.0
+    assert parse_retry_after(_response("-3")) == 0.0
+    later = email.utils.formatdate(time.time() + 120, usegmt=True)
+    assert 100 < parse_retry_after(_response(later)) <= 120
+    assert parse_retry_after(_response("soon")) is None
+    assert parse_retry_after(httpx.Response(429)) is None
+
+
+def test_backoff_longer_than_max_wait_rejects_with_retry_after(event_loop_runner):
+    async def scenario():
+        limiter = AdmissionController(max_in_flight=2, max_wait=0.5)
+        limiter.backoff(5)
+        assert limiter.is_blocked()
+        with pytest.raises(RateLimitExceededError) as rejected:
+            async with limiter.acquire():
+                pass
+        return rejected.value.retry_after, limiter.stats()
+
+    retry_after, stats = event_loop_runner(scenario())
+    assert 4 < retry_after <= 5
+    assert stats["rejected"] == 1
+    assert stats["throttled"] == 1
+    assert stats["in_flight"] == 0
+
+    header = retry_later_response("上游调用频率超限", retry_after).headers["Retry-After"]
+    assert header == "5"
+
+
+def test_short_backoff_waits_then_admits(event_loop_runner):
+    async def scenario():
+        limiter = AdmissionController(max_in_flight=1, max_wait=1.0)
+        limiter.backoff(0.05)
+        started = time.monotonic()
+        async with limiter.acquire():
+            waited = time.monotonic() - started
+        return waited, limiter.stats()
+
+    waited, stats = event_loop_runner(scenario())
+    assert waited >= 0.04
+    assert stats["admitted"] == 1
+    assert stats["rejected"] == 0
+
+
+def test_request_rate_limit_rejects_when_wait_exceeds_max(event_loop_runner):
+    async def scenario():
+        limiter = AdmissionController(requests_per_minute=1, max_wait=0.1)
+        async with limiter.acquire():
+            pass
+        with pytest.raises(RateLimitExceededError) as rejected:
+            async with limiter.acquire():
+                pass
+        return rejected.value.retry_after
+
+    # 每分钟1个请求，下一个额度约60秒后恢复
+    assert 55 < event_loop_runner(scenario()) <= 60
+
+
+def test_full_queue_rejects_immediately(event_loop_runner):
+    async def scenario():
+        limiter = AdmissionController(max_in_flight=1, max_wait=1.0, max_queue=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.acquire():
+                await release.wait()
+
+        async def queued():
+            async with limiter.acquire():
+                pass
+
+        holder = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(queued())
+        await asyncio.sleep(0)
+        with pytest.raises(RateLimitExceededError):
+            async with limiter.acquire():
+                pass
+        release.set()
+        await asyncio.gather(holder, waiter)
+        return limiter.stats()
+
+    stats = event_loop_runner(scenario())
+    assert stats["admitted"] == 2
+    assert stats["rejected"] == 1
@@ -0,0 +1,193 @@
+"""
+多提供商路由的行为测试：对冲请求、输家取消、切换顺序，以及哪些错误不触发切换。
+"""
+
+import time
+import asyncio
+from typing import AsyncIterator, List, Optional
+
+import pytest
+
+from app.config.config import QuestionRequest, QuestionResponse, QuestionResponses
+from app.services.deepseek import UpstreamError
+from app.services.limiter import RateLimitExceededError
+from app.services.resilience import CircuitOpenError
+from app.services.router import Provider, ProviderRouter
+from app.services.stub import StubClient
+
+
+REQUEST = QuestionRequest(keyword="golang并发", model="auto", language="go", count=3, type=1)
+
+
+class FakeClient:
+    """耗时和结果可控的提供商客户端，调用按顺序记录到共享列表。"""
+
+    def __init__(self, name: str, calls: List[str], delay: float = 0.0, error: Optional[Exception] = None):
+        self.name = name
+        self.calls = calls
+        self.delay = delay
+        self.error = error
+        self.cancelled = 0
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def available(self) -> bool:
+        return True
+
+    def stats(self):
+        return {}
+
+    async def generate(self, req: QuestionRequest) -> QuestionResponses:
+        self.calls.append(self.name)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return QuestionResponses(questions=[QuestionResponse(title=self.name, answers=[], rights=[])])
+
+    async def generate_stream(self, req: QuestionRequest) -> AsyncIterator[QuestionResponse]:
+        response = await self.generate(req)
+        for question in response.questions:
+            yield question
+
+
+def make_router(*clients: FakeClient, hedge_delay: float = 0.0) -> ProviderRouter:
+    router = ProviderRouter(hedge_enabled=hedge_delay > 0, hedge_delay=hedge_delay)
+    for client in clients:
+        router.register(Provider(client.name, client))
+    return router
+
+
+def test_hedge_fires_after_delay_and_cancels_slow_primary(event_loop_runner):
+    calls: List[str] = []
+    primary = FakeClient("a", calls, delay=1.0)
+    backup = FakeClient("b", calls, delay=0.01)
+    router = make_router(primary, backup, hedge_delay=0.05)
+
+    async def run():
+        start = time.monotonic()
+        result = await router.generate(REQUEST)
+        await asyncio.sleep(0)
+        return result, time.monotonic() - start
+
+    result, elapsed = event_loop_runner(run())
+
+    assert result.questions[0].title == "b"
+    assert 0.05 <= elapsed < 0.5
+    assert calls == ["a", "b"]
+    assert primary.cancelled == 1
+    assert (router.hedges, router.hedge_wins) == (1, 1)
+    # 输家按已等待的时间记一个延迟样本
+    assert router.providers["a"].tracker.samples == 1
+
+
+def test_primary_winning_after_hedge_cancels_backup(event_loop_runner):
+    calls: List[str] = []
+    primary = FakeClient("a", calls, delay=0.08)
+    backup = FakeClient("b", calls, delay=1.0)
+    router = make_router(primary, backup, hedge_delay=0.03)
+
+    async def run():
+        result = await router.generate(REQUEST)
+        await asyncio.sleep(0)
+        return result
+
+    result = event_loop_runner(run())
+
+    assert result.questions[0].title == "a"
+    assert backup.cancelled == 1
+    assert (router.hedges, router.hedge_wins) == (1, 0)
+
+
+def test_no_hedge_when_primary_answers_in_time(event_loop_runner):
+    calls: List[str] = []
+    router = make_router(FakeClient("a", calls, delay=0.01), FakeClient("b", calls), hedge_delay=0.2)
+
+    assert event_loop_runner(router.generate(REQUEST)).questions[0].title == "a"
+    assert calls == ["a"]
+    assert router.hedges == 0
+
+
+def test_failover_tries_providers_in_ranking_order(event_loop_runner):
+    calls: List[str] = []
+    router = make_router(
+        FakeClient("a", calls, error=UpstreamError("502")),
+        FakeClient("b", calls, error=asyncio.TimeoutError()),
+        FakeClient("c", calls)
+    )
+
+    assert event_loop_runner(router.generate(REQUEST)).questions[0].title == "c"
+    assert calls == ["a", "b", "c"]
+    assert router.failovers == 2
+    assert router.providers["a"].tracker.errors == 1
+    assert router.providers["b"].tracker.errors == 1
+
+
+def test_last_upstream_error_is_raised_when_every_provider_fails(event_loop_runner):
+    calls: List[str] = []
+    router = make_router(
+        FakeClient("a", calls, error=UpstreamError("a 失败")),
+        FakeClient("b", calls, error=UpstreamError("b 失败"))
+    )
+
+    with pytest.raises(UpstreamError, match="b 失败"):
+        event_loop_runner(router.generate(REQUEST))
+    assert calls == ["a", "b"]
+
+
+def test_value_error_is_raised_without_failover(event_loop_runner):
+    calls: List[str] = []
+    router = make_router(FakeClient("a", calls, error=ValueError("选择题必须有4个选项")), FakeClient("b", calls))
+
+    with pytest.raises(ValueError, match="选择题必须有4个选项"):
+        event_loop_runner(router.generate(REQUEST))
+    assert calls == ["a"]
+    assert router.failovers == 0
+    assert router.providers["a"].tracker.requests == 0
+
+
+@pytest.mark.parametrize("error", [CircuitOpenError("熔断", 5.0), RateLimitExceededError("限流", 1.0)])
+def test_local_rejection_fails_over_without_stats(event_loop_runner, error):
+    calls: List[str] = []
+    router = make_router(FakeClient("a", calls, error=error), FakeClient("b", calls))
+
+    assert event_loop_runner(router.generate(REQUEST)).questions[0].title == "b"
+    assert calls == ["a", "b"]
+    assert router.providers["a"].tracker.requests == 0
+
+
+def _collect(router: ProviderRouter):
+    async def run():
+        return [question async for question in router.generate_stream(REQUEST)]
+    return run()
+
+
+def test_stream_fails_over_when_stub_fails_before_first_question(event_loop_runner):
+    failing = StubClient(latency=0.0, failure_rate=1.0)
+    healthy = StubClient(latency=0.0)
+    router = ProviderRouter(hedge_enabled=False)
+    router.register(Provider("failing", failing))
+    router.register(Provider("healthy", healthy))
+
+    questions = event_loop_runner(_collect(router))
+
+    assert len(questions) == 3
+    assert failing.stats()["failures"] == 1
+    assert router.failovers == 1
+    assert router.providers["failing"].tracker.errors == 1
+
+
+def test_stream_value_error_is_raised_without_failover(event_loop_runner):
+    calls: List[str] = []
+    router = make_router(FakeClient("a", calls, error=ValueError("题目数量错误")), FakeClient("b", calls))
+
+    with pytest.raises(ValueError, match="题目数量错误"):
+        event_loop_runner(_collect(router))
+    assert calls == ["a"]
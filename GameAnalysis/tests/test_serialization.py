@@ -0,0 +1,85 @@
+"""
+序列化后端的行为测试：RawJSON 片段拼接在 orjson 和标准库 json 两个后端下的输出一致且合法。
+"""
+
+import json
+
+import pytest
+
+from app.services import serialization
+from app.services.exporter import encode_ndjson
+from app.services.serialization import FastJSONResponse, RawJSON, dumps, dumps_text, loads
+
+
+# 包含占位标记前缀 \x00 的值，以及形似占位标记的字符串
+TRICKY_VALUES = [
+    ["A: \x00", "B: \x000:0\x00", "C: \"引号\" \\ 反斜杠", "D: 中文"],
+    {"nested": ["\x00" + "0" * 32 + ":0\x00", None, 1.5, True]},
+    "\x00",
+    [],
+]
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    """分别在两个后端下运行测试。"""
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("未安装 orjson")
+    return request.param
+
+
+@pytest.mark.parametrize("value", TRICKY_VALUES)
+def test_raw_fragment_is_byte_identical_to_encoding_the_value(backend, value):
+    title = "\x00" + "f" * 32 + ":0\x00"
+    raw = {"title": title, "answers": RawJSON(dumps(value)), "rights": [RawJSON(dumps_text(value))]}
+    plain = {"title": title, "answers": value, "rights": [value]}
+
+    output = dumps(raw)
+    assert output == dumps(plain)
+    assert json.loads(output) == plain
+
+
+def test_many_fragments_keep_their_positions(backend):
+    values = [[f"A: {i}", "\x00"] for i in range(50)]
+    output = dumps({"rows": [{"id": i, "answers": RawJSON(dumps(v))} for i, v in enumerate(values)]})
+    assert loads(output) == {"rows": [{"id": i, "answers": v} for i, v in enumerate(values)]}
+
+
+def test_fragment_bytes_are_not_reencoded(backend):
+    # 数据库中的编码原样写出，即使它不是本后端会产生的格式
+    output = dumps({"answers": RawJSON('[ "A: 1" ,\n"B: \\u4e2d" ]')})
+    assert output == b'{"answers":[ "A: 1" ,\n"B: \\u4e2d" ]}'
+
+
+def test_raw_json_equality_and_decode():
+    assert RawJSON('["A"]') == RawJSON(b'["A"]')
+    assert RawJSON('["A"]').decode() == ["A"]
+
+
+def test_response_renders_raw_fragments(backend):
+    response = FastJSONResponse({"code": 0, "data": {"result": RawJSON(dumps(TRICKY_VALUES[0]))}})
+    assert json.loads(response.body) == {"code": 0, "data": {"result": TRICKY_VALUES[0]}}
+
+
+def test_ndjson_export_splices_stored_columns(backend):
+    rows = [
+        {
+            "id": i,
+            "type": 1,
+            "title": f"题目{i}\x00",
+            "language": "go",
+            "answers": dumps_text(TRICKY_VALUES[0]),
+            "rights": dumps_text(["A"])
+        }
+        for i in range(3)
+    ]
+
+    lines = encode_ndjson(rows).split(b"\n")
+
+    assert lines[-1] == b""
+    for row, line in zip(rows, lines):
+        decoded = dict(row, answers=loads(row["answers"]), rights=loads(row["rights"]))
+        assert line == dumps(decoded)
+        assert json.loads(line) == decoded
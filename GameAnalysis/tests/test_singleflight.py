@@ -0,0 +1,144 @@
+"""
+请求合并的行为测试：并发相同调用只执行一次、失败分发、取消语义和键的释放。
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.singleflight import SingleFlight
+
+
+class Upstream:
+    """可控的上游调用：记录调用次数，等待 release 后返回或抛出异常。"""
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+        self.error = None
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return f"result-{self.calls}"
+
+
+def test_concurrent_identical_calls_share_one_upstream_call(event_loop_runner):
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        waiters = [asyncio.ensure_future(flight.do("k", upstream)) for _ in range(10)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        return flight, upstream, await asyncio.gather(*waiters)
+
+    flight, upstream, results = event_loop_runner(scenario())
+    assert upstream.calls == 1
+    assert results == ["result-1"] * 10
+    assert flight.stats()["leaders"] == 1
+    assert flight.stats()["coalesced"] == 9
+
+
+def test_different_keys_are_not_coalesced(event_loop_runner):
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        upstream.release.set()
+        return upstream, await asyncio.gather(flight.do("a", upstream), flight.do("b", upstream))
+
+    upstream, _ = event_loop_runner(scenario())
+    assert upstream.calls == 2
+
+
+def test_failure_propagates_to_every_waiter(event_loop_runner):
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        upstream.error = ValueError("上游失败")
+        waiters = [asyncio.ensure_future(flight.do("k", upstream)) for _ in range(5)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        return upstream, await asyncio.gather(*waiters, return_exceptions=True)
+
+    upstream, results = event_loop_runner(scenario())
+    assert upstream.calls == 1
+    assert all(isinstance(result, ValueError) and str(result) == "上游失败" for result in results)
+    # 所有等待者收到的是同一个异常
+    assert len({id(result) for result in results}) == 1
+
+
+def test_one_waiter_cancelling_does_not_cancel_shared_call(event_loop_runner):
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        first = asyncio.ensure_future(flight.do("k", upstream))
+        second = asyncio.ensure_future(flight.do("k", upstream))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        upstream.release.set()
+        return flight, upstream, first, await second
+
+    flight, upstream, first, result = event_loop_runner(scenario())
+    assert first.cancelled()
+    assert result == "result-1"
+    assert upstream.cancelled == 0
+    assert flight.stats()["abandoned"] == 0
+
+
+def test_last_waiter_leaving_cancels_shared_call(event_loop_runner):
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        waiters = [asyncio.ensure_future(flight.do("k", upstream)) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        return flight, upstream
+
+    flight, upstream = event_loop_runner(scenario())
+    assert upstream.cancelled == 1
+    assert flight.stats()["abandoned"] == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_key_is_released_after_the_call_finishes(event_loop_runner, fail):
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        upstream.error = ValueError("上游失败") if fail else None
+        upstream.release.set()
+
+        for _ in range(2):
+            try:
+                await flight.do("k", upstream)
+            except ValueError:
+                pass
+        return flight, upstream
+
+    flight, upstream = event_loop_runner(scenario())
+    assert upstream.calls == 2
+    assert flight.stats()["in_flight"] == 0
+    assert flight.stats()["leaders"] == 2
+
+
+def test_key_is_released_after_abandoned_call(event_loop_runner):
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        waiter = asyncio.ensure_future(flight.do("k", upstream))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        upstream.release.set()
+        return upstream, await flight.do("k", upstream)
+
+    upstream, result = event_loop_runner(scenario())
+    assert upstream.calls == 2
+    assert result == "result-2"
@@ -0,0 +1,339 @@
+"""
+存储层的行为测试：结构迁移、分页、全文索引同步、计数缓存和批量删除。
+"""
+
+import sqlite3
+
+import pytest
+
+from app.config.config import DatabaseConfig
+from app.storage.cache import CountCache
+from app.storage.database import DELETE_CHUNK_SIZE, DeleteConflictError, build_fts_query, init_database
+from app.storage.migrations import MIGRATIONS
+from tests.conftest import make_questions, open_database
+
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+# 引入版本化迁移之前的建表语句
+LEGACY_SCHEMA = """
+CREATE TABLE questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    type INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    answers TEXT NOT NULL,
+    rights TEXT NOT NULL
+)
+"""
+
+
+def test_migrates_existing_v0_database(tmp_path, event_loop_runner):
+    path = str(tmp_path / "legacy.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute(LEGACY_SCHEMA)
+        conn.execute(
+            "INSERT INTO questions (title, type, language, answers, rights) VALUES (?, ?, ?, ?, ?)",
+            ("旧库中的goroutine题目", 1, "go", '["A: 1", "B: 2"]', '["A"]')
+        )
+    conn.close()
+
+    async def scenario():
+        db = await open_database(path)
+        try:
+            version = db.schema_version
+            rows, total = await db.search_questions("goroutine")
+            indexes = await db.list_indexes()
+            return version, [row["title"] for row in rows], total, indexes
+        finally:
+            await db.close()
+
+    version, titles, total, indexes = event_loop_runner(scenario())
+    assert version == LATEST_VERSION
+    # 迁移为已有数据建立了全文索引
+    assert titles == ["旧库中的goroutine题目"]
+    assert total == 1
+    assert {"idx_questions_type_id", "idx_questions_language_type"} <= set(indexes)
+
+
+def test_migrations_are_idempotent(tmp_path, event_loop_runner):
+    path = str(tmp_path / "bench.db")
+
+    async def reopen():
+        db = await open_database(path)
+        await db.batch_insert_questions(make_questions(2))
+        count = await db.count_questions()
+        await db.close()
+        return db.schema_version, count
+
+    assert event_loop_runner(reopen()) == (LATEST_VERSION, 2)
+    assert event_loop_runner(reopen()) == (LATEST_VERSION, 4)
+
+
+def test_rejects_database_from_newer_version(tmp_path, event_loop_runner):
+    path = str(tmp_path / "future.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute(f"PRAGMA user_version = {LATEST_VERSION + 1}")
+    conn.close()
+
+    with pytest.raises(ValueError):
+        event_loop_runner(init_database(path))
+
+
+async def _seed(db, count: int):
+    await db.batch_insert_questions(make_questions(count))
+    rows = await db.select("SELECT id FROM questions ORDER BY id DESC")
+    return [row["id"] for row in rows]
+
+
+def _ids(questions):
+    return [question["id"] for question in questions]
+
+
+def test_keyset_empty_table(database, event_loop_runner):
+    questions, total, next_id, prev_id = event_loop_runner(database.get_questions_keyset(page_size=10))
+    assert (questions, total, next_id, prev_id) == ([], 0, None, None)
+
+
+def test_keyset_walks_forward_and_back(database, event_loop_runner):
+    ids = event_loop_runner(_seed(database, 25))
+
+    first, total, next_id, prev_id = event_loop_runner(database.get_questions_keyset(page_size=10))
+    assert _ids(first) == ids[:10]
+    assert total == 25
+    assert (next_id, prev_id) == (ids[9], None)
+
+    second, _, next_id, prev_id = event_loop_runner(database.get_questions_keyset(page_size=10, after_id=next_id))
+    assert _ids(second) == ids[10:20]
+    assert (next_id, prev_id) == (ids[19], ids[10])
+
+    last, _, last_next, last_prev = event_loop_runner(database.get_questions_keyset(page_size=10, after_id=next_id))
+    assert _ids(last) == ids[20:]
+    assert (last_next, last_prev) == (None, ids[20])
+
+    # 从第二页向前翻回第一页，第一页没有上一页
+    back, _, back_next, back_prev = event_loop_runner(database.get_questions_keyset(page_size=10, before_id=prev_id))
+    assert _ids(back) == ids[:10]
+    assert (back_next, back_prev) == (ids[9], None)
+
+
+def test_keyset_exact_multiple_has_no_next_page(database, event_loop_runner):
+    ids = event_loop_runner(_seed(database, 20))
+
+    _, _, next_id, _ = event_loop_runner(database.get_questions_keyset(page_size=10, count_total=False))
+    last, total, last_next, _ = event_loop_runner(
+        database.get_questions_keyset(page_size=10, after_id=next_id, count_total=False)
+    )
+    assert _ids(last) == ids[10:]
+    assert total is None
+    assert last_next is None
+
+
+def test_keyset_past_the_end_is_empty(database, event_loop_runner):
+    ids = event_loop_runner(_seed(database, 5))
+
+    questions, _, next_id, prev_id = event_loop_runner(database.get_questions_keyset(page_size=10, after_id=ids[-1]))
+    assert (questions, next_id, prev_id) == ([], None, None)
+
+
+def test_keyset_cursor_row_deleted(database, event_loop_runner):
+    ids = event_loop_runner(_seed(database, 25))
+    cursor_id = ids[9]
+    event_loop_runner(database.batch_delete_questions([cursor_id]))
+
+    # 游标只是id边界，所在行被删除后仍从它之后继续
+    questions, total, _, _ = event_loop_runner(database.get_questions_keyset(page_size=10, after_id=cursor_id))
+    assert _ids(questions) == ids[10:20]
+    assert total == 24
+
+
+def test_keyset_with_type_filter(database, event_loop_runner):
+    questions = make_questions(12)
+    for i, question in enumerate(questions):
+        question["type"] = 1 if i % 3 else 2
+    event_loop_runner(database.batch_insert_questions(questions))
+
+    page, total, next_id, _ = event_loop_runner(database.get_questions_keyset(page_size=3, question_type=2))
+    assert total == 4
+    assert {question["type"] for question in page} == {2}
+    rest, _, rest_next, _ = event_loop_runner(
+        database.get_questions_keyset(page_size=3, question_type=2, after_id=next_id)
+    )
+    assert len(rest) == 1
+    assert rest_next is None
+
+
+def test_keyset_rejects_both_cursors(database, event_loop_runner):
+    with pytest.raises(ValueError):
+        event_loop_runner(database.get_questions_keyset(after_id=5, before_id=1))
+
+
+def _search_titles(db, event_loop_runner, search: str):
+    rows, _ = event_loop_runner(db.search_questions(search, count_total=False))
+    return [row["title"] for row in rows]
+
+
+def test_fts_follows_insert_update_and_delete(database, event_loop_runner):
+    question = make_questions(1)[0]
+    question["title"] = "channel缓冲区的容量"
+    question["answers"] = ["A: make(chan int, 3)", "B: 无缓冲"]
+    event_loop_runner(database.batch_insert_questions([question]))
+    question_id = event_loop_runner(database.get("SELECT id FROM questions"))["id"]
+
+    assert _search_titles(database, event_loop_runner, "channel") == ["channel缓冲区的容量"]
+    # 选项同样被索引
+    assert _search_titles(database, event_loop_runner, "make(chan") == ["channel缓冲区的容量"]
+
+    event_loop_runner(database.execute(
+        "UPDATE questions SET title = ?, answers = ? WHERE id = ?",
+        ("mutex的零值可以直接使用", '["A: 可以", "B: 不可以"]', question_id)
+    ))
+    assert _search_titles(database, event_loop_runner, "channel") == []
+    assert _search_titles(database, event_loop_runner, "make(chan") == []
+    assert _search_titles(database, event_loop_runner, "mutex") == ["mutex的零值可以直接使用"]
+
+    event_loop_runner(database.batch_delete_questions([question_id]))
+    assert _search_titles(database, event_loop_runner, "mutex") == []
+    remaining = event_loop_runner(database.get("SELECT COUNT(*) AS count FROM questions_fts"))
+    assert remaining["count"] == 0
+
+
+def test_two_char_cjk_terms_fall_back_to_like(database, event_loop_runner):
+    questions = make_questions(4)
+    for question in questions:
+        question["answers"] = ["A: 1", "B: 2", "C: 3", "D: 4"]
+    questions[0]["title"] = "并发安全的map"
+    questions[1]["title"] = "指针与引用的区别"
+    questions[2]["title"] = "goroutine之间如何通信"
+    questions[2]["answers"] = ["A: 共享指针", "B: channel", "C: 全局变量", "D: 信号"]
+    questions[3]["title"] = "slice的扩容"
+    event_loop_runner(database.batch_insert_questions(questions))
+
+    # trigram 无法索引 2 个字符的词，整个查询回退为 LIKE
+    assert build_fts_query("指针") == ("", ["指针"])
+    assert sorted(_search_titles(database, event_loop_runner, "指针")) == ["goroutine之间如何通信", "指针与引用的区别"]
+    assert _search_titles(database, event_loop_runner, "并发") == ["并发安全的map"]
+    assert _search_titles(database, event_loop_runner, "泄漏") == []
+
+    # 与 3 个字符以上的词组合时先用全文索引缩小范围，再用 LIKE 过滤短词
+    assert build_fts_query("指针 goroutine") == ('"goroutine"', ["指针"])
+    assert _search_titles(database, event_loop_runner, "指针 goroutine") == ["goroutine之间如何通信"]
+    assert _search_titles(database, event_loop_runner, "并发 goroutine") == []
+
+    _, total = event_loop_runner(database.search_questions("指针"))
+    assert total == 2
+
+
+def test_fts_follows_filter_delete(database, event_loop_runner):
+    questions = make_questions(4, prefix="goroutine泄漏")
+    questions[0]["language"] = "python"
+    event_loop_runner(database.batch_insert_questions(questions))
+
+    deleted = event_loop_runner(database.delete_questions_by_filter(language="go", expected_count=3))
+    assert deleted == 3
+    _, total = event_loop_runner(database.search_questions("goroutine泄漏"))
+    assert total == 1
+
+
+def test_count_cache_drops_results_from_older_generation():
+    cache = CountCache(max_size=4, ttl=60)
+    generation = cache.generation
+    # 查询期间发生写操作，查询结果不应再写入缓存
+    cache.invalidate()
+    cache.set(("like", "", None), 10, generation)
+    assert cache.get(("like", "", None)) is None
+
+    cache.set(("like", "", None), 11, cache.generation)
+    assert cache.get(("like", "", None)) == 11
+
+
+def test_count_cache_invalidate_clears_entries():
+    cache = CountCache(max_size=4, ttl=60)
+    cache.set("a", 1, cache.generation)
+    cache.invalidate()
+    assert cache.get("a") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_count_cache_evicts_least_recently_used_and_expires():
+    cache = CountCache(max_size=2, ttl=60)
+    cache.set("a", 1, 0)
+    cache.set("b", 2, 0)
+    assert cache.get("a") == 1
+    cache.set("c", 3, 0)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+    expired = CountCache(max_size=2, ttl=0)
+    expired.set("a", 1, 0)
+    assert expired.get("a") is None
+
+    disabled = CountCache(max_size=0)
+    disabled.set("a", 1, 0)
+    assert disabled.get("a") is None
+
+
+def test_database_count_refreshes_after_writes(database, event_loop_runner):
+    ids = event_loop_runner(_seed(database, 5))
+    assert event_loop_runner(database.count_questions()) == 5
+    assert event_loop_runner(database.count_questions()) == 5
+    assert database.count_cache_stats()["hits"] >= 1
+
+    event_loop_runner(database.batch_insert_questions(make_questions(2)))
+    assert event_loop_runner(database.count_questions()) == 7
+
+    event_loop_runner(database.batch_delete_questions(ids[:3]))
+    assert event_loop_runner(database.count_questions()) == 4
+    assert event_loop_runner(database.estimate_questions_count(question_type=1)) == (4, True)
+
+
+def test_delete_more_ids_than_sqlite_variable_limit(database, event_loop_runner):
+    ids = event_loop_runner(_seed(database, 2500))
+    assert len(ids[:2200]) > 999 > DELETE_CHUNK_SIZE
+
+    deleted = event_loop_runner(database.batch_delete_questions(ids[:2200] + [10 ** 9]))
+    assert deleted == 2200
+    assert event_loop_runner(database.count_questions()) == 300
+
+
+def test_chunked_delete_is_one_transaction(database, event_loop_runner):
+    ids = event_loop_runner(_seed(database, 1500))
+    # 第二个分块中的某一行删除失败时，第一个分块的删除也要回滚
+    blocked = ids[DELETE_CHUNK_SIZE + 10]
+    event_loop_runner(database.execute(
+        f"CREATE TRIGGER block_delete BEFORE DELETE ON questions WHEN old.id = {blocked} "
+        "BEGIN SELECT RAISE(ABORT, 'blocked'); END"
+    ))
+
+    with pytest.raises(sqlite3.IntegrityError):
+        event_loop_runner(database.batch_delete_questions(ids))
+    assert event_loop_runner(database.count_questions()) == 1500
+
+
+def test_filter_delete_checks_expected_count_and_limit(tmp_path, event_loop_runner):
+    path = str(tmp_path / "limit.db")
+
+    async def scenario():
+        db = await init_database(path, DatabaseConfig(path=path, delete_max_rows=5))
+        try:
+            questions = make_questions(8)
+            for question in questions[:3]:
+                question["language"] = "python"
+            await db.batch_insert_questions(questions)
+
+            assert await db.delete_questions_by_filter(language="go", dry_run=True) == 5
+            with pytest.raises(DeleteConflictError) as mismatch:
+                await db.delete_questions_by_filter(language="go", expected_count=4)
+            assert mismatch.value.matched == 5
+            with pytest.raises(DeleteConflictError):
+                await db.delete_questions_by_filter(question_type=1)
+            with pytest.raises(ValueError):
+                await db.delete_questions_by_filter()
+            assert await db.count_questions() == 8
+
+            assert await db.delete_questions_by_filter(language="go", expected_count=5) == 5
+            return await db.count_questions()
+        finally:
+            await db.close()
+
+    assert event_loop_runner(scenario()) == 3
@@ -0,0 +1,182 @@
+"""
+流式生成的行为测试：增量JSON数组解析、SSE数据帧读取，以及 /CreateByAIStream 的事件输出。
+"""
+
+import json
+from typing import Any, AsyncIterator, Dict, List
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.config.config import QuestionRequest, QuestionResponse, QuestionResponses
+from app.controllers.question import create_question_controller
+from app.services.client import AIService
+from app.services.deepseek import DeepSeekClient
+from app.services.resilience import RetryPolicy
+from app.services.streaming import JSONArrayStreamParser, iter_sse_data
+
+
+def _question(i: int, title: str = None) -> Dict[str, Any]:
+    return {
+        "title": title or f"第{i}题？",
+        "answers": ["A: 1", "B: 2", "C: 3", "D: 4"],
+        "rights": ["A"]
+    }
+
+
+def _feed_all(parts: List[str]) -> List[Any]:
+    parser = JSONArrayStreamParser()
+    items = []
+    for part in parts:
+        items.extend(parser.feed(part))
+    return items
+
+
+def test_items_split_at_every_character():
+    text = json.dumps([_question(1), _question(2, 'a "quoted" \\ title 中')], ensure_ascii=False)
+    # 逐字符输入覆盖字符串中间、转义序列中间等所有切分位置
+    assert _feed_all(list(text)) == [_question(1), _question(2, 'a "quoted" \\ title 中')]
+
+
+def test_split_between_escape_and_escaped_quote():
+    items = _feed_all(['[{"title": "x\\', '"}', '"}]'])
+    assert items == [{"title": 'x"}'}]
+
+
+def test_brackets_and_quotes_inside_strings():
+    item = {"title": "{[}] \"{\" ]", "answers": ["A: }", "B: {", "C: [", "D: ]"], "rights": ["A"]}
+    assert _feed_all([json.dumps([item])]) == [item]
+
+
+def test_leading_fence_and_prose_are_skipped():
+    text = "好的，以下是题目：\n```json\n" + json.dumps([_question(1)]) + "\n```"
+    parser = JSONArrayStreamParser()
+    assert parser.feed(text) == [_question(1)]
+    assert parser.started and parser.finished
+
+
+def test_trailing_data_after_array_is_ignored():
+    parser = JSONArrayStreamParser()
+    assert parser.feed(json.dumps([_question(1)]) + ' 说明：{"title": "extra"}') == [_question(1)]
+    assert parser.feed(', {"title": "more"}]') == []
+    assert parser.finished
+
+
+def test_empty_array():
+    parser = JSONArrayStreamParser()
+    assert parser.feed("  [ \n ]") == []
+    assert parser.started and parser.finished
+
+
+def test_no_array_leaves_parser_unstarted():
+    parser = JSONArrayStreamParser()
+    assert parser.feed("抱歉，无法生成") == []
+    assert not parser.started
+
+
+@pytest.mark.parametrize("text", [
+    '[{"title": "x",}]',
+    '[{"title": x}]',
+    '[1, 2]',
+    '["title"]',
+])
+def test_malformed_items_raise_value_error(text):
+    with pytest.raises(ValueError):
+        _feed_all([text])
+
+
+def test_items_before_malformed_one_are_returned():
+    parser = JSONArrayStreamParser()
+    assert parser.feed('[{"title": "ok"}, ') == [{"title": "ok"}]
+    with pytest.raises(ValueError):
+        parser.feed('{"title": }]')
+
+
+def test_iter_sse_data_reads_frames_until_done(event_loop_runner):
+    body = (
+        ": keep-alive\n\n"
+        'data: {"n": 1}\n\n'
+        'data:{"n": 2}\n\n'
+        "event: ignored\n"
+        "data: [DONE]\n\n"
+        'data: {"n": 3}\n\n'
+    ).encode()
+
+    async def collect():
+        return [frame async for frame in iter_sse_data(httpx.Response(200, content=body))]
+
+    assert event_loop_runner(collect()) == [{"n": 1}, {"n": 2}]
+
+
+def _sse_body(content: str, pieces: int = 7) -> bytes:
+    """把 content 切成若干个 delta 帧，模拟 chat completions 流式响应。"""
+    size = max(1, len(content) // pieces)
+    frames = [
+        "data: " + json.dumps({"choices": [{"delta": {"content": content[i:i + size]}}]}) + "\n\n"
+        for i in range(0, len(content), size)
+    ]
+    frames.append("data: [DONE]\n\n")
+    return "".join(frames).encode()
+
+
+class _ClientService(AIService):
+    """直接使用单个 DeepSeekClient 的AI服务。"""
+
+    def __init__(self, client: DeepSeekClient):
+        self.client = client
+
+    async def generate_question(self, req: QuestionRequest) -> QuestionResponses:
+        return await self.client.generate(req)
+
+    async def generate_question_stream(self, req: QuestionRequest) -> AsyncIterator[QuestionResponse]:
+        async for question in self.client.generate_stream(req):
+            yield question
+
+
+def _stream_events(event_loop_runner, database, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """通过模拟的上游流调用 /CreateByAIStream，返回解析后的SSE事件。"""
+    content = "```json\n" + json.dumps(items, ensure_ascii=False) + "\n```"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, content=_sse_body(content), headers={"Content-Type": "text/event-stream"})
+
+    client = DeepSeekClient("test", retry_policy=RetryPolicy(max_attempts=1))
+    client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+
+    app = FastAPI()
+    app.include_router(create_question_controller(_ClientService(client), database), prefix="/api/questions")
+
+    async def run():
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+                response = await http.post("/api/questions/CreateByAIStream", json={
+                    "keyword": "golang并发", "model": "deepseek", "count": 3, "type": 1
+                })
+                assert response.status_code == 200
+                return response.text
+        finally:
+            await client.close()
+
+    events = []
+    for block in event_loop_runner(run()).strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append({"event": lines["event"], "data": json.loads(lines["data"])})
+    return events
+
+
+def test_stream_route_emits_one_event_per_question(event_loop_runner, database):
+    events = _stream_events(event_loop_runner, database, [_question(i) for i in range(3)])
+
+    assert [event["event"] for event in events] == ["question", "question", "question", "done"]
+    assert [event["data"]["index"] for event in events[:3]] == [0, 1, 2]
+    assert [event["data"]["title"] for event in events[:3]] == ["第0题？", "第1题？", "第2题？"]
+    assert events[-1]["data"]["count"] == 3
+
+
+def test_stream_route_reports_short_count_as_final_error(event_loop_runner, database):
+    events = _stream_events(event_loop_runner, database, [_question(i) for i in range(2)])
+
+    assert [event["event"] for event in events] == ["question", "question", "error"]
+    assert "实际 2 道" in events[-1]["data"]["msg"]
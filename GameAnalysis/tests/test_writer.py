@@ -0,0 +1,110 @@
+"""
+写合并队列的行为测试：合并执行、失败隔离和关闭。
+"""
+
+import asyncio
+from typing import List
+
+import pytest
+
+from app.storage.writer import WRITE_DELETE, WRITE_INSERT, WriteBatch, WriteCoalescer, WriterClosedError
+
+
+class RecordingApply:
+    """记录每次调用的批次；包含 fail_on 中参数的批次整体失败。"""
+
+    def __init__(self, fail_on=()):
+        self.calls: List[WriteBatch] = []
+        self.fail_on = set(fail_on)
+
+    async def __call__(self, operations: WriteBatch) -> List[int]:
+        self.calls.append(operations)
+        await asyncio.sleep(0)
+        if any(value in self.fail_on for _, params in operations for value in params):
+            raise ValueError("写入失败")
+        return [len(params) for _, params in operations]
+
+
+def test_concurrent_operations_share_one_batch(event_loop_runner):
+    apply = RecordingApply()
+    writer = WriteCoalescer(apply, max_batch=100, max_latency=0.01)
+
+    async def scenario():
+        results = await asyncio.gather(
+            writer.insert([(1,), (2,)]), writer.delete([7]), writer.insert([(3,)])
+        )
+        await writer.close()
+        return results
+
+    assert event_loop_runner(scenario()) == [2, 1, 1]
+    assert apply.calls == [[(WRITE_INSERT, [(1,), (2,)]), (WRITE_DELETE, [7]), (WRITE_INSERT, [(3,)])]]
+    assert writer.stats()["batches"] == 1
+
+
+def test_failed_batch_retries_each_operation(event_loop_runner):
+    apply = RecordingApply(fail_on={"bad"})
+    writer = WriteCoalescer(apply, max_batch=100, max_latency=0.01)
+
+    async def scenario():
+        results = await asyncio.gather(
+            writer.insert(["ok-1"]), writer.insert(["bad"]), writer.insert(["ok-2"]), return_exceptions=True
+        )
+        await writer.close()
+        return results
+
+    first, failed, second = event_loop_runner(scenario())
+    assert (first, second) == (1, 1)
+    assert isinstance(failed, ValueError)
+    # 一次合并事务，随后三次单独重试
+    assert len(apply.calls) == 4
+    assert writer.stats()["fallbacks"] == 1
+
+
+def test_batches_split_at_max_rows(event_loop_runner):
+    apply = RecordingApply()
+    writer = WriteCoalescer(apply, max_batch=3, max_latency=0.01)
+
+    async def scenario():
+        await asyncio.gather(*(writer.insert([(i,), (i,)]) for i in range(3)))
+        await writer.close()
+
+    event_loop_runner(scenario())
+    assert [len(call) for call in apply.calls] == [1, 1, 1]
+
+
+def test_close_flushes_and_rejects_new_writes(event_loop_runner):
+    apply = RecordingApply()
+    writer = WriteCoalescer(apply, max_batch=100, max_latency=0.05)
+
+    async def scenario():
+        pending = asyncio.ensure_future(writer.insert([(1,)]))
+        await asyncio.sleep(0)
+        await writer.close()
+        with pytest.raises(WriterClosedError):
+            await writer.insert([(2,)])
+        return await pending
+
+    assert event_loop_runner(scenario()) == 1
+    assert len(apply.calls) == 1
+
+
+def test_cancelled_flush_fails_waiting_callers(event_loop_runner):
+    async def scenario():
+        started = asyncio.Event()
+
+        async def slow_apply(operations: WriteBatch) -> List[int]:
+            started.set()
+            await asyncio.sleep(10)
+            return [len(params) for _, params in operations]
+
+        writer = WriteCoalescer(slow_apply, max_batch=1, max_latency=0)
+        running = asyncio.ensure_future(writer.insert([(1,)]))
+        queued = asyncio.ensure_future(writer.insert([(2,)]))
+        await started.wait()
+        writer._flusher.cancel()
+        await writer.close()
+        return await asyncio.gather(running, queued, return_exceptions=True)
+
+    results = event_loop_runner(scenario())
+    assert len(results) == 2
+    assert all(isinstance(result, WriterClosedError) for result in results)